@@ -32,7 +32,7 @@
 
 from liota.dcc.graphite_dcc import Graphite
 from liota.boards.gateway_dk300 import Dk300
-from liota.transports.socket_connection import Socket
+from liota.transports.socket_connection import Socket, SocketPool
 import random
 
 # getting values from conf file
@@ -55,7 +55,11 @@ if __name__ == '__main__':
     # Sending data to a data center component
     # Graphite is a data center component
     # Socket is the transport which the agent uses to connect to the graphite instance
-    graphite = Graphite(Socket(config['GraphiteIP'], config['GraphitePort']))
+    # On high-latency links a SocketPool opens several parallel connections instead of one
+    if config.get('GraphitePoolSize', 1) > 1:
+        graphite = Graphite(SocketPool(config['GraphiteIP'], config['GraphitePort'], config['GraphitePoolSize']))
+    else:
+        graphite = Graphite(Socket(config['GraphiteIP'], config['GraphitePort']))
     graphite_gateway = graphite.register(gateway)
     content_metric = graphite.create_metric(graphite_gateway, config['GraphiteMetric'], unit=None, sampling_interval_sec=15, aggregation_size=1, sampling_function=simulated_device)
     content_metric.start_collecting()
@@ -33,6 +33,7 @@
 from liota.boards.gateway_dk300 import Dk300
 from liota.dcc.graphite_dcc import Graphite
 from liota.transports.socket_connection import Socket
+from liota.utilities.cache import cached
 from pint import UnitRegistry
 from temperusb import TemperHandler
 
@@ -49,6 +50,10 @@ quantity = ureg.Quantity
 # can be done such as Celsius to Fahrenheit or Kelvin as shown below with
 # help of this library.
 
+# The three metrics below are computed from the same reading. getTemp() is
+# cached, so the USB device is read only once for all metrics sampled within
+# 10 seconds of each other.
+@cached(ttl=10)
 def getTemp():
     th = TemperHandler()
     devs = th.get_devices()
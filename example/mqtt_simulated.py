@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+from liota.dcc.mqtt_dcc import MqttDcc
+from liota.boards.gateway_dk300 import Dk300
+from liota.transports.mqtt import Mqtt
+import random
+
+# getting values from conf file
+config = {}
+execfile('sampleProp.conf', config)
+
+# Random number generator, simulating random device readings.
+def simulated_device():
+    return random.randint(0, 20)
+
+#---------------------------------------------------------------------------
+# In this example, we demonstrate how data from a simulated device generating
+# random numbers can be directed to an MQTT broker using Liota.
+# The samples are published to liota/<gateway name>/<metric name>, batched
+# into one message per topic.
+
+if __name__ == '__main__':
+
+    gateway = Dk300(config['Gateway1Name'])
+
+    # Mqtt is the transport which the agent uses to connect to the broker
+    # Messages that cannot be sent while the broker is unreachable are kept
+    # in MqttQueuePath, if one is configured, and sent after a restart
+    mqtt = MqttDcc(Mqtt(config['MqttBrokerIP'], config['MqttBrokerPort'], queue_path=config.get('MqttQueuePath')),
+                   batch_size=10, batch_delay=60)
+    mqtt_gateway = mqtt.register(gateway)
+    content_metric = mqtt.create_metric(mqtt_gateway, config['MqttMetric'], unit=None, sampling_interval_sec=15, aggregation_size=1, sampling_function=simulated_device)
+    content_metric.start_collecting()
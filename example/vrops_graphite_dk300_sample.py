@@ -148,3 +148,8 @@ if __name__ == '__main__':
     graphite_gateway = graphite.register(gateway)
     content_metric = graphite.create_metric(graphite_gateway, config['GraphiteMetric'], unit=None, sampling_interval_sec=10, aggregation_size=2, sampling_function=simulated_device)
     content_metric.start_collecting()
+
+    # A metric can also be sent to several data center components at once; the sensor is then
+    # read once and every data center component gets the same samples
+    if vrops_device.registered:
+        mem_free.bind(graphite, graphite_gateway, details="liota.memory_free")
@@ -34,6 +34,7 @@ from abc import ABCMeta, abstractmethod
 import logging
 import time
 
+from liota.core.metric_handler import SamplerGroup
 from liota.transformers.metrics import Sample
 from liota.utilities.utility import getUTCmillis
 
@@ -59,6 +60,8 @@ class Gateway:
         # A single pin can report multiple metrics. Following map associates metrics with pins
         self.pin_to_metrics_map = {}
         self.pins = {}
+        self.pin_banks = []
+        self.pin_group = None
         self._configure_pins()
         self._initialize_gateway()
 
@@ -66,6 +69,48 @@ class Gateway:
     def _configure_pins(self):
         pass
 
+    def add_pin_bank(self, bank):
+        self.pin_banks.append(bank)
+        for pin in bank.pins:
+            self.pins[pin.name] = pin
+
+    def read_pins(self):
+        """ Reads all pins of the board in one pass over its pin banks;
+            returns their values keyed by pin name.
+
+        """
+        values = {}
+        for bank in self.pin_banks:
+            values.update(bank.read())
+        return values
+
+    def map_pin(self, pin_name, metric):
+        """ Makes `metric`, e.g. created with sampling_function=None, report
+            the value of pin `pin_name`. Call before start_sampling_pins.
+
+        """
+        if pin_name not in self.pins:
+            raise KeyError("No pin {0} on {1}".format(pin_name, self.res_name))
+        self.pin_to_metrics_map.setdefault(pin_name, []).append(metric)
+        return metric
+
+    def create_pin_sampler(self, sampling_interval_sec=1):
+        """ Returns a SamplerGroup reading the pins every
+            `sampling_interval_sec` in one scheduled event, and writing their
+            values into the mapped metrics.
+
+        """
+        group = SamplerGroup(self.read_pins, sampling_interval_sec, name=self.res_name + " pins")
+        for pin_name, metrics in self.pin_to_metrics_map.items():
+            for metric in metrics:
+                group.add(metric, pin_name)
+        return group
+
+    def start_sampling_pins(self, sampling_interval_sec=1):
+        self.pin_group = self.create_pin_sampler(sampling_interval_sec)
+        self.pin_group.start_collecting()
+        return self.pin_group
+
     @abstractmethod
     def _initialize_gateway(self):
         pass
@@ -82,6 +127,14 @@ class Gateway:
          }],
       }
 
+    def _report_stats(self, msg_id, metric_data):
+        # Envelope of an add_stats message carrying several statKeys of this resource
+        return {
+         "type": "add_stats",
+         "uuid": self.res_uuid,
+         "metric_data": metric_data,
+      }
+
     @abstractmethod
     def _create_relationship(self, msg_id, parent):
         return {
@@ -42,11 +42,13 @@ class Dk300(Gateway):
 
     """
 
-    def __init__(self, label):
+    def __init__(self, label, pin_bank=None):
+        self.pin_bank = pin_bank
         Gateway.__init__(self, 'Intel', 'Galileo-DK300', get_linux_version(), systemUUID().get_uuid(label), label, None, None, None, "HelixGateway")
 
     def _configure_pins(self):
-        pass
+        if self.pin_bank is not None:
+            self.add_pin_bank(self.pin_bank)
 
     def _initialize_gateway(self):
         # Initialize the Gateway Object
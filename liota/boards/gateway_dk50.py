@@ -30,26 +30,45 @@
 #  THE POSSIBILITY OF SUCH DAMAGE.                                            #
 # ----------------------------------------------------------------------------#
 
+from liota.utilities.utility import get_linux_version, systemUUID
+
 from gateway import Gateway
-# from pin_mraa import MraaReadableDigitalPin, MraaReadableAnalogPin
+from handlers import ObjectConfig
+from pins import Pin, SysfsPinBank
+
+# Linux GPIO numbers of the Arduino header pins D0-D13 of a Galileo Gen 2
+GALILEO_GPIOS = [11, 12, 13, 14, 6, 0, 1, 38, 40, 4, 10, 5, 15, 7]
+# The 12-bit ADC of A0-A5 measures 0-5 V
+GALILEO_ADC_SCALE = 5.0 / 4095
 
 
 class Dk50(Gateway):
-    # Basic implementation gateway DK50 Object
+    """ Basic implementation of DK50 Object
 
-    def __init__(self, res_name):
-        Gateway.__init__(self, 'Intel', 'Galileo-DK50', '', res_name)
+        The header pins D0-D13 and A0-A5 are read through sysfs unless
+        another `pin_bank` is given, e.g. a SimulatedPinBank.
 
+    """
+
+    def __init__(self, label, pin_bank=None):
+        self.pin_bank = pin_bank
+        Gateway.__init__(self, 'Intel', 'Galileo-DK50', get_linux_version(), systemUUID().get_uuid(label), label, None, None, None, "HelixGateway")
 
     def _configure_pins(self):
-        # DK_50 has 14 digital pins, D0-D13
-        # for i in range(14):
-        #    pin_name = 'D' + str(i)
-        #    self.pins[pin_name] = MraaReadableDigitalPin(state='', name=pin_name, direction='', pin_no=i)
+        if self.pin_bank is None:
+            # DK_50 has 14 digital pins, D0-D13, and 6 analog pins, A0-A5
+            pins = [Pin('D' + str(i), gpio) for i, gpio in enumerate(GALILEO_GPIOS)]
+            pins += [Pin('A' + str(i), i, analog=True, scale=GALILEO_ADC_SCALE) for i in range(6)]
+            self.pin_bank = SysfsPinBank(pins)
+        self.add_pin_bank(self.pin_bank)
+
+    def _initialize_gateway(self):
+        # Initialize the Gateway Object
+        return ObjectConfig(identifier=self.identifier, name=self.res_name, res_kind=self.res_kind, template=self.res_kind, uuid=self.res_uuid , property_key_value_map=self.property_key_value_map)
 
+    def _report_data(self, msg_id, statkey, timestamps, values):
+        # Post data onto cloud_provider solution
+        return Gateway._report_data(self, msg_id, statkey, timestamps, values)
 
-        # DK_50 has 6 analog pins, A0-A5
-        # for i in range(5):
-        #    pin_name = 'A' + str(i)
-        #    self.pins[pin_name] = MraaReadableAnalogPin(state='', name=pin_name, direction='', pin_no=i)
+    def _create_relationship(self, msg_id, child):
         pass
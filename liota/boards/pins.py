@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+from abc import ABCMeta, abstractmethod
+import logging
+import mmap
+import os
+import struct
+
+from liota.collectors.linux_collector import ProcFile
+
+log = logging.getLogger(__name__)
+
+
+class Pin:
+    """ A digital or analog input pin of a board. The raw value of an analog
+        pin (ADC counts) is multiplied by `scale`, e.g. to get volts.
+
+    """
+    def __init__(self, name, pin_no, analog=False, scale=1.0):
+        self.name = name
+        self.pin_no = pin_no
+        self.analog = analog
+        self.scale = scale
+
+    def __str__(self):
+        return "%s(%s %d)" % (self.name, "analog" if self.analog else "digital", self.pin_no)
+
+
+class PinBank:
+    """ Base class of a set of pins that are read together; read() returns
+        the values of all of them, keyed by pin name.
+
+    """
+    __metaclass__ = ABCMeta
+
+    def __init__(self, pins):
+        self.pins = list(pins)
+
+    @abstractmethod
+    def read(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SysfsPinBank(PinBank):
+    """ Pins read through sysfs: digital pin n from
+        <gpio_path>/gpio<n>/value, analog pin n from
+        <iio_path>/in_voltage<n>_raw. The files are opened on the first read
+        and then kept open; pins whose file cannot be opened, e.g. a GPIO
+        that is not exported, are skipped.
+
+    """
+    def __init__(self, pins, gpio_path="/sys/class/gpio", iio_path="/sys/bus/iio/devices/iio:device0"):
+        PinBank.__init__(self, pins)
+        self.gpio_path = gpio_path
+        self.iio_path = iio_path
+        self.files = None
+
+    def _open(self):
+        self.files = []
+        for pin in self.pins:
+            if pin.analog:
+                path = os.path.join(self.iio_path, "in_voltage%d_raw" % pin.pin_no)
+            else:
+                path = os.path.join(self.gpio_path, "gpio%d" % pin.pin_no, "value")
+            try:
+                self.files.append((pin, ProcFile(path)))
+            except OSError:
+                log.warn("Cannot read pin {0} from {1}, it is not sampled".format(pin.name, path))
+
+    def read(self):
+        if self.files is None:
+            self._open()
+        values = {}
+        for pin, pin_file in self.files:
+            try:
+                raw = int(pin_file.read())
+            except (OSError, ValueError):
+                log.error("Error while reading pin {0} from {1}".format(pin.name, pin_file.path))
+                continue
+            values[pin.name] = raw * pin.scale if pin.analog else raw
+        return values
+
+    def close(self):
+        for _, pin_file in self.files or []:
+            pin_file.close()
+        self.files = None
+
+
+class MmapPinBank(PinBank):
+    """ Pins of a memory-mapped register bank, e.g. /dev/mem or a UIO
+        device, copied out in one read per tick.
+
+        The level of digital pin n is bit n of the little-endian 32-bit
+        registers starting at `digital_offset`, and analog pin n is the
+        little-endian 16-bit register at `analog_offset` + 2n. Offsets are
+        relative to `offset`, which must be a multiple of the page size.
+
+    """
+    def __init__(self, path, pins, offset=0, size=mmap.PAGESIZE, digital_offset=0, analog_offset=64):
+        PinBank.__init__(self, pins)
+        self.path = path
+        self.digital_offset = digital_offset
+        self.analog_offset = analog_offset
+        self.digital = [(pin, pin.pin_no // 32, 1 << (pin.pin_no % 32)) for pin in self.pins if not pin.analog]
+        self.analog = [pin for pin in self.pins if pin.analog]
+        self.digital_words = max([word + 1 for _, word, _ in self.digital] or [0])
+        self.analog_words = max([pin.pin_no + 1 for pin in self.analog] or [0])
+        self.digital_format = "<%dI" % self.digital_words
+        self.analog_format = "<%dH" % self.analog_words
+        self.end = max(digital_offset + 4 * self.digital_words, analog_offset + 2 * self.analog_words)
+        self.fd = os.open(path, os.O_RDWR | getattr(os, "O_SYNC", 0))
+        self.map = mmap.mmap(self.fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE, offset=offset)
+
+    def read(self):
+        block = self.map[:self.end]
+        values = {}
+        if self.digital:
+            words = struct.unpack_from(self.digital_format, block, self.digital_offset)
+            for pin, word, mask in self.digital:
+                values[pin.name] = 1 if words[word] & mask else 0
+        if self.analog:
+            raw = struct.unpack_from(self.analog_format, block, self.analog_offset)
+            for pin in self.analog:
+                values[pin.name] = raw[pin.pin_no] * pin.scale
+        return values
+
+    def close(self):
+        self.map.close()
+        os.close(self.fd)
+
+
+class SimulatedPinBank(MmapPinBank):
+    """ A register bank backed by a regular file, laid out like
+        MmapPinBank, to run and test pin sampling without the hardware.
+        The file is created if it does not exist, and set() changes the
+        level or raw value of a pin.
+
+    """
+    def __init__(self, path, pins, size=mmap.PAGESIZE, digital_offset=0, analog_offset=64):
+        if not os.path.exists(path) or os.path.getsize(path) < size:
+            with open(path, "ab") as f:
+                f.truncate(size)
+        MmapPinBank.__init__(self, path, pins, 0, size, digital_offset, analog_offset)
+        self.by_name = dict((pin.name, pin) for pin in self.pins)
+
+    def set(self, name, value):
+        pin = self.by_name[name]
+        if pin.analog:
+            struct.pack_into("<H", self.map, self.analog_offset + 2 * pin.pin_no, value)
+        else:
+            position = self.digital_offset + 4 * (pin.pin_no // 32)
+            word = struct.unpack_from("<I", self.map, position)[0]
+            mask = 1 << (pin.pin_no % 32)
+            struct.pack_into("<I", self.map, position, word | mask if value else word & ~mask)
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import glob
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+SECTOR_BYTES = 512
+
+
+class ProcFile:
+    """ A /proc or /sys file kept open and read again from its start, which
+        makes the kernel generate its current content without opening the
+        file every time.
+
+    """
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        self.size = 4096
+
+    def read(self):
+        # os.pread is not available before Python 3.3
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        data = os.read(self.fd, self.size)
+        if len(data) < self.size:
+            # /proc and /sys files only return less than asked for at their end
+            return data
+        chunks = [data]
+        while data:
+            data = os.read(self.fd, self.size)
+            chunks.append(data)
+        data = "".join(chunks)
+        # Read the whole file at once next time
+        self.size = 2 * len(data)
+        return data
+
+    def close(self):
+        os.close(self.fd)
+
+
+class LinuxCollector:
+    """ CPU, memory, disk, network and thermal statistics of a Linux host,
+        all read in one pass for a SamplerGroup:
+
+            system = LinuxCollector(disks=["sda"], interfaces=["eth0"])
+            group = SamplerGroup(system.sample, sampling_interval_sec=10)
+            group.add(dcc.create_metric(gw, "CPU_Utilization", unit=None,
+                                        sampling_function=None), "cpu.utilization")
+            group.start_collecting()
+
+        The /proc and /sys files are opened once. Utilizations and rates are
+        computed from the counters of the previous sample, so sampling never
+        sleeps; the first sample is relative to the creation of the collector.
+        `disks`, `interfaces` and `thermal_zones` default to all of them.
+        Files that do not exist on this host are skipped, as are their keys.
+
+        sample() returns a dict with the keys
+            cpu.utilization, cpu.user, cpu.system, cpu.iowait (percent),
+            cpu.procs_running, cpu.procs_blocked, cpu.context_switches (per second),
+            load.1, load.5, load.15,
+            mem.total, mem.free, mem.available, mem.swap_used (MB), mem.used (percent),
+            disk.<name>.busy (percent), disk.<name>.read, disk.<name>.write (bytes per second),
+            net.<name>.rx, net.<name>.tx (bits per second),
+            thermal.<zone> (degrees Celsius)
+
+    """
+    def __init__(self, disks=None, interfaces=None, thermal_zones=None, proc_path="/proc", sys_path="/sys"):
+        self.disks = disks
+        self.interfaces = interfaces
+        self.lock = threading.Lock()
+        self.files = {}
+        for name in ("stat", "meminfo", "loadavg", "diskstats", "net/dev"):
+            self._open(name, os.path.join(proc_path, name))
+        self.thermal = []
+        for zone_path in sorted(glob.glob(os.path.join(sys_path, "class/thermal/thermal_zone*"))):
+            zone = os.path.basename(zone_path)
+            if thermal_zones is not None and zone not in thermal_zones:
+                continue
+            if self._open(zone, os.path.join(zone_path, "temp")):
+                self.thermal.append(zone)
+        self.cpu_values = {}
+        self.previous_time = time.time()
+        self.previous = self._read_counters()
+
+    def _open(self, name, path):
+        try:
+            self.files[name] = ProcFile(path)
+            return True
+        except OSError:
+            log.warn("Cannot read {0}, its statistics are not collected".format(path))
+            return False
+
+    def _read(self, name):
+        proc_file = self.files.get(name)
+        if proc_file is None:
+            return None
+        try:
+            return proc_file.read()
+        except OSError:
+            log.exception("Error while reading {0}".format(proc_file.path))
+            return None
+
+    def _read_counters(self):
+        counters = {}
+        data = self._read("stat")
+        if data is not None:
+            for line in data.splitlines():
+                fields = line.split()
+                if not fields:
+                    continue
+                if fields[0] == "cpu":
+                    counters["cpu"] = [int(v) for v in fields[1:9]]
+                elif fields[0] == "ctxt":
+                    counters["ctxt"] = int(fields[1])
+                elif fields[0] in ("procs_running", "procs_blocked"):
+                    counters[fields[0]] = int(fields[1])
+        data = self._read("diskstats")
+        if data is not None:
+            for line in data.splitlines():
+                fields = line.split()
+                if len(fields) < 14 or (self.disks is not None and fields[2] not in self.disks):
+                    continue
+                # sectors read, sectors written, ms spent doing I/O
+                counters["disk." + fields[2]] = (int(fields[5]), int(fields[9]), int(fields[12]))
+        data = self._read("net/dev")
+        if data is not None:
+            for line in data.splitlines()[2:]:
+                name, _, stats = line.partition(":")
+                name = name.strip()
+                fields = stats.split()
+                if len(fields) < 9 or (self.interfaces is not None and name not in self.interfaces):
+                    continue
+                counters["net." + name] = (int(fields[0]), int(fields[8]))
+        return counters
+
+    def sample(self):
+        with self.lock:
+            now = time.time()
+            counters = self._read_counters()
+            elapsed = max(now - self.previous_time, 1e-6)
+            previous = self.previous
+            self.previous = counters
+            self.previous_time = now
+            values = {}
+            if "cpu" in counters:
+                if not self._cpu(counters["cpu"], previous.get("cpu", [0] * 8)):
+                    # Less than a clock tick since the previous sample
+                    counters["cpu"] = previous["cpu"]
+                values.update(self.cpu_values)
+            for key in ("procs_running", "procs_blocked"):
+                if key in counters:
+                    values["cpu." + key] = counters[key]
+            if "ctxt" in counters:
+                values["cpu.context_switches"] = (counters["ctxt"] - previous.get("ctxt", counters["ctxt"])) / elapsed
+            for key, current in counters.items():
+                if key.startswith("disk."):
+                    before = previous.get(key, current)
+                    values[key + ".read"] = (current[0] - before[0]) * SECTOR_BYTES / elapsed
+                    values[key + ".write"] = (current[1] - before[1]) * SECTOR_BYTES / elapsed
+                    values[key + ".busy"] = min(100.0, (current[2] - before[2]) / (10.0 * elapsed))
+                elif key.startswith("net."):
+                    before = previous.get(key, current)
+                    values[key + ".rx"] = (current[0] - before[0]) * 8 / elapsed
+                    values[key + ".tx"] = (current[1] - before[1]) * 8 / elapsed
+            self._memory(values)
+            self._load(values)
+            for zone in self.thermal:
+                data = self._read(zone)
+                if data:
+                    values["thermal." + zone] = int(data) / 1000.0
+            return values
+
+    def _cpu(self, current, before):
+        deltas = [c - b for c, b in zip(current, before)]
+        total = float(sum(deltas))
+        if total <= 0:
+            return False
+        user, nice, system, idle, iowait = deltas[:5]
+        self.cpu_values = {
+            "cpu.utilization": round(100.0 * (1 - idle / total), 2),
+            "cpu.user": 100.0 * (user + nice) / total,
+            "cpu.system": 100.0 * system / total,
+            "cpu.iowait": 100.0 * iowait / total
+        }
+        return True
+
+    def _memory(self, values):
+        data = self._read("meminfo")
+        if data is None:
+            return
+        meminfo = {}
+        for line in data.splitlines():
+            fields = line.split()
+            if len(fields) >= 2:
+                meminfo[fields[0].rstrip(":")] = int(fields[1])
+        total = meminfo.get("MemTotal", 0)
+        free = meminfo.get("MemFree", 0)
+        # MemAvailable is missing before Linux 3.14
+        available = meminfo.get("MemAvailable", free + meminfo.get("Buffers", 0) + meminfo.get("Cached", 0))
+        values["mem.total"] = total / 1024.0
+        values["mem.free"] = free / 1024.0
+        values["mem.available"] = available / 1024.0
+        values["mem.swap_used"] = (meminfo.get("SwapTotal", 0) - meminfo.get("SwapFree", 0)) / 1024.0
+        if total > 0:
+            values["mem.used"] = 100.0 * (total - available) / total
+
+    def _load(self, values):
+        data = self._read("loadavg")
+        if data is None:
+            return
+        fields = data.split()
+        values["load.1"] = float(fields[0])
+        values["load.5"] = float(fields[1])
+        values["load.15"] = float(fields[2])
+
+    def close(self):
+        with self.lock:
+            for proc_file in self.files.values():
+                proc_file.close()
+            self.files = {}
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import logging
+import threading
+import time
+
+from liota.core import metric_handler
+from liota.utilities.ring_buffer import RingBuffer
+
+log = logging.getLogger(__name__)
+
+
+class SampleBlock:
+    """ Consecutive samples of one channel: the i-th value was sampled at
+        start_ms + i * period_ms. Both are exact and thus fractional
+        milliseconds in general.
+
+    """
+    def __init__(self, start_ms, period_ms, values):
+        self.start_ms = start_ms
+        self.period_ms = period_ms
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+
+class BlockValues(object):
+    """ The samples of several blocks as the (timestamp, value) pairs data
+        center components iterate, made on the fly rather than stored. The
+        timestamps are rounded to integer milliseconds, like those of other
+        metrics.
+
+    """
+    def __init__(self, blocks):
+        self.blocks = blocks
+
+    def __len__(self):
+        return sum(len(block) for block in self.blocks)
+
+    def __nonzero__(self):
+        return any(len(block) for block in self.blocks)
+
+    def __iter__(self):
+        for block in self.blocks:
+            start_ms = block.start_ms
+            period_ms = block.period_ms
+            for i, v in enumerate(block.values):
+                yield (int(round(start_ms + i * period_ms)), v)
+
+    def __getitem__(self, index):
+        return list(self)[index]
+
+
+class BlockBatch(object):
+    """ Blocks of a HighRateMetric handed to its data center component
+        together, through the send queue of the metric handler.
+
+        It is sent like a Metric: `values` gives the (timestamp, value) pairs.
+        Data center components that can send implicit timestamps use
+        `blocks` instead.
+
+    """
+    def __init__(self, metric, blocks):
+        self.metric = metric
+        self.gw = metric.gw
+        self.details = metric.details
+        self.unit = metric.unit
+        self.data_center_component = metric.data_center_component
+        self.blocks = blocks
+        self.values = BlockValues(blocks)
+
+    def __str__(self, *args, **kwargs):
+        return "%s:%d blocks" % (self.details, len(self.blocks))
+
+    def clear_values(self):
+        self.blocks = []
+        self.values = BlockValues(self.blocks)
+
+
+class HighRateMetric(object):
+    """ A channel of a HighRateSampler, published to a data center component
+        every `aggregation_size` blocks.
+
+    """
+    def __init__(self, sampler, channel, gw, details, unit, aggregation_size, data_center_component):
+        self.sampler = sampler
+        self.channel = channel
+        self.gw = gw
+        self.details = details
+        self.unit = unit
+        self.aggregation_size = aggregation_size
+        self.data_center_component = data_center_component
+        self.buffer = None
+        self.blocks = []
+
+    def __str__(self, *args, **kwargs):
+        return str(self.details) + "@" + str(self.sampler.name)
+
+    def add_block(self, block):
+        self.blocks.append(block)
+        if len(self.blocks) >= self.aggregation_size:
+            self.flush()
+
+    def flush(self):
+        if self.blocks:
+            blocks, self.blocks = self.blocks, []
+            metric_handler.send_queue.put(BlockBatch(self, blocks))
+
+    def latest(self, count):
+        """ Returns the last `count` values sampled, e.g. to analyze the
+            waveform on the gateway.
+
+        """
+        return self.buffer.latest(count)
+
+
+class HighRateSampler:
+    """ Samples at a fixed rate of up to some kHz, e.g. vibration or
+        waveform sensors, on a thread of its own.
+
+            sampler = HighRateSampler(read_accelerometer, period_sec=0.001, block_size=500)
+            sampler.add_metric(dcc, dcc_gw, "Vibration_X", unit=None, channel=0)
+            sampler.add_metric(dcc, dcc_gw, "Vibration_Y", unit=None, channel=1)
+            sampler.start()
+
+        `sampling_function` is called every `period_sec`, which can be below
+        a millisecond, and returns a value, or a sequence of the values of
+        several channels. The values of each channel are written into a ring
+        buffer of `capacity` values, and every `block_size` samples they are
+        handed to the send queue as one SampleBlock per channel, timestamped
+        by its start time and the period instead of per sample. Sampling
+        thus does not go through the scheduler of the metric handler.
+
+        The thread sleeps until `spin_sec` before a sample is due and then
+        busy-waits, which keeps the jitter low at the cost of some CPU. A
+        slot that is missed, because the thread was late or the sampling
+        function raised, is skipped and ends the current block early, so the
+        timestamps of a block are always exact.
+
+    """
+    def __init__(self, sampling_function, period_sec, block_size=1000, capacity=None, spin_sec=0.0002, name=None):
+        self.sampling_function = sampling_function
+        self.period_sec = period_sec
+        self.block_size = block_size
+        self.capacity = capacity if capacity is not None else 4 * block_size
+        self.spin_sec = spin_sec
+        self.name = name if name is not None else getattr(sampling_function, "__name__", "HighRateSampler")
+        self.metrics = []
+        self.running = False
+        self.thread = None
+        self.samples = 0
+        self.blocks = 0
+        self.missed = 0
+        self.errors = 0
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+        self.started_at = None
+        self.stopped_at = None
+
+    def add_metric(self, data_center_component, registered_gw, details, unit, channel=None, aggregation_size=1):
+        """ Publishes channel `channel` of the sampled values, or the values
+            themselves if it is None, every `aggregation_size` blocks.
+
+        """
+        if self.running:
+            raise RuntimeError("Cannot add a metric to the running sampler {0}".format(self.name))
+        data_center_component.publish_unit(registered_gw, details, unit)
+        metric = HighRateMetric(self, channel, registered_gw.resource, details, unit, aggregation_size,
+                                data_center_component)
+        self.metrics.append(metric)
+        return metric
+
+    def start(self):
+        metric_handler.initialize()
+        for metric in self.metrics:
+            metric.buffer = RingBuffer(self.capacity)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=self.name)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """ Stops sampling and hands all samples not sent yet over.
+
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+
+    def get_stats(self):
+        elapsed = (self.stopped_at or time.time()) - self.started_at if self.started_at else 0
+        return {
+            "samples": self.samples,
+            "blocks": self.blocks,
+            "missed": self.missed,
+            "errors": self.errors,
+            "rate": self.samples / elapsed if elapsed > 0 else 0.0,
+            "mean_lateness_us": 1e6 * self.total_lateness / max(self.samples, 1),
+            "max_lateness_us": 1e6 * self.max_lateness
+        }
+
+    def _run(self):
+        log.info("Started sampling {0} every {1} ms".format(self.name, self.period_sec * 1000))
+        read = self.sampling_function
+        period = self.period_sec
+        spin = self.spin_sec
+        channels = [metric.channel for metric in self.metrics]
+        writes = [metric.buffer.write for metric in self.metrics]
+        now = time.time
+        self.started_at = due = now()
+        block_start = due
+        block_count = 0
+        while self.running:
+            delay = due - now()
+            if delay > spin:
+                time.sleep(delay - spin)
+            while now() < due:
+                pass
+            late = now() - due
+            if late >= period:
+                skipped = int(late / period)
+                self.missed += skipped
+                due += skipped * period
+                late -= skipped * period
+                self._hand_over(block_start, block_count)
+                block_start = due
+                block_count = 0
+            try:
+                value = read()
+                row = [value if channel is None else value[channel] for channel in channels]
+            except Exception:
+                self.errors += 1
+                self.missed += 1
+                if self.errors == 1:
+                    log.exception("Error while sampling {0}, the slot is skipped".format(self.name))
+                due += period
+                self._hand_over(block_start, block_count)
+                block_start = due
+                block_count = 0
+                continue
+            for write, v in zip(writes, row):
+                write(v)
+            self.samples += 1
+            self.total_lateness += late
+            if late > self.max_lateness:
+                self.max_lateness = late
+            block_count += 1
+            if block_count == self.block_size:
+                self._hand_over(block_start, block_count)
+                block_start = due + period
+                block_count = 0
+            due += period
+        self.stopped_at = now()
+        self._hand_over(block_start, block_count)
+        for metric in self.metrics:
+            metric.flush()
+        log.info("Stopped sampling {0}".format(self.name))
+
+    def _hand_over(self, block_start, count):
+        if count == 0:
+            return
+        self.blocks += 1
+        for metric in self.metrics:
+            values = metric.buffer.read(metric.buffer.written - count, count)
+            metric.add_block(SampleBlock(block_start * 1000, self.period_sec * 1000, values))
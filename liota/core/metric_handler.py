@@ -30,7 +30,7 @@
 #  THE POSSIBILITY OF SUCH DAMAGE.                                            #
 # ----------------------------------------------------------------------------#
 
-from Queue import Queue, PriorityQueue, Full
+from Queue import Queue, PriorityQueue, Full, Empty
 import heapq
 import inspect
 import logging
@@ -38,6 +38,7 @@ from threading import Thread, Condition
 from time import time as _time
 
 from liota.utilities.utility import getUTCmillis
+from liota.utilities.vector_buffer import VectorBuffer
 
 log = logging.getLogger(__name__)
 
@@ -47,6 +48,11 @@ send_queue = None
 event_checker_thread = None
 send_thread = None
 
+# Metrics that become ready to send within SEND_BATCH_LINGER_SEC of each other
+# are handed to their data center component in one publish_batch call
+SEND_BATCH_LINGER_SEC = 0.05
+SEND_BATCH_MAX_SIZE = 1000
+
 class EventsPriorityQueue(PriorityQueue):
     def __init__(self):
         PriorityQueue.__init__(self)
@@ -58,7 +64,7 @@ class EventsPriorityQueue(PriorityQueue):
         try:
             first_element_before_insertion = None
             if self._qsize() > 0:
-                first_element_before_insertion = heapq.nsmallest(1, self.queue)[0]
+                first_element_before_insertion = self.queue[0]
 
             if self.maxsize > 0:
                 if not block:
@@ -80,25 +86,45 @@ class EventsPriorityQueue(PriorityQueue):
             self.unfinished_tasks += 1
             self.not_empty.notify()
 
-            first_element_after_insertion = heapq.nsmallest(1, self.queue)[0]
+            first_element_after_insertion = self.queue[0]
             if first_element_before_insertion != first_element_after_insertion:
                 self.first_element_changed.notify()
         finally:
             self.not_full.release()
 
+    def put_all_and_notify(self, items):
+        """ Inserts many items at once, restoring the heap once instead of
+            on every insertion. The queue is not bounded here.
+
+        """
+        log.info("Adding {0} events".format(len(items)))
+        if not items:
+            return
+        self.not_full.acquire()
+        try:
+            first_element_before_insertion = self.queue[0] if self.queue else None
+            self.queue.extend(items)
+            heapq.heapify(self.queue)
+            self.unfinished_tasks += len(items)
+            self.not_empty.notify_all()
+            if first_element_before_insertion != self.queue[0]:
+                self.first_element_changed.notify()
+        finally:
+            self.not_full.release()
+
     def get_next_element_when_ready(self):
         self.first_element_changed.acquire()
         try:
             isNotReady = True
             while isNotReady:
                 if self._qsize() > 0:
-                    first_element = heapq.nsmallest(1, self.queue)[0]
+                    first_element = self.queue[0]
                     timeout = (first_element.get_next_run_time() - getUTCmillis()) / 1000.0
                     log.info("Waiting on acquired first_element_changed LOCK for: " + str(timeout))
                     self.first_element_changed.wait(timeout)
                 else:
                     self.first_element_changed.wait()
-                    first_element = heapq.nsmallest(1, self.queue)[0]
+                    first_element = self.queue[0]
                 if (first_element.get_next_run_time() - getUTCmillis()) <= 0:
                     isNotReady = False
                     first_element = self._get()
@@ -132,9 +158,76 @@ class SendThread(Thread):
         global send_queue
         while True:
             log.info("Waiting to send...")
-            matric = send_queue.get()
-            log.info("Got item in send_queue:" + str(matric))
-            matric.send_data()
+            send_batch(next_batch(send_queue))
+
+def next_batch(queue):
+    """ Waits for a metric in `queue` and returns it together with those that
+        arrive within SEND_BATCH_LINGER_SEC of it, at most SEND_BATCH_MAX_SIZE
+        metrics. The batch closes once the linger time is over, however
+        steadily further metrics arrive.
+
+    """
+    matric = queue.get()
+    log.info("Got item in send_queue:" + str(matric))
+    batch = [matric]
+    deadline = _time() + SEND_BATCH_LINGER_SEC
+    try:
+        while len(batch) < SEND_BATCH_MAX_SIZE:
+            remaining = deadline - _time()
+            if remaining <= 0:
+                break
+            batch.append(queue.get(timeout=remaining))
+    except Empty:
+        pass
+    return batch
+
+def send_batch(metrics):
+    """ Publishes the values of several metrics, handing all metrics of the
+        same data center component to it in a single publish_batch call.
+
+    """
+    batches = []
+    by_dcc = {}
+    seen = set()
+    for metric in metrics:
+        if id(metric) in seen or not metric.values:
+            continue
+        seen.add(id(metric))
+        dcc = metric.data_center_component
+        if id(dcc) not in by_dcc:
+            by_dcc[id(dcc)] = []
+            batches.append((dcc, by_dcc[id(dcc)]))
+        by_dcc[id(dcc)].append(metric)
+    for dcc, ready in batches:
+        try:
+            dcc.publish_batch(dcc.apply_transforms(ready) if getattr(dcc, "transforms", None) else ready)
+        except Exception:
+            log.exception("Error while publishing batch of {0} metrics".format(len(ready)))
+            continue
+        for metric in ready:
+            metric.clear_values()
+
+def check_transform(transform, data_center_component):
+    """ Raises ValueError if `transform` produces values which
+        `data_center_component` cannot publish.
+
+    """
+    if getattr(transform, "structured_output", False) and \
+            not getattr(data_center_component, "carries_structured_values", False):
+        raise ValueError("{0} cannot publish the values of {1}, which are not all numbers".format(
+            type(data_center_component).__name__, type(transform).__name__))
+
+def start_collecting(metrics):
+    """ Starts collecting several metrics or sampler groups, e.g. all
+        metrics of a gateway, scheduling them in one go.
+
+    """
+    initialize()
+    global event_ds
+    now = getUTCmillis()
+    for metric in metrics:
+        metric.next_run_time = now + (metric.sampling_interval_sec * 1000)
+    event_ds.put_all_and_notify(metrics)
 
 class CollectionThread(Thread):
     def __init__(self):
@@ -143,20 +236,30 @@ class CollectionThread(Thread):
         self.start()
 
     def run(self):
-        global event_ds
         global collect_queue
-        global send_queue
         while True:
-            matric = collect_queue.get()
-            log.info("Collecting stats for matric:" + str(matric))
-            try:
-                matric.collect()
-                matric.set_next_run_time()
-                event_ds.put_and_notify(matric)
-                if matric.is_ready_to_send():
-                    send_queue.put(matric)
-            except Exception as e:
-                log.error(e)
+            collect_and_reschedule(collect_queue.get())
+
+def collect_and_reschedule(matric):
+    """ Collects `matric`, schedules its next collection and queues what is
+        ready to send. Failed collections are retried at the next sampling
+        interval.
+
+    """
+    global event_ds
+    global send_queue
+    log.info("Collecting stats for matric:" + str(matric))
+    try:
+        matric.collect()
+    except Exception as e:
+        log.error(e)
+    try:
+        matric.set_next_run_time()
+        event_ds.put_and_notify(matric)
+        for ready in matric.get_ready_to_send():
+            send_queue.put(ready)
+    except Exception as e:
+        log.error(e)
 
 class CollectionThreadPool:
     def __init__(self, num_threads):
@@ -202,6 +305,9 @@ class Metric(object):
             self.current_aggregation_size = 0
             self.sampling_function = sampling_function
             self.values = []
+            self.bindings = []
+            self.transforms = []
+            self.next_run_time = None
 
         def __str__(self, *args, **kwargs):
             return str(self.details) + ":" + str(self.next_run_time)
@@ -209,12 +315,66 @@ class Metric(object):
         def __cmp__(self, other):
             if other == None:
                 return -1
-            if not isinstance(other, Metric):
+            if not isinstance(other, (Metric, SamplerGroup)):
                 return -1
             return cmp(self.next_run_time, other.next_run_time)
 
         def write_full(self, t, v):
-            self.values.append((t, v))
+            sample = (t, v)
+            self.values.append(sample)
+            for binding in self.bindings:
+                binding.add(sample)
+
+        def bind(self, data_center_component, registered_gw, details=None, unit=None, aggregation_size=None,
+                 max_buffered=1000):
+            """ Also publishes the samples of this metric to another data
+                center component, without sampling again. Details, unit and
+                aggregation_size default to those of the metric.
+
+            """
+            if details is None:
+                details = self.details
+            if unit is None:
+                unit = self.unit
+            if aggregation_size is None:
+                aggregation_size = self.aggregation_size
+            data_center_component.publish_unit(registered_gw, details, unit)
+            binding = MetricBinding(self, registered_gw.resource, details, unit, aggregation_size,
+                                    data_center_component, max_buffered)
+            self.bindings.append(binding)
+            return binding
+
+        def add_transform(self, transform):
+            """ Passes the samples of this metric through `transform` (see
+                liota.transformers) before they are sent. Transforms are
+                applied in the order they are added; the series of the metric
+                goes through each of them, while the series they derive from it
+                are sent as they are. Bindings still get the raw samples.
+
+            """
+            check_transform(transform, self.data_center_component)
+            self.transforms.append(transform)
+            return transform
+
+        def apply_transforms(self):
+            """ Takes the samples of this metric through its transforms, and
+                returns the resulting series to be sent instead of the metric.
+
+            """
+            samples = self.values[:]
+            self.clear_values()
+            derived = []
+            for transform in self.transforms:
+                outputs = transform.process(self.details, samples)
+                samples = []
+                for details, values in outputs:
+                    if details == self.details:
+                        samples = values
+                    elif values:
+                        derived.append(DerivedSeries(self, details, values))
+            if samples:
+                derived.insert(0, DerivedSeries(self, self.details, samples))
+            return derived
 
         def write_map_values(self, v):
             self.write_full(getUTCmillis(), v)
@@ -238,24 +398,232 @@ class Metric(object):
             log.debug("self.aggregation_size:" + str(self.aggregation_size))
             return self.current_aggregation_size >= self.aggregation_size
 
+        def get_ready_to_send(self):
+            """ Returns this metric and those of its bindings that are ready
+                to be sent.
+
+            """
+            ready = [binding for binding in self.bindings if binding.is_ready_to_send()]
+            if self.is_ready_to_send():
+                if self.transforms:
+                    ready[:0] = self.apply_transforms()
+                else:
+                    ready.insert(0, self)
+            return ready
+
         def collect(self):
             log.debug("Collecting values for the resource {0} ".format(self.details))
-            self.args_required = len(inspect.getargspec(self.sampling_function)[0])
+            # Decorated sampling functions, e.g. @cached ones, take the
+            # arguments of the function they wrap
+            fn = getattr(self.sampling_function, "__wrapped__", self.sampling_function)
+            self.args_required = len(inspect.getargspec(fn)[0])
             if self.args_required is not 0:
                 self.cal_value = self.sampling_function(1)
             else:
                 self.cal_value = self.sampling_function()
             log.info("{0} Sample Value: {1}".format(self.details, self.cal_value))
             log.debug("Size of the list {0}".format(len(self.values)))
-            self.write_map_values(self.cal_value)
+            self.add_sample(getUTCmillis(), self.cal_value)
+
+        def add_sample(self, t, v):
+            # Writes a sample that counts towards the aggregation_size
+            self.write_full(t, v)
             self.current_aggregation_size = self.current_aggregation_size + 1
+            for binding in self.bindings:
+                binding.current_aggregation_size = binding.current_aggregation_size + 1
 
-        def send_data(self):
-            log.info("Publishing values {0} for the resource {1} ".format(self.values, self.details))
-            if not self.values:
-                # No values measured since last report_data
-                return True
-            self.data_center_component.publish(self)
+        def clear_values(self):
             self.values[:] = []
             self.current_aggregation_size = 0
 
+
+class VectorMetric(Metric):
+        """ A metric whose samples are vectors of `length` numbers, e.g. the
+            axes of an accelerometer or the bins of a spectrum, instead of
+            one metric per element.
+
+            Samples are copied into a preallocated VectorBuffer; `values`
+            holds (timestamp, view of the row) pairs. At most `max_buffered`
+            samples are kept while they cannot be sent, by default four times
+            the aggregation_size; the oldest are dropped beyond that. Data
+            center components read the samples through columns() or rows().
+
+        """
+        def __init__(self, gw, details, unit, sampling_interval_sec, aggregation_size, sampling_function,
+                     data_center_component, length, typecode="d", max_buffered=None, use_numpy=None):
+            Metric.__init__(self, gw, details, unit, sampling_interval_sec, aggregation_size, sampling_function,
+                            data_center_component)
+            if max_buffered is None:
+                max_buffered = 4 * max(aggregation_size, 1)
+            self.vector_length = length
+            self.buffer = VectorBuffer(length, max_buffered, typecode, use_numpy)
+            # Row of the oldest sample in values
+            self.first_row = 0
+            self.dropped = 0
+
+        def bind(self, *args, **kwargs):
+            # Bindings would keep views of rows that are written again once
+            # this metric is sent
+            raise TypeError("Vector metrics cannot be bound to further data center components")
+
+        def add_transform(self, transform):
+            # Transforms work on single numbers, and are skipped for vector
+            # metrics by DataCenterComponent.apply_transforms
+            raise TypeError("Vector metrics cannot be transformed")
+
+        def write_full(self, t, v):
+            if len(self.values) == self.buffer.capacity:
+                del self.values[0]
+                self.first_row = (self.first_row + 1) % self.buffer.capacity
+                self.dropped += 1
+            row = (self.first_row + len(self.values)) % self.buffer.capacity
+            self.values.append((t, self.buffer.write(row, v)))
+
+        def columns(self, values=None):
+            """ Returns the timestamps and, per element, the list of its
+                values of the samples in `values`, all samples by default.
+
+            """
+            if values is None:
+                values = self.values[:]
+            return [t for t, _ in values], self.buffer.columns([v for _, v in values])
+
+        def rows(self, values=None):
+            """ Returns the timestamps and the vectors, as lists, of the
+                samples in `values`, all samples by default.
+
+            """
+            if values is None:
+                values = self.values[:]
+            return [t for t, _ in values], self.buffer.tolists([v for _, v in values])
+
+        def clear_values(self):
+            Metric.clear_values(self)
+            self.first_row = 0
+
+
+class SamplerGroup(object):
+        """ Several metrics sampled by one call, e.g. all CPU metrics read
+            from a single read of /proc/stat.
+
+            `sampling_function` returns a mapping or a sequence of values, and
+            every metric added with add(metric, key) gets value[key]. The group
+            is scheduled as one event every `sampling_interval_sec`, which
+            replaces the sampling interval of its metrics; the metrics are
+            started through the group, not on their own. Each metric is still
+            sent according to its own aggregation_size.
+
+        """
+        def __init__(self, sampling_function, sampling_interval_sec=10, name=None):
+            self.sampling_function = sampling_function
+            self.sampling_interval_sec = sampling_interval_sec
+            self.name = name if name is not None else getattr(sampling_function, "__name__", "SamplerGroup")
+            self.metrics = []
+            self.next_run_time = None
+
+        def __str__(self, *args, **kwargs):
+            return str(self.name) + ":" + str(self.next_run_time)
+
+        def __cmp__(self, other):
+            if other == None:
+                return -1
+            if not isinstance(other, (Metric, SamplerGroup)):
+                return -1
+            return cmp(self.next_run_time, other.next_run_time)
+
+        def add(self, metric, key):
+            metric.sampling_interval_sec = self.sampling_interval_sec
+            self.metrics.append((key, metric))
+            return metric
+
+        def get_next_run_time(self):
+            return self.next_run_time
+
+        def set_next_run_time(self):
+            self.next_run_time = self.next_run_time + (self.sampling_interval_sec * 1000)
+            log.info("Set next run time to:" + str(self.next_run_time))
+
+        def start_collecting(self):
+            initialize()
+            global event_ds
+            self.next_run_time = getUTCmillis() + (self.sampling_interval_sec * 1000)
+            event_ds.put_and_notify(self)
+
+        def collect(self):
+            log.debug("Collecting values for the sampler group {0}".format(self.name))
+            values = self.sampling_function()
+            t = getUTCmillis()
+            for key, metric in self.metrics:
+                try:
+                    value = values[key]
+                except (KeyError, IndexError, TypeError):
+                    log.error("Sampler group {0} returned no value for {1}".format(self.name, key))
+                    continue
+                metric.add_sample(t, value)
+
+        def get_ready_to_send(self):
+            ready = []
+            for _, metric in self.metrics:
+                ready.extend(metric.get_ready_to_send())
+            return ready
+
+class MetricBinding(object):
+        """ A further data center component the samples of a metric are
+            published to.
+
+            The samples are shared with the metric, so the sensor is read once
+            for all data center components, but every binding buffers them on
+            its own and is sent when its own aggregation_size is reached. A
+            data center component that fails to publish only holds back its
+            own samples, at most `max_buffered` of them; the oldest are
+            dropped beyond that.
+
+        """
+        def __init__(self, metric, gw, details, unit, aggregation_size, data_center_component, max_buffered=1000):
+            self.metric = metric
+            self.data_center_component = data_center_component
+            self.gw = gw
+            self.details = details
+            self.unit = unit
+            self.sampling_interval_sec = metric.sampling_interval_sec
+            self.aggregation_size = aggregation_size
+            self.current_aggregation_size = 0
+            self.max_buffered = max_buffered
+            self.values = []
+            self.dropped = 0
+
+        def __str__(self, *args, **kwargs):
+            return str(self.details) + "@" + str(self.metric)
+
+        def add(self, sample):
+            self.values.append(sample)
+            if len(self.values) > self.max_buffered:
+                del self.values[0]
+                self.dropped += 1
+
+        def is_ready_to_send(self):
+            return self.current_aggregation_size >= self.aggregation_size
+
+        def clear_values(self):
+            self.values[:] = []
+            self.current_aggregation_size = 0
+
+
+class DerivedSeries(object):
+        """ Samples computed by the transforms of a metric, sent to the data
+            center component of the metric under their own details.
+
+        """
+        def __init__(self, metric, details, values):
+            self.metric = metric
+            self.data_center_component = metric.data_center_component
+            self.gw = metric.gw
+            self.details = details
+            self.unit = metric.unit
+            self.values = values
+
+        def __str__(self, *args, **kwargs):
+            return str(self.details) + "<" + str(self.metric)
+
+        def clear_values(self):
+            self.values = []
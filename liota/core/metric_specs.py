@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import importlib
+import json
+import logging
+
+log = logging.getLogger(__name__)
+
+#---------------------------------------------------------------------------
+# Declarative metric specs for DataCenterComponent.create_metrics. A spec is
+# a dict with the arguments of create_metric:
+#
+#   {"details": "cpu.temperature", "unit": "degC", "sampling_function": "mymodule.read_temperature",
+#    "sampling_interval_sec": 10, "aggregation_size": 6}
+#
+# Units are pint units, or their pint names. A spec file is a JSON list of
+# such dicts, in which sampling functions are named by their dotted path.
+
+METRIC_SPEC_DEFAULTS = {
+    "unit": None,
+    "sampling_interval_sec": 10,
+    "aggregation_size": 6
+}
+
+ureg = None
+# pint name -> unit, as parsing is slow
+units = {}
+
+
+def load_metric_specs(path, functions=None):
+    """ Reads the metric specs of file `path`. Sampling functions are looked
+        up in dict `functions` first, and imported otherwise.
+
+    """
+    with open(path) as f:
+        specs = json.load(f)
+    if not isinstance(specs, list):
+        raise ValueError("Metric spec file {0} must hold a list of specs".format(path))
+    resolved = {}
+    for spec in specs:
+        name = spec.get("sampling_function")
+        if isinstance(name, basestring):
+            if name not in resolved:
+                resolved[name] = resolve_function(name, functions)
+            spec["sampling_function"] = resolved[name]
+    log.info("Loaded {0} metric specs from {1}".format(len(specs), path))
+    return specs
+
+
+def resolve_function(name, functions=None):
+    if functions is not None and name in functions:
+        return functions[name]
+    module_name, _, function_name = name.rpartition(".")
+    if not module_name:
+        raise ValueError("Unknown sampling function {0}".format(name))
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def parse_unit_name(name):
+    global ureg
+    if name not in units:
+        if ureg is None:
+            import pint
+            ureg = pint.UnitRegistry()
+        units[name] = ureg.parse_units(name)
+    return units[name]
+
+
+def normalize_spec(spec):
+    """ Returns the spec with defaults filled in and a unit given by its name
+        parsed, checking that the required keys are present.
+
+    """
+    for key in ("details", "sampling_function"):
+        if key not in spec:
+            raise ValueError("Metric spec {0} lacks '{1}'".format(spec, key))
+    normalized = dict(METRIC_SPEC_DEFAULTS)
+    normalized.update(spec)
+    if isinstance(normalized["unit"], basestring):
+        normalized["unit"] = parse_unit_name(normalized["unit"])
+    return normalized
@@ -31,7 +31,9 @@
 # ----------------------------------------------------------------------------#
 
 from abc import ABCMeta, abstractmethod
-from liota.core.metric_handler import Metric
+from liota.core import metric_handler
+from liota.core.metric_handler import DerivedSeries, Metric, VectorMetric, check_transform
+from liota.core.metric_specs import load_metric_specs, normalize_spec
 
 
 class DataCenterComponent:
@@ -41,13 +43,55 @@ class DataCenterComponent:
     """
     __metaclass__ = ABCMeta
 
+    # Transforms applied to every metric published, see add_transform
+    transforms = ()
+
+    # Whether values other than numbers, e.g. the dicts of quantile
+    # sketches, can be published
+    carries_structured_values = False
+
     def connect_soc(self, protocol, url, user_name, password):
         pass
 
+    def add_transform(self, transform):
+        """ Passes the samples of every metric sent to this data center
+            component through `transform` (see liota.transformers), e.g. to
+            downsample them for this data center only. The same transform
+            sees the samples of all metrics, so it must not keep state from
+            one call to the next.
+
+        """
+        check_transform(transform, self)
+        self.transforms = list(self.transforms) + [transform]
+        return transform
+
+    def apply_transforms(self, metrics):
+        """ Returns the series to publish instead of `metrics`, whose values
+            are left as they are.
+
+        """
+        series = []
+        for metric in metrics:
+            if getattr(metric, "vector_length", None) is not None:
+                # The values of vector metrics are views of their buffer
+                series.append(metric)
+                continue
+            outputs = [(metric.details, metric.values[:])]
+            for transform in self.transforms:
+                outputs = [output for details, values in outputs for output in transform.process(details, values)]
+            series.extend(DerivedSeries(metric, details, values) for details, values in outputs if values)
+        return series
+
     @abstractmethod
     def publish(self, metric):
         pass
 
+    def publish_batch(self, metrics):
+        # Data center components that can send several metrics in one
+        # message override this; by default each metric is published alone.
+        for metric in metrics:
+            self.publish(metric)
+
     @abstractmethod
     def subscribe(self):
         pass
@@ -56,5 +100,41 @@ class DataCenterComponent:
         self.publish_unit(gw, details, unit)
         return Metric(gw.resource, details, unit, sampling_interval_sec, aggregation_size, sampling_function, self)
 
+    def create_vector_metric(self, gw, details, unit, sampling_function, length, sampling_interval_sec=10,
+                             aggregation_size=6, typecode="d"):
+        """ Creates a metric whose sampling function returns a sequence of
+            `length` numbers (see VectorMetric).
+
+        """
+        self.publish_unit(gw, details, unit)
+        return VectorMetric(gw.resource, details, unit, sampling_interval_sec, aggregation_size, sampling_function,
+                            self, length, typecode)
+
+    def create_metrics(self, gw, specs, start_collecting=False):
+        """ Creates the metrics of a list of specs, or of a spec file (see
+            liota.core.metric_specs), publishing all their units together.
+            With `start_collecting` all of them are scheduled at once.
+
+        """
+        if isinstance(specs, basestring):
+            specs = load_metric_specs(specs)
+        metrics = []
+        units = []
+        for spec in specs:
+            spec = normalize_spec(spec)
+            metrics.append(Metric(gw.resource, spec["details"], spec["unit"], spec["sampling_interval_sec"],
+                                  spec["aggregation_size"], spec["sampling_function"], self))
+            units.append((spec["details"], spec["unit"]))
+        self.publish_units(gw, units)
+        if start_collecting:
+            metric_handler.start_collecting(metrics)
+        return metrics
+
     def publish_unit(self, registered_gw, metric_name, unit):
         pass
+
+    def publish_units(self, registered_gw, units):
+        # Data center components that can publish several units in one
+        # message override this
+        for metric_name, unit in units:
+            self.publish_unit(registered_gw, metric_name, unit)
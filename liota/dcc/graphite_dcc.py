@@ -31,25 +31,92 @@
 # ----------------------------------------------------------------------------#
 
 import logging
+from Queue import Queue, Empty
 import threading
 import time
 
 from liota.dcc.dcc_base import DataCenterComponent
+from liota.utilities.concurrency import Future
+from liota.utilities.hash_ring import ConsistentHashRing
 
 log = logging.getLogger(__name__)
 
 class Graphite(DataCenterComponent):
+    """ Graphite data center component.
 
-    def __init__(self, socket_obj):
+        `socket_obj` is either a single Socket or a list of Socket endpoints
+        (e.g. several carbon relays). With more than one endpoint, metric
+        paths are spread across the endpoints by consistent hashing and
+        every endpoint is flushed by its own writer thread, so a slow relay
+        only delays the metrics of its own shard.
+
+        An endpoint may also be a SocketPool, in which case the metric path
+        is used to pick one of its parallel connections.
+
+        Element i of a VectorMetric is sent as the metric path <details>.<i>.
+
+    """
+    def __init__(self, socket_obj, replicas=100):
         self.con = socket_obj
-        pass
+        if isinstance(socket_obj, (list, tuple)):
+            endpoints = list(socket_obj)
+        elif socket_obj is None:
+            endpoints = []
+        else:
+            endpoints = [socket_obj]
+        if socket_obj is not None and not endpoints:
+            raise ValueError("Graphite needs at least one endpoint")
+        self.shards = {}
+        for con in endpoints:
+            name = "%s:%s" % (con.carbon_server, con.carbon_port)
+            if name in self.shards:
+                name = "%s#%d" % (name, len(self.shards))
+            # A pooled endpoint already writes from its own threads
+            threaded = len(endpoints) > 1 and getattr(con, "pool_size", 1) == 1
+            self.shards[name] = self.GraphiteShard(name, con, threaded)
+        self.ring = ConsistentHashRing(sorted(self.shards.keys()), replicas)
 
     def publish(self, metric):
         if self.con is not None:
-            for t,v in metric.values:
-                message = '%s %s %d\n' % (metric.details , v, t/1000) # Graphite expects time in seconds, not milliseconds. Hence, dividing by 1000
-                log.info("Sending message: {0}".format(message))
-                self.con.send(message)
+            lines = self._format(metric)
+            shard = self.shards[self.ring.get_node(metric.details)]
+            shard.send(''.join(lines), len(lines), metric.details)
+
+    def publish_batch(self, metrics):
+        if self.con is None:
+            return
+        # Lines of all metrics of a shard are written in one send
+        by_shard = {}
+        for metric in metrics:
+            shard = self.shards[self.ring.get_node(metric.details)]
+            if getattr(shard.con, "pool_size", 1) > 1:
+                # Pooled endpoints need the metric path to keep per-metric ordering
+                lines = self._format(metric)
+                shard.send(''.join(lines), len(lines), metric.details)
+            else:
+                by_shard.setdefault(shard, []).extend(self._format(metric))
+        for shard, lines in by_shard.items():
+            shard.send(''.join(lines), len(lines))
+
+    def _format(self, metric):
+        if getattr(metric, "vector_length", None) is not None:
+            return self._format_vector(metric)
+        lines = []
+        for t,v in metric.values:
+            message = '%s %s %d\n' % (metric.details , v, t/1000) # Graphite expects time in seconds, not milliseconds. Hence, dividing by 1000
+            log.info("Sending message: {0}".format(message))
+            lines.append(message)
+        return lines
+
+    def _format_vector(self, metric):
+        # Element i of a vector metric is the series <details>.<i>
+        timestamps, columns = metric.columns()
+        seconds = [t / 1000 for t in timestamps]
+        lines = []
+        for i, column in enumerate(columns):
+            path = '%s.%d' % (metric.details, i)
+            lines.extend(['%s %s %d\n' % (path, v, t) for t, v in zip(seconds, column)])
+        return lines
 
     def subscribe(self):
         pass
@@ -58,8 +125,88 @@ class Graphite(DataCenterComponent):
         graphite_res = self.GraphiteGateway(gw, True)
         return graphite_res
 
+    def get_stats(self):
+        """ Returns the throughput statistics of every endpoint, keyed by
+            endpoint name, to verify how evenly metrics are balanced.
+
+        """
+        return dict((name, shard.get_stats()) for name, shard in self.shards.items())
+
     class GraphiteGateway:
         def __init__(self, gw, registered=False):
             self.resource = gw
             self.registered = registered
 
+    class GraphiteShard:
+        """ A single persistent connection to a carbon endpoint together
+            with its throughput counters.
+
+        """
+        def __init__(self, name, con, threaded=False):
+            self.name = name
+            self.con = con
+            self.lock = threading.Lock()
+            self.start_time = time.time()
+            self.messages = 0
+            self.bytes = 0
+            self.flushes = 0
+            self.errors = 0
+            self.queue = None
+            if threaded:
+                self.queue = Queue()
+                thread = threading.Thread(target=self._run, name="GraphiteShard-" + name)
+                thread.daemon = True
+                thread.start()
+
+        def send(self, payload, count, key=None):
+            if self.queue is None:
+                self._flush(payload, count, key)
+            else:
+                self.queue.put((payload, count))
+
+        def _run(self):
+            while True:
+                payloads = [self.queue.get()]
+                # Coalesce whatever else is already queued for this endpoint
+                # into a single write.
+                try:
+                    while True:
+                        payloads.append(self.queue.get_nowait())
+                except Empty:
+                    pass
+                try:
+                    self._flush(''.join(p for p, _ in payloads), sum(c for _, c in payloads))
+                except Exception:
+                    log.exception("Error while flushing Graphite endpoint {0}".format(self.name))
+
+        def _flush(self, payload, count, key=None):
+            sent = self.con.send(payload, key)
+            if isinstance(sent, Future):
+                # A pooled endpoint completes the write on one of its lanes
+                sent.add_done_callback(lambda future: self._count(future.result(), payload, count))
+            else:
+                self._count(sent, payload, count)
+
+        def _count(self, sent, payload, count):
+            with self.lock:
+                self.flushes += 1
+                if sent is False:
+                    self.errors += count
+                else:
+                    self.messages += count
+                    self.bytes += len(payload)
+
+        def get_stats(self):
+            with self.lock:
+                elapsed = max(time.time() - self.start_time, 1e-6)
+                stats = {
+                    "messages": self.messages,
+                    "bytes": self.bytes,
+                    "flushes": self.flushes,
+                    "errors": self.errors,
+                    "pending": self.queue.qsize() if self.queue is not None else 0,
+                    "messages_per_sec": self.messages / elapsed
+                }
+            if hasattr(self.con, "get_stats"):
+                stats["connections"] = self.con.get_stats()
+            return stats
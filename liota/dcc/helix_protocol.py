@@ -32,6 +32,7 @@
 
 import logging
 
+from liota.transports.web_socket import PRIORITY_SESSION
 from liota.utilities.utility import getUTCmillis
 
 
@@ -86,10 +87,14 @@ class HelixProtocol:
 
    """
 
-   def __init__(self, con, user, password):
+   def __init__(self, con, user, password, executor=None):
       self.con = con
       self.user = user
       self.password = password
+      # Runs action handlers off the receiving thread, if given
+      self.executor = executor
+      # resource uuid -> handler with on_change(value)
+      self.action_map = {}
       # `HandshakeAwaitingState.__init__` may be using `self.state`,
       # so initialize it.
       self.state = None
@@ -104,6 +109,13 @@ class HelixProtocol:
             + " during " + self.state.name)
          log.error("Unexpected Message {0}", msg["type"])
 
+   def reset(self):
+      """ Starts over with the handshake, e.g. on a new connection.
+
+      """
+      self.state = None
+      self.state = HandshakeAwaitingState(None, self)
+
    def transition(self, state):
       self.state = state
 
@@ -153,7 +165,7 @@ class HandshakeRequestedState(State):
             "username" : self.user,
             "password": self.password
          }
-      })
+      }, PRIORITY_SESSION)
 
    def on_receive(self, msg):
       log.debug("Received message in HandshakeRequestedState: {0}".format(msg))
@@ -210,7 +222,7 @@ class SteadyState(State):
    def __init__(self, previous, proto=None):
       State.__init__(self, previous, proto)
       self.name = "SteadyState"
-      self.action_map = {}
+      self.action_map = self.proto.action_map
       log.info("Entered steady state")
 
    def trigger_action(self, uuid, value):
@@ -219,7 +231,11 @@ class SteadyState(State):
          pass
       else:
          handler = self.action_map[uuid]
-         handler.on_change(value)
+         if self.proto.executor is not None:
+            # Actions of one resource must not overtake each other
+            self.proto.executor.submit_ordered(uuid, handler.on_change, value)
+         else:
+            handler.on_change(value)
 
    def on_receive(self, msg):
     log.info("IN ON_RECEIVE")
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+from collections import deque
+import logging
+import threading
+import time
+
+from liota.dcc.dcc_base import DataCenterComponent
+from liota.utilities import serializer
+from liota.utilities.si_unit import parse_unit
+
+log = logging.getLogger(__name__)
+
+
+class MqttDcc(DataCenterComponent):
+    """ MQTT data center component.
+
+        The samples of a metric are published to the topic
+        `<topic_prefix>/<gateway name>/<metric name>`. Samples are buffered
+        per topic and sent as one compact payload, {"t": [timestamps],
+        "v": [values]}, once `batch_size` samples are buffered or the oldest
+        of them has waited `batch_delay` seconds. The unit of a metric is
+        published retained to `<topic>/unit`. The values of a VectorMetric
+        are lists.
+
+        Blocks of a HighRateSampler, sampled at a fixed period, are sent as
+        they come, one payload per block with implicit timestamps:
+        {"t0": first timestamp, "dt": period in ms, "v": [values]}.
+
+        `con` is an Mqtt transport; it bounds the messages in flight and
+        queues the rest while the broker is unreachable.
+
+    """
+    # Payloads are JSON, so values may be any JSON value
+    carries_structured_values = True
+
+    def __init__(self, con, topic_prefix="liota", batch_size=100, batch_delay=1.0, qos=1):
+        self.con = con
+        self.topic_prefix = topic_prefix
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.qos = qos
+        self.condition = threading.Condition()
+        # topic -> TopicBatch buffering its samples
+        self.batches = {}
+        # (deadline, topic, batch) in the order batches were started
+        self.deadlines = deque()
+        self.payloads = 0
+        self.samples = 0
+        thread = threading.Thread(target=self._flush_loop, name="MqttDccBatcher")
+        thread.daemon = True
+        thread.start()
+
+    def register(self, gw):
+        return self.MqttGateway(gw, True)
+
+    def subscribe(self):
+        pass
+
+    def topic(self, gw, metric_name):
+        return "%s/%s/%s" % (self.topic_prefix, gw.res_name, metric_name)
+
+    def publish(self, metric):
+        self.publish_batch([metric])
+
+    def publish_batch(self, metrics):
+        full = []
+        blocks = []
+        with self.condition:
+            for metric in metrics:
+                topic = self.topic(metric.gw, metric.details)
+                if getattr(metric, "blocks", None) is not None:
+                    blocks.extend((topic, block) for block in metric.blocks)
+                    continue
+                batch = self.batches.get(topic)
+                if batch is None:
+                    batch = self.batches[topic] = self.TopicBatch()
+                    if not self.deadlines:
+                        self.condition.notify()
+                    self.deadlines.append((time.time() + self.batch_delay, topic, batch))
+                if getattr(metric, "vector_length", None) is not None:
+                    timestamps, values = metric.rows()
+                    batch.timestamps.extend(timestamps)
+                    batch.values.extend(values)
+                else:
+                    for t, v in metric.values:
+                        batch.timestamps.append(t)
+                        batch.values.append(v)
+                if len(batch.values) >= self.batch_size:
+                    del self.batches[topic]
+                    full.append((topic, batch))
+        for topic, batch in full:
+            self._send(topic, batch)
+        for topic, block in blocks:
+            self._send_block(topic, block)
+
+    def publish_unit(self, registered_gw, metric_name, unit):
+        str_prefix, str_unit_name = parse_unit(unit)
+        if not isinstance(str_unit_name, basestring):
+            str_unit_name = ""
+        if not isinstance(str_prefix, basestring):
+            str_prefix = ""
+        payload = serializer.dumps({"unit": str_unit_name, "prefix": str_prefix})
+        self.con.publish(self.topic(registered_gw.resource, metric_name) + "/unit", payload, self.qos, retain=True)
+
+    def flush(self):
+        """ Sends every buffered sample right away.
+
+        """
+        with self.condition:
+            batches, self.batches = self.batches, {}
+            self.deadlines.clear()
+        for topic, batch in batches.items():
+            self._send(topic, batch)
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                "payloads": self.payloads,
+                "samples": self.samples,
+                "buffered_topics": len(self.batches),
+                "samples_per_payload": float(self.samples) / max(self.payloads, 1)
+            }
+
+    def _send(self, topic, batch):
+        payload = serializer.dumps({"t": batch.timestamps, "v": batch.values})
+        with self.condition:
+            self.payloads += 1
+            self.samples += len(batch.values)
+        self.con.publish(topic, payload, self.qos)
+
+    def _send_block(self, topic, block):
+        payload = serializer.dumps({"t0": block.start_ms, "dt": block.period_ms, "v": list(block.values)})
+        with self.condition:
+            self.payloads += 1
+            self.samples += len(block)
+        self.con.publish(topic, payload, self.qos)
+
+    def _flush_loop(self):
+        while True:
+            due = []
+            with self.condition:
+                while not self.deadlines:
+                    self.condition.wait()
+                now = time.time()
+                # batch_delay is the same for every batch, so deadlines are in order
+                while self.deadlines and self.deadlines[0][0] <= now:
+                    _, topic, batch = self.deadlines.popleft()
+                    # Skip batches already sent because they were full
+                    if self.batches.get(topic) is batch:
+                        del self.batches[topic]
+                        due.append((topic, batch))
+                if not due and self.deadlines:
+                    self.condition.wait(self.deadlines[0][0] - now)
+            for topic, batch in due:
+                self._send(topic, batch)
+
+    class MqttGateway:
+        def __init__(self, gw, registered=False):
+            self.resource = gw
+            self.registered = registered
+
+    class TopicBatch:
+        def __init__(self):
+            self.timestamps = []
+            self.values = []
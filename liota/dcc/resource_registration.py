@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+from collections import deque
+import heapq
+import logging
+import random
+import threading
+import time
+
+from liota.utilities.concurrency import Future
+
+log = logging.getLogger(__name__)
+
+
+class RegistrationPipeline:
+    """ Registers many resources concurrently over one connection.
+
+        Up to `max_in_flight` create_or_find_resource_requests are outstanding
+        at a time; responses are matched to their request by transactionID.
+        A resource the DCC has not created yet (uuid "null") is polled again
+        with an exponentially growing, jittered backoff, instead of blocking
+        the connection while it waits. The first poll is delayed by the
+        average time the DCC took to create the previous resources.
+        Requests without a response after `response_timeout` seconds are
+        sent again. Responses are delivered by the connection's receiving
+        thread through the Future of each request.
+
+        submit() returns a Future per resource which completes with the uuid
+        assigned by the DCC.
+
+    """
+    def __init__(self, con, make_request, max_in_flight=64, initial_backoff=0.5,
+                 max_backoff=30.0, response_timeout=30.0):
+        self.con = con
+        self.make_request = make_request
+        self.max_in_flight = max_in_flight
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.response_timeout = response_timeout
+        self.condition = threading.Condition()
+        # transactionID -> (registration, time sent)
+        self.in_flight = {}
+        self.ready = deque()
+        # heap of (time due, sequence, registration) waiting for their next poll
+        self.backoff = []
+        self.sequence = 0
+        # moving average of the time between the first "null" response and the uuid
+        self.creation_estimate = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="RegistrationPipeline")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, gw):
+        registration = self.Registration(gw, self.initial_backoff)
+        with self.condition:
+            self.ready.append(registration)
+            self.condition.notify()
+        return registration.future
+
+    def pending(self):
+        with self.condition:
+            return len(self.ready) + len(self.backoff) + len(self.in_flight)
+
+    def close(self):
+        """ Stops sending requests; those in flight are not waited for.
+
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+    def _on_response(self, msg_id, response):
+        if response.exception() is None:
+            self.on_response(response.result())
+            return
+        # The connection was lost before the response; send it again
+        with self.condition:
+            entry = self.in_flight.pop(msg_id, None)
+            if entry is not None:
+                self.ready.appendleft(entry[0])
+                self.condition.notify()
+
+    def on_response(self, msg):
+        """ Handles a create_or_find_resource_response; returns False if it
+            does not belong to a request of this pipeline.
+
+        """
+        with self.condition:
+            entry = self.in_flight.pop(msg.get("transactionID"), None)
+            if entry is None:
+                return False
+            registration, _ = entry
+            res_uuid = msg["body"]["uuid"]
+            if res_uuid == "null":
+                if registration.first_pending is None:
+                    registration.first_pending = time.time()
+                    if self.creation_estimate is not None:
+                        registration.backoff = min(max(registration.backoff, self.creation_estimate), self.max_backoff)
+                delay = registration.next_backoff(self.max_backoff)
+                log.info("Waiting for resource creation of {0}, polling again in {1:.1f}s".format(
+                    registration.gw.res_name, delay))
+                self._schedule(registration, time.time() + delay)
+            elif registration.first_pending is not None:
+                elapsed = time.time() - registration.first_pending
+                if self.creation_estimate is None:
+                    self.creation_estimate = elapsed
+                else:
+                    self.creation_estimate = 0.8 * self.creation_estimate + 0.2 * elapsed
+            self.condition.notify()
+        if res_uuid != "null":
+            log.info("FOUND RESOURCE: {0}".format(res_uuid))
+            registration.future.set_result(res_uuid)
+        return True
+
+    def _schedule(self, registration, due):
+        self.sequence += 1
+        heapq.heappush(self.backoff, (due, self.sequence, registration))
+
+    def _run(self):
+        while True:
+            to_send = []
+            timed_out = []
+            with self.condition:
+                if self.closed:
+                    return
+                now = time.time()
+                while self.backoff and self.backoff[0][0] <= now:
+                    self.ready.append(heapq.heappop(self.backoff)[2])
+                for msg_id, (registration, sent) in self.in_flight.items():
+                    if now - sent > self.response_timeout:
+                        log.warn("No response for registration of {0}, sending again".format(registration.gw.res_name))
+                        del self.in_flight[msg_id]
+                        timed_out.append(msg_id)
+                        self.ready.appendleft(registration)
+                while self.ready and len(self.in_flight) < self.max_in_flight:
+                    registration = self.ready.popleft()
+                    msg_id = self.con.next_id()
+                    self.in_flight[msg_id] = (registration, now)
+                    to_send.append(self.make_request(msg_id, registration.gw))
+                if not to_send:
+                    timeout = self.response_timeout
+                    if self.backoff:
+                        timeout = min(timeout, self.backoff[0][0] - now)
+                    self.condition.wait(max(timeout, 0.01))
+            for msg_id in timed_out:
+                self.con.cancel(msg_id)
+            for msg in to_send:
+                try:
+                    self.con.request(msg).add_done_callback(
+                        lambda response, msg_id=msg["transactionID"]: self._on_response(msg_id, response))
+                except Exception:
+                    log.exception("Error while sending registration request")
+
+    class Registration:
+
+        def __init__(self, gw, backoff):
+            self.gw = gw
+            self.backoff = backoff
+            self.first_pending = None
+            self.future = Future()
+
+        def next_backoff(self, max_backoff):
+            delay = self.backoff * random.uniform(0.8, 1.2)
+            self.backoff = min(self.backoff * 2, max_backoff)
+            return delay
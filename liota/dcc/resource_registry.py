@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import ConfigParser
+import logging
+import threading
+
+from liota.utilities.journal import Journal
+from liota.utilities.utility import getUTCmillis, LiotaConfigPath, systemUUID
+
+log = logging.getLogger(__name__)
+
+
+class ResourceRegistry:
+    """ Durable local record of the resources registered with a DCC.
+
+        Entries are keyed by the resource identifier (systemUUID().get_uuid
+        of its name) and resource kind, and map to the uuid assigned by the
+        DCC and the uuid of the parent the relationship was created with.
+
+        Every update is appended to a Journal, so it survives a crash of the
+        process; a power loss may lose the updates of the last `sync_delay`
+        seconds, whose resources are then registered again. Once the journal
+        has grown well beyond the number of live entries it is compacted.
+
+        Earlier releases kept only the uuid of the gateway, in an INI file at
+        the same path; such a file is imported once and replaced.
+
+    """
+    def __init__(self, path, sync_delay=1.0):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.journal = Journal(path, sync_delay, "resource registry")
+        self._import_ini()
+        self.journal.load(self._apply)
+        log.info("Loaded {0} resources from registry {1}".format(len(self.entries), self.path))
+        if self.journal.records > 2 * len(self.entries) + 100:
+            self.compact()
+
+    @staticmethod
+    def from_config():
+        """ Opens the registry at `uuid_path` of liota.conf, or returns None
+            if it is not configured.
+
+        """
+        config = ConfigParser.RawConfigParser()
+        fullPath = LiotaConfigPath().get_liota_fullpath()
+        if fullPath == '' or config.read(fullPath) == []:
+            log.warn('liota.conf file missing, resource registry disabled')
+            return None
+        try:
+            uuid_path = config.get('UUID_PATH', 'uuid_path')
+        except (ConfigParser.NoSectionError, ConfigParser.NoOptionError):
+            log.warn('uuid_path not configured, resource registry disabled')
+            return None
+        try:
+            return ResourceRegistry(uuid_path)
+        except IOError:
+            log.exception('Could not open resource registry ' + uuid_path)
+            return None
+
+    def _import_ini(self):
+        try:
+            with open(self.path) as f:
+                if f.read(1) != "[":
+                    return
+        except IOError:
+            return
+        records = []
+        config = ConfigParser.RawConfigParser()
+        try:
+            config.read(self.path)
+        except ConfigParser.Error:
+            log.exception("Could not import {0}, replacing it".format(self.path))
+        else:
+            if config.has_section("GATEWAY"):
+                # Names were written in lower case, so a gateway named
+                # otherwise is registered again rather than found here
+                for name, res_uuid in config.items("GATEWAY"):
+                    records.append({
+                        "identifier": systemUUID().get_uuid(name),
+                        "kind": "HelixGateway",
+                        "name": name,
+                        "uuid": res_uuid,
+                        "parent": None,
+                        "updated": getUTCmillis()
+                    })
+        self.journal.compact(records)
+        log.info("Imported {0} gateway uuids from {1}".format(len(records), self.path))
+
+    def _key(self, identifier, res_kind):
+        return "%s|%s" % (identifier, res_kind)
+
+    def _apply(self, record):
+        self.entries[self._key(record["identifier"], record["kind"])] = record
+
+    def get(self, identifier, res_kind):
+        with self.lock:
+            return self.entries.get(self._key(identifier, res_kind))
+
+    def put(self, gw, parent_uuid=None):
+        """ Records the uuid of resource `gw`, and the uuid of the parent its
+            relationship was created with.
+
+        """
+        record = {
+            "identifier": gw.identifier,
+            "kind": gw.res_kind,
+            "name": gw.res_name,
+            "uuid": gw.res_uuid,
+            "parent": parent_uuid,
+            "updated": getUTCmillis()
+        }
+        with self.lock:
+            key = self._key(gw.identifier, gw.res_kind)
+            if parent_uuid is None and key in self.entries:
+                record["parent"] = self.entries[key].get("parent")
+            self.entries[key] = record
+            self.journal.append(record)
+
+    def close(self):
+        self.journal.close()
+
+    def compact(self):
+        with self.lock:
+            self.journal.compact(self.entries.values())
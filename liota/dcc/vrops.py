@@ -31,7 +31,6 @@
 # ----------------------------------------------------------------------------#
 
 import inspect
-import json
 import logging
 import sched, time
 import signal
@@ -39,109 +38,200 @@ from socket import timeout
 import sys
 import threading
 from time import timezone
-import ConfigParser
 
 from liota.dcc.dcc_base import DataCenterComponent
-from helix_protocol import HelixProtocol
+from helix_protocol import HelixProtocol, HelixProtocolError
+from liota.dcc.resource_registration import RegistrationPipeline
+from liota.dcc.resource_registry import ResourceRegistry
 from liota.core.metric_handler import Metric
-from liota.utilities.utility import getUTCmillis, LiotaConfigPath
+from liota.transports.web_socket import PRIORITY_DATA
+from liota.utilities.concurrency import Future, WorkerPool
+from liota.utilities import serializer
+from liota.utilities.serializer import Template
+from liota.utilities.utility import getUTCmillis
 from liota.utilities.si_unit import parse_unit
 
 
 log = logging.getLogger(__name__)
 
+_MISSING = object()
+
 class Vrops(DataCenterComponent):
     """ The implementation of vROPS cloud provider solution
 
     """
-    def __init__(self, username, password, con):
+    def __init__(self, username, password, con, max_frame_size=65536, max_registrations_in_flight=64, registry=None,
+                 action_workers=2, property_delay=0.1):
         log.info("Logging into DCC")
         self.con = con
+        self.max_frame_size = max_frame_size
+        # Property updates are collected per resource for property_delay
+        # seconds and sent together, leaving out values vROps has already
+        self.property_delay = property_delay
+        self.property_condition = threading.Condition()
+        self.pending_properties = {}
+        self.property_due = None
+        # res_uuid -> {propertyKey: value last acknowledged}
+        self.sent_properties = {}
+        # res_uuid -> {propertyKey: (sequence, value) sent but not
+        # acknowledged yet}, sequence counting the messages sent
+        self.unacked_properties = {}
+        self.property_sequence = 0
+        thread = threading.Thread(target=self._property_loop, name="VropsProperties")
+        thread.daemon = True
+        thread.start()
+        # Pre-serialized add_stats envelopes per resource uuid and
+        # metric_data entries per (resource uuid, statKey)
+        self.envelope_templates = {}
+        self.entry_templates = {}
         self.username = username
         self.password = password
-        self.proto = HelixProtocol(self.con, username, password)
+        # Action handlers run here, so they never block the receiving thread
+        self.action_executor = WorkerPool(action_workers, name="VropsAction")
+        self.proto = HelixProtocol(self.con, username, password, executor=self.action_executor)
         self.resource_uuid = "null"
-        def on_receive_safe(msg):
-            try:
-                log.debug("Received msg: {0}".format(msg))
-                json_msg = json.loads(msg)
-                self.proto.on_receive(json.loads(msg))
-                log.debug("Processed msg: {0}".format(json_msg["type"]))
-                if json_msg["type"] == "connection_verified":
-                    log.info("Verified")
-                    exit()
-            except Exception:
-                raise
-                log.exception("Error received on connecting to DCC instance. Please verify the credentials and try again.")
-
-        thread = threading.Thread(target=self.con.run)
-        self.con.on_receive = on_receive_safe
-        thread.daemon = True
-        thread.start()
-        thread.join()
+        # One receiving thread dispatches all messages of the connection;
+        # the handshake is driven by the protocol state machine, and runs
+        # again whenever the connection is reestablished
+        self.verified = Future()
+        self.con.default_handler = self._on_receive
+        self.con.add_handler("connection_verified", self._on_verified)
+        self.con.reconnect_handler = self._on_reconnect
+        self.con.start()
+        try:
+            self.verified.result()
+        except Exception:
+            log.exception("Error received on connecting to DCC instance. Please verify the credentials and try again.")
+            raise
         log.info("Logged in to DCC successfully")
 
+        # uuids of resources registered by earlier runs, see ResourceRegistry
+        self.registry = registry if registry is not None else ResourceRegistry.from_config()
+        # Registrations of all resources share the receiving thread
+        self.registrations = {}
+        self.registration_pipeline = RegistrationPipeline(self.con,
+            lambda msg_id, gw: self.registration(msg_id, gw.identifier, gw.res_name, gw.res_kind),
+            max_in_flight=max_registrations_in_flight)
+
+    def _on_verified(self, msg):
+        try:
+            self.proto.on_receive(msg)
+        except Exception, err:
+            log.exception("Handshake with DCC failed")
+            self.verified.set_exception(err)
+            return
+        log.info("Verified")
+        self.verified.set_result(True)
+        # Queued messages may go out now
+        self.con.release()
+
+    def _on_reconnect(self):
+        log.info("Reconnecting to DCC, the handshake will run again")
+        self.verified = Future()
+        self.proto.reset()
+
+    def _on_receive(self, msg):
+        try:
+            self.proto.on_receive(msg)
+        except HelixProtocolError:
+            log.exception("Error while processing message from DCC")
+            return
+        log.debug("Processed msg: {0}".format(msg["type"]))
+
     def register(self, gw):
         """ Register the objects
 
         """
-        if gw.res_uuid == None:
-            vrops_res = self.VropsResource(gw)
-            log.info("Creating resource")
-            log.info("Resource Name: {0}".format(gw.res_name))
-            def on_receive_safe(msg):
-                try:
-                    log.debug("Received msg: {0}".format(msg))
-                    if msg != "":
-                       json_msg = json.loads(msg)
-                       self.proto.on_receive(json.loads(msg))
-                       log.debug("Processed msg: {0}".format(json_msg["type"]))
-                       if json_msg["type"] == "create_or_find_resource_response" :
-                           if json_msg["body"]["uuid"] != "null":
-                               log.info("FOUND RESOURCE: {0}".format(json_msg["body"]["uuid"]))
-                               gw.res_uuid = json_msg["body"]["uuid"]
-                               vrops_res.registered = True
-                               exit()
-                           else:
-                               log.info("Waiting for resource creation")
-                               time.sleep(5)
-                               self.con.send(self.registration(self.con.next_id(), gw.identifier, gw.res_name, gw.res_kind))
-                except:
-                    raise
-            thread = threading.Thread(target=self.con.run)
-            self.con.on_receive = on_receive_safe
-            thread.daemon = True
-            thread.start()
-            self.con.send(self.registration(self.con.next_id(), gw.identifier, gw.res_name, gw.res_kind))
-            thread.join()
-            log.info("Resource Registered {0}".format(gw.res_name))
+        return self.register_async(gw).result()
+
+    def register_async(self, gw):
+        """ Starts the registration of a resource and returns a Future which
+            completes with the VropsResource once vROps has assigned its
+            uuid, so that many resources can be registered concurrently and
+            each one can be used as soon as it is ready.
+
+        """
+        vrops_res = self.VropsResource(gw)
+        future = Future()
+        if gw.res_uuid != None:
+            vrops_res.registered = True
+            future.set_result(vrops_res)
+            return future
+        self.registrations[gw] = future
+        record = None
+        if self.registry is not None:
+            record = self.registry.get(gw.identifier, gw.res_kind)
+        if record is not None:
+            # Warm start: use the uuid known from an earlier run right away
+            # and verify it with vROps in the background
+            log.info("Resource {0} found in registry: {1}".format(gw.res_name, record["uuid"]))
+            gw.res_uuid = record["uuid"]
             gw.con = self.con
+            vrops_res.registered = True
+            future.set_result(vrops_res)
             if gw.parent is not None:
-                self.init_relations(gw)
-                log.info("Relationship Created")
-            if gw.res_kind is 'HelixGateway':
-                config = ConfigParser.RawConfigParser()
-                fullPath = LiotaConfigPath().get_liota_fullpath()
-                if fullPath != '':
-                    try:
-                        if config.read(fullPath) != []:
-                            try:
-                                uuid_path = config.get('UUID_PATH', 'uuid_path')
-                                uuid_config = ConfigParser.RawConfigParser()
-                                uuid_config.add_section('GATEWAY')
-                                uuid_config.set('GATEWAY', gw.res_name, gw.res_uuid)
-                                with open(uuid_path, 'w') as configfile:
-                                    uuid_config.write(configfile)
-                            except ConfigParser.ParsingError, err:
-                                log.error('Could not open config file')
-                        else:
-                            raise IOError('Could not open config file ' + fullPath)
-                    except IOError, err:
-                        log.error('Could not open config file')
-                else:
-                    # missing config file
-                    log.warn('liota.conf file missing')
-            return vrops_res
+                self._create_relation_when_ready(gw, record.get("parent"))
+            self.registration_pipeline.submit(gw).add_done_callback(lambda f: self._verify(gw, f))
+            return future
+        log.info("Creating resource")
+        log.info("Resource Name: {0}".format(gw.res_name))
+
+        def on_uuid(uuid_future):
+            try:
+                gw.res_uuid = uuid_future.result()
+                vrops_res.registered = True
+                log.info("Resource Registered {0}".format(gw.res_name))
+                gw.con = self.con
+                if self.registry is not None:
+                    self.registry.put(gw)
+                if gw.parent is not None:
+                    self._create_relation_when_ready(gw)
+                future.set_result(vrops_res)
+            except Exception, err:
+                log.exception("Registration of resource {0} failed".format(gw.res_name))
+                future.set_exception(err)
+        self.registration_pipeline.submit(gw).add_done_callback(on_uuid)
+        return future
+
+    def _verify(self, gw, uuid_future):
+        try:
+            res_uuid = uuid_future.result()
+        except Exception:
+            log.exception("Verification of resource {0} failed".format(gw.res_name))
+            return
+        if res_uuid == gw.res_uuid:
+            log.info("Resource {0} verified".format(gw.res_name))
+            return
+        log.warn("Resource {0} has uuid {1} in vROps instead of {2}".format(gw.res_name, res_uuid, gw.res_uuid))
+        old_uuid, gw.res_uuid = gw.res_uuid, res_uuid
+        self._resend_properties(gw, old_uuid)
+        self.registry.put(gw)
+        if gw.parent is not None:
+            self._create_relation_when_ready(gw)
+
+    def _create_relation_when_ready(self, gw, known_parent_uuid=None):
+        # The parent may still be waiting for its own uuid
+        parent_future = self.registrations.get(gw.parent)
+        if gw.parent.res_uuid is None and parent_future is not None:
+            parent_future.add_done_callback(lambda _: self._create_relation_when_ready(gw, known_parent_uuid))
+            return
+        if known_parent_uuid is not None and known_parent_uuid == gw.parent.res_uuid:
+            # Created by an earlier run
+            return
+        self.init_relations(gw)
+        log.info("Relationship Created")
+        if self.registry is not None:
+            self.registry.put(gw, gw.parent.res_uuid)
+
+    def add_action_handler(self, registered_res, handler):
+        """ Calls handler.on_change(code) for every action vROps sends to the
+            registered resource. Handlers run on a small pool of worker
+            threads, the actions of one resource one after another in the
+            order received, and messages they send take the control lane
+            ahead of queued stats.
+
+        """
+        self.proto.action_map[registered_res.resource.res_uuid] = handler
 
     def connect_soc(self, protocol, url, user_name, password):
         pass
@@ -150,10 +240,84 @@ class Vrops(DataCenterComponent):
         pass
 
     def publish(self, metric):
-        timestamps = [t for t, _ in metric.values]
-        values = [v for _, v in metric.values]
-        message = metric.gw._report_data(self.con.next_id(), metric.details, timestamps, values)
-        self.con.send(message)
+        for frame in self._stats_frames(metric.gw, [metric]):
+            self.con.send(frame, PRIORITY_DATA)
+
+    def publish_batch(self, metrics):
+        """ Publishes the values of all metrics of a resource in one add_stats
+            message with one statKey per metric. A resource's message is split
+            so that no frame exceeds max_frame_size bytes.
+
+            add_stats carries the uuid of a single resource, so every resource
+            still gets its own frame.
+
+        """
+        by_resource = {}
+        resources = []
+        for metric in metrics:
+            if metric.gw not in by_resource:
+                by_resource[metric.gw] = []
+                resources.append(metric.gw)
+            by_resource[metric.gw].append(metric)
+        for resource in resources:
+            for frame in self._stats_frames(resource, by_resource[resource]):
+                self.con.send(frame, PRIORITY_DATA)
+
+    def _stats_frames(self, resource, metrics):
+        envelope = self._envelope_template(resource)
+        budget = self.max_frame_size - envelope.static_size - 2
+        frames = []
+        entries = []
+        size = 0
+        for metric in metrics:
+            for entry in self._metric_entries(resource, metric, budget):
+                if entries and size + len(entry) + 1 > budget:
+                    frames.append(envelope.render_serialized("[" + ",".join(entries) + "]"))
+                    entries = []
+                    size = 0
+                entries.append(entry)
+                size += len(entry) + 1
+        if entries:
+            frames.append(envelope.render_serialized("[" + ",".join(entries) + "]"))
+        return frames
+
+    def _envelope_template(self, resource):
+        # add_stats envelope of a resource, serialized once per uuid
+        template = self.envelope_templates.get(resource.res_uuid)
+        if template is None:
+            template = Template(resource._report_stats(self.con.next_id(), []), ("metric_data",))
+            self.envelope_templates[resource.res_uuid] = template
+        return template
+
+    def _metric_entries(self, resource, metric, budget):
+        if getattr(metric, "vector_length", None) is None:
+            return self._stat_entries(resource, metric.details, metric.values[:], budget)
+        # Element i of a vector metric is the statKey <details>|<i>
+        timestamps, columns = metric.columns()
+        entries = []
+        for i, column in enumerate(columns):
+            entries.extend(self._stat_entries(resource, "%s|%d" % (metric.details, i), zip(timestamps, column), budget))
+        return entries
+
+    def _stat_entries(self, resource, statkey, values, budget):
+        # Serialized metric_data entries of a metric; a metric with more
+        # samples than fit in one frame is split into several entries
+        entry = self._stat_entry(resource, statkey, values)
+        if len(entry) <= budget or len(values) < 2:
+            return [entry]
+        half = len(values) / 2
+        return self._stat_entries(resource, statkey, values[:half], budget) + \
+            self._stat_entries(resource, statkey, values[half:], budget)
+
+    def _stat_entry(self, resource, statkey, values):
+        key = (resource.res_uuid, statkey)
+        template = self.entry_templates.get(key)
+        if template is None:
+            template = Template({"statKey": statkey}, ("timestamps", "data"))
+            self.entry_templates[key] = template
+        if not values:
+            return template.render([], [])
+        return template.render(*zip(*values))
 
     def init_relations(self, gw):
         """ This function initializes all relations between gateway and it's children.
@@ -191,9 +355,119 @@ class Vrops(DataCenterComponent):
             msg["body"]["property_data"].append({"propertyKey": key, "propertyValue":  value})
         return msg
 
-    def set_properties(self, registered_gw, properties):
-        log.info("Properties defined for resource {0}".format(registered_gw.resource.res_name))
-        self.con.send(self.properties(self.con.next_id(), registered_gw.resource.res_uuid, registered_gw.resource.res_kind, getUTCmillis(), properties))
+    def set_properties(self, registered_gw, properties, flush=False):
+        """ Queues property updates of a registered resource. Updates queued
+            within property_delay seconds are sent in one add_properties
+            message per resource, right away if `flush` is True.
+
+        """
+        resource = registered_gw.resource
+        with self.property_condition:
+            self.pending_properties.setdefault(resource, {}).update(properties)
+            self._schedule_properties()
+        if flush:
+            self.flush_properties(resource)
+
+    def _schedule_properties(self):
+        # Called with the property condition held
+        if self.property_due is None:
+            self.property_due = time.time() + self.property_delay
+            self.property_condition.notify()
+
+    def flush_properties(self, resource=None):
+        """ Sends the queued property updates of `resource`, or of all
+            resources. Values count as sent once the connection reports
+            them delivered; those lost on the way are queued again.
+
+        """
+        messages = []
+        with self.property_condition:
+            if resource is None:
+                pending, self.pending_properties = self.pending_properties, {}
+            else:
+                pending = {}
+                if resource in self.pending_properties:
+                    pending[resource] = self.pending_properties.pop(resource)
+            for res, properties in pending.items():
+                sent = self.sent_properties.get(res.res_uuid, {})
+                unacked = self.unacked_properties.setdefault(res.res_uuid, {})
+                changed = dict((key, value) for key, value in properties.items()
+                               if (unacked[key][1] if key in unacked else sent.get(key, _MISSING)) != value)
+                if not changed:
+                    continue
+                log.info("Properties defined for resource {0}".format(res.res_name))
+                for chunk in self._property_chunks(changed):
+                    self.property_sequence += 1
+                    sequence = self.property_sequence
+                    for key, value in chunk.items():
+                        unacked[key] = (sequence, value)
+                    msg = self.properties(self.con.next_id(), res.res_uuid, res.res_kind, getUTCmillis(), chunk)
+                    messages.append((msg, self._on_properties_delivered(res, res.res_uuid, sequence, chunk)))
+        for msg, on_delivered in messages:
+            self.con.send(msg, on_delivered=on_delivered)
+
+    def _on_properties_delivered(self, res, res_uuid, sequence, properties):
+        def on_delivered(delivered):
+            with self.property_condition:
+                if res.res_uuid != res_uuid:
+                    # Sent again for the new uuid, see _resend_properties
+                    return
+                unacked = self.unacked_properties.get(res_uuid, {})
+                for key, value in properties.items():
+                    # A newer value of the key may have been sent since
+                    latest = unacked.get(key, (None, None))[0] == sequence
+                    if latest:
+                        del unacked[key]
+                    if delivered:
+                        self.sent_properties.setdefault(res_uuid, {})[key] = value
+                    elif latest:
+                        # Unless a newer value is queued already
+                        self.pending_properties.setdefault(res, {}).setdefault(key, value)
+                if not delivered:
+                    self._schedule_properties()
+        return on_delivered
+
+    def _resend_properties(self, res, old_uuid):
+        # Properties of the old uuid are unknown to the resource of the new one
+        with self.property_condition:
+            properties = self.sent_properties.pop(old_uuid, {})
+            for key, (_, value) in self.unacked_properties.pop(old_uuid, {}).items():
+                properties[key] = value
+            if not properties:
+                return
+            pending = self.pending_properties.setdefault(res, {})
+            for key, value in properties.items():
+                pending.setdefault(key, value)
+            self._schedule_properties()
+
+    def _property_chunks(self, properties):
+        # Splits the properties so that no message exceeds max_frame_size bytes
+        chunks = [{}]
+        size = 0
+        budget = self.max_frame_size - 512
+        for key, value in properties.items():
+            entry_size = len(serializer.dumps(key)) + len(serializer.dumps(value)) + 34
+            if chunks[-1] and size + entry_size > budget:
+                chunks.append({})
+                size = 0
+            chunks[-1][key] = value
+            size += entry_size
+        return chunks
+
+    def _property_loop(self):
+        while True:
+            with self.property_condition:
+                while self.property_due is None:
+                    self.property_condition.wait()
+                remaining = self.property_due - time.time()
+                if remaining > 0:
+                    self.property_condition.wait(remaining)
+                    continue
+                self.property_due = None
+            try:
+                self.flush_properties()
+            except Exception:
+                log.exception("Error while sending properties")
 
     class VropsResource:
 
@@ -202,15 +476,23 @@ class Vrops(DataCenterComponent):
             self.registered = registered
 
     def publish_unit(self, registered_gw, metric_name, unit):
+        self.set_properties(registered_gw, self._unit_properties(metric_name, unit))
+        log.info("Published metric unit with prefix to vROps")
+
+    def publish_units(self, registered_gw, units):
+        properties = {}
+        for metric_name, unit in units:
+            properties.update(self._unit_properties(metric_name, unit))
+        self.set_properties(registered_gw, properties, flush=True)
+        log.info("Published {0} metric units with prefix to vROps".format(len(units)))
+
+    def _unit_properties(self, metric_name, unit):
         str_prefix, str_unit_name = parse_unit(unit)
         if not isinstance(str_prefix, basestring):
             str_prefix = ""
         if not isinstance(str_unit_name, basestring):
             str_unit_name = ""
-        properties_added = {
+        return {
                 metric_name + "_unit": str_unit_name,
                 metric_name + "_prefix": str_prefix
             }
-        self.set_properties(registered_gw, properties_added)
-        log.info("Published metric unit with prefix to vROps")
-
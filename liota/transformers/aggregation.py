@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+from itertools import groupby
+import math
+
+# Statistics are computed with numpy if it is installed
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+STATISTICS = ("min", "max", "mean", "count", "stddev")
+
+
+class WindowAggregator:
+    """ Transform reducing the samples of a metric to summary statistics per
+        time window, sent instead of the samples:
+
+            metric = dcc.create_metric(gw, "Temperature", unit, read_temperature,
+                                       sampling_interval_sec=1, aggregation_size=60)
+            metric.add_transform(WindowAggregator(window_sec=60))
+
+        Windows are aligned to multiples of `window_sec`. Each statistic of
+        `statistics` is published as the series named by `name_format`, e.g.
+        Temperature.mean, with one sample per window, timestamped with the
+        start of the window. The standard deviation is that of the
+        population. With `keep_raw` the samples are sent as well.
+
+        A window is summarized once a sample of a later window has been
+        collected; until then its samples are kept by the aggregator.
+
+    """
+    def __init__(self, window_sec=60, statistics=STATISTICS, name_format="{details}.{statistic}", keep_raw=False,
+                 use_numpy=None):
+        for statistic in statistics:
+            if statistic not in STATISTICS:
+                raise ValueError("Unknown statistic {0}, expected one of {1}".format(statistic, STATISTICS))
+        self.window_ms = int(window_sec * 1000)
+        self.statistics = statistics
+        self.name_format = name_format
+        self.keep_raw = keep_raw
+        self.use_numpy = numpy is not None if use_numpy is None else use_numpy
+        self.pending = []
+        self.windows = 0
+
+    def process(self, details, samples):
+        outputs = []
+        if self.keep_raw:
+            outputs.append((details, samples))
+        samples = self.pending + samples
+        if not samples:
+            return outputs
+        # Samples of the window of the latest sample may still follow
+        last_window = samples[-1][0] // self.window_ms
+        complete = len(samples)
+        while complete > 0 and samples[complete - 1][0] // self.window_ms >= last_window:
+            complete -= 1
+        self.pending = samples[complete:]
+        if complete == 0:
+            return outputs
+        if self.use_numpy:
+            starts, summaries = self._summarize_numpy(samples[:complete])
+        else:
+            starts, summaries = self._summarize(samples[:complete])
+        self.windows += len(starts)
+        for statistic in self.statistics:
+            name = self.name_format.format(details=details, statistic=statistic)
+            outputs.append((name, zip(starts, summaries[statistic])))
+        return outputs
+
+    def _summarize_numpy(self, samples):
+        t = numpy.array([s[0] for s in samples], dtype=numpy.int64)
+        v = numpy.array([s[1] for s in samples], dtype=numpy.float64)
+        window = t // self.window_ms
+        # Index of the first sample of every window
+        first = numpy.flatnonzero(numpy.r_[True, window[1:] != window[:-1]])
+        count = numpy.diff(numpy.r_[first, len(v)])
+        mean = numpy.add.reduceat(v, first) / count
+        summaries = {
+            "min": numpy.minimum.reduceat(v, first).tolist(),
+            "max": numpy.maximum.reduceat(v, first).tolist(),
+            "mean": mean.tolist(),
+            "count": count.tolist()
+        }
+        if "stddev" in self.statistics:
+            squares = numpy.add.reduceat((v - numpy.repeat(mean, count)) ** 2, first)
+            summaries["stddev"] = numpy.sqrt(squares / count).tolist()
+        return (window[first] * self.window_ms).tolist(), summaries
+
+    def _summarize(self, samples):
+        starts = []
+        summaries = dict((statistic, []) for statistic in STATISTICS)
+        for window, group in groupby(samples, lambda s: s[0] // self.window_ms):
+            values = [float(v) for _, v in group]
+            count = len(values)
+            mean = sum(values) / count
+            starts.append(window * self.window_ms)
+            summaries["min"].append(min(values))
+            summaries["max"].append(max(values))
+            summaries["mean"].append(mean)
+            summaries["count"].append(count)
+            summaries["stddev"].append(math.sqrt(sum((v - mean) ** 2 for v in values) / count))
+        return starts, summaries
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+# The points are picked with numpy if it is installed
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class LttbDownsampler:
+    """ Transform reducing the samples of a series to at most `points`
+        samples, keeping its visual shape, with the Largest-Triangle-
+        Three-Buckets algorithm (Steinarsson, 2013). Meant for data center
+        components, e.g. to send what was buffered while a link was down, or
+        a metric sampled faster than dashboards need:
+
+            graphite.add_transform(LttbDownsampler(points=500))
+
+        The first and last samples are kept. The others are split into
+        points - 2 buckets, and the sample of each bucket kept is the one
+        forming the largest triangle with the sample kept from the previous
+        bucket and the average of the next bucket. Series with values that
+        are not numbers are not downsampled.
+
+    """
+    def __init__(self, points=500, use_numpy=None):
+        if points < 3:
+            raise ValueError("At least 3 points are needed, got {0}".format(points))
+        self.points = points
+        self.use_numpy = numpy is not None if use_numpy is None else use_numpy
+        self.points_in = 0
+        self.points_out = 0
+
+    def process(self, details, samples):
+        self.points_in += len(samples)
+        if len(samples) > self.points:
+            try:
+                if self.use_numpy:
+                    samples = self._downsample_numpy(samples)
+                else:
+                    samples = self._downsample(samples)
+            except (TypeError, ValueError):
+                pass
+        self.points_out += len(samples)
+        return [(details, samples)]
+
+    def _buckets(self, n):
+        # [start, end) of the buckets between the first and last samples
+        every = float(n - 2) / (self.points - 2)
+        return [(int(i * every) + 1, int((i + 1) * every) + 1) for i in range(self.points - 2)]
+
+    def _downsample(self, samples):
+        xs = [float(t) for t, _ in samples]
+        ys = [float(v) for _, v in samples]
+        n = len(samples)
+        buckets = self._buckets(n)
+        kept = [samples[0]]
+        a = 0
+        for i, (start, end) in enumerate(buckets):
+            next_start, next_end = buckets[i + 1] if i + 1 < len(buckets) else (n - 1, n)
+            count = next_end - next_start
+            avg_x = sum(xs[next_start:next_end]) / count
+            avg_y = sum(ys[next_start:next_end]) / count
+            ax, ay = xs[a], ys[a]
+            best = start
+            best_area = -1.0
+            for j in range(start, end):
+                # Twice the area of the triangle, which picks the same sample
+                area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+                if area > best_area:
+                    best_area = area
+                    best = j
+            kept.append(samples[best])
+            a = best
+        kept.append(samples[-1])
+        return kept
+
+    def _downsample_numpy(self, samples):
+        x = numpy.array([t for t, _ in samples], dtype=numpy.float64)
+        y = numpy.array([v for _, v in samples], dtype=numpy.float64)
+        n = len(samples)
+        buckets = self._buckets(n)
+        # Averages of all buckets at once; the last sample follows the last bucket
+        starts = numpy.array([start for start, _ in buckets] + [n - 1])
+        counts = numpy.diff(numpy.r_[starts, n])
+        avg_x = numpy.add.reduceat(x, starts) / counts
+        avg_y = numpy.add.reduceat(y, starts) / counts
+        kept = [0]
+        a = 0
+        for i, (start, end) in enumerate(buckets):
+            area = numpy.abs((x[a] - avg_x[i + 1]) * (y[start:end] - y[a]) -
+                             (x[a] - x[start:end]) * (avg_y[i + 1] - y[a]))
+            a = start + int(area.argmax())
+            kept.append(a)
+        kept.append(n - 1)
+        return [samples[i] for i in kept]
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+class DeadbandFilter:
+    """ Transform sending a sample of a metric only if it differs enough
+        from the last value sent, e.g. for door states or temperatures that
+        stay the same for hours:
+
+            metric.add_transform(DeadbandFilter(absolute=0.5, heartbeat_sec=3600))
+
+        A sample is sent if it is the first one, if it is further than
+        `absolute` from the last value sent, or further than `percent`
+        percent of it, or, with neither of them given, if it differs from it
+        at all; values that are not numbers are only compared for equality.
+        Comparing with the last value sent, not the last sample, keeps slow
+        drifts from being suppressed forever. With `heartbeat_sec` a sample
+        is also sent when no value has been sent for that long, so the data
+        center still sees the metric is alive.
+
+        The samples sent and suppressed are counted, see get_stats().
+
+    """
+    def __init__(self, absolute=None, percent=None, heartbeat_sec=None):
+        self.absolute = absolute
+        self.percent = percent
+        self.heartbeat_ms = heartbeat_sec * 1000 if heartbeat_sec is not None else None
+        self.last_value = None
+        self.last_time = None
+        self.passed = 0
+        self.suppressed = 0
+
+    def process(self, details, samples):
+        kept = []
+        for t, v in samples:
+            if self._changed(v) or (self.heartbeat_ms is not None and t - self.last_time >= self.heartbeat_ms):
+                kept.append((t, v))
+                self.last_value = v
+                self.last_time = t
+        self.passed += len(kept)
+        self.suppressed += len(samples) - len(kept)
+        return [(details, kept)]
+
+    def _changed(self, v):
+        last = self.last_value
+        if self.last_time is None:
+            return True
+        if self.absolute is None and self.percent is None:
+            return v != last
+        try:
+            delta = abs(v - last)
+        except TypeError:
+            return v != last
+        if self.absolute is not None and delta > self.absolute:
+            return True
+        return self.percent is not None and delta > abs(last) * self.percent / 100.0
+
+    def get_stats(self):
+        total = self.passed + self.suppressed
+        return {
+            "passed": self.passed,
+            "suppressed": self.suppressed,
+            "suppressed_ratio": float(self.suppressed) / total if total else 0.0
+        }
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import math
+
+
+class DenseStore:
+    """ Counts of consecutive bucket keys, at most `max_buckets` of them; the
+        lowest buckets are merged into one when more would be needed.
+
+    """
+    def __init__(self, max_buckets):
+        self.max_buckets = max_buckets
+        self.bins = []
+        self.offset = 0
+        self.count = 0
+
+    def add(self, key, weight=1):
+        self.bins[self._index(key)] += weight
+        self.count += weight
+
+    def _index(self, key):
+        bins = self.bins
+        if not bins:
+            bins.append(0)
+            self.offset = key
+            return 0
+        top = self.offset + len(bins) - 1
+        if key > top:
+            low = key - self.max_buckets + 1
+            if low > self.offset:
+                cut = low - self.offset
+                collapsed = sum(bins[:cut])
+                del bins[:cut]
+                if bins:
+                    bins[0] += collapsed
+                else:
+                    bins.append(collapsed)
+                self.offset = low
+            bins.extend([0] * (key - self.offset - len(bins) + 1))
+            return key - self.offset
+        if key < self.offset:
+            # Keys below the range kept go into its lowest bucket
+            low = max(key, top - self.max_buckets + 1)
+            if low < self.offset:
+                bins[:0] = [0] * (self.offset - low)
+                self.offset = low
+            return 0
+        return key - self.offset
+
+    def merge(self, other):
+        for i, weight in enumerate(other.bins):
+            if weight:
+                self.add(other.offset + i, weight)
+
+    def key_at_rank(self, rank, reverse=False):
+        # Key of the bucket holding the sample of the given rank (0-based)
+        indexes = range(len(self.bins))
+        if reverse:
+            indexes.reverse()
+        seen = 0
+        for i in indexes:
+            seen += self.bins[i]
+            if seen > rank:
+                return self.offset + i
+        return self.offset + indexes[-1]
+
+    def to_list(self):
+        return [self.offset, self.bins[:]]
+
+    def load(self, data):
+        self.offset, self.bins = data[0], list(data[1])
+        self.count = sum(self.bins)
+
+
+class QuantileSketch:
+    """ Quantiles of a stream of values in constant memory, after DDSketch:
+        every quantile is estimated within `relative_accuracy` of the exact
+        value, as long as no more than `max_buckets` buckets (of values of
+        the same sign) are needed. Buckets cover a factor of
+        (1 + relative_accuracy) / (1 - relative_accuracy) each, so 2048
+        buckets at 1% span 17 orders of magnitude. Beyond that the buckets of
+        the lowest magnitudes are merged, and only quantiles within that span
+        of the largest magnitude stay accurate. Adding a value is O(1)
+        amortized.
+
+        Sketches with the same parameters can be merged, e.g. those of
+        several gateways or of several windows, and are serialized with
+        to_dict() and from_dict().
+
+    """
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        # Smaller magnitudes are counted as zero
+        self.min_indexable = 1e-9
+        self.positive = DenseStore(max_buckets)
+        self.negative = DenseStore(max_buckets)
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value, weight=1):
+        value = float(value)
+        if value > self.min_indexable:
+            self.positive.add(int(math.ceil(math.log(value) / self.log_gamma)), weight)
+        elif value < -self.min_indexable:
+            self.negative.add(int(math.ceil(math.log(-value) / self.log_gamma)), weight)
+        else:
+            self.zero_count += weight
+        self.count += weight
+        self.sum += value * weight
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches of different relative accuracies")
+        if not other.count:
+            return
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q):
+        """ Returns the estimate of quantile `q` (0 to 1), None if no values
+            were added.
+
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.negative.count:
+            # The most negative values have the highest keys
+            value = -self._value(self.negative.key_at_rank(rank, reverse=True))
+        elif rank < self.negative.count + self.zero_count:
+            value = 0.0
+        else:
+            value = self._value(self.positive.key_at_rank(rank - self.negative.count - self.zero_count))
+        return min(max(value, self.min), self.max)
+
+    def _value(self, key):
+        # The value of a bucket closest, relatively, to all values in it
+        return 2 * self.gamma ** key / (1 + self.gamma)
+
+    def buckets(self):
+        return len(self.positive.bins) + len(self.negative.bins)
+
+    def to_dict(self):
+        return {
+            "alpha": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "pos": self.positive.to_list(),
+            "neg": self.negative.to_list(),
+            "zero": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["alpha"], data["max_buckets"])
+        sketch.positive.load(data["pos"])
+        sketch.negative.load(data["neg"])
+        sketch.zero_count = data["zero"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        return sketch
+
+
+class SketchAggregator:
+    """ Transform sending quantiles of the samples of a metric per time
+        window instead of the samples, e.g. for latencies:
+
+            metric.add_transform(SketchAggregator(window_sec=60, quantiles=(0.5, 0.95, 0.99)))
+
+        Windows are aligned to multiples of `window_sec`, and the samples of
+        a window are added to a QuantileSketch as they come, so memory does
+        not grow with the number of samples. Quantile q is published as the
+        series named by `name_format`, e.g. Latency.p99, with one sample per
+        window, timestamped with the start of the window. With `sketch_name`,
+        e.g. "{details}.sketch", the sketch itself is sent as well, as a
+        dict, to be merged by a parent gateway or data center. Only data
+        center components which carry structured values, such as MqttDcc,
+        can send it; adding such an aggregator to a metric of Graphite or
+        vROps raises ValueError. With `keep_raw` the samples are sent as
+        well.
+
+        A window is sent once a sample of a later window has been collected.
+
+    """
+    def __init__(self, window_sec=60, quantiles=(0.5, 0.95, 0.99), relative_accuracy=0.01, max_buckets=2048,
+                 name_format="{details}.p{percentile}", sketch_name=None, keep_raw=False):
+        self.window_ms = int(window_sec * 1000)
+        self.quantiles = quantiles
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.name_format = name_format
+        self.sketch_name = sketch_name
+        # Values other than numbers go out with the sketch
+        self.structured_output = sketch_name is not None
+        self.keep_raw = keep_raw
+        self.window = None
+        self.sketch = None
+
+    def process(self, details, samples):
+        outputs = []
+        if self.keep_raw:
+            outputs.append((details, samples))
+        done = []
+        for t, v in samples:
+            window = t // self.window_ms
+            if window != self.window:
+                if self.sketch is not None and window > self.window:
+                    done.append((self.window * self.window_ms, self.sketch))
+                    self.sketch = None
+                if self.sketch is None:
+                    self.window = window
+                    self.sketch = QuantileSketch(self.relative_accuracy, self.max_buckets)
+            self.sketch.add(v)
+        if not done:
+            return outputs
+        for q in self.quantiles:
+            name = self.name_format.format(details=details, percentile="%g" % (100 * q))
+            outputs.append((name, [(start, sketch.quantile(q)) for start, sketch in done]))
+        if self.sketch_name is not None:
+            outputs.append((self.sketch_name.format(details=details),
+                            [(start, sketch.to_dict()) for start, sketch in done]))
+        return outputs
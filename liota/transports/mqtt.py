@@ -31,42 +31,202 @@
 # ----------------------------------------------------------------------------#
 
 import logging
+import threading
+import time
 
 import paho.mqtt.client as paho
+from offline_queue import OfflineQueue
 from transport_layer_base import TransportLayer
 
 log = logging.getLogger(__name__)
 
-class Mqtt(TransportLayer):
-
-    def on_subscribe(self, client, userdata, mid, granted_qos):
-        log.debug("Subscribed: {0} {1}".format(str(mid), str(granted_qos)))
 
-    def on_message(self, client, userdata, msg):
-        log.debug("On Message {0} {1} {2}".format(msg.topic, str(msg.qos), str(msg.payload)))
+class Mqtt(TransportLayer):
+    """ MQTT connection whose network loop runs in the background.
 
-    def on_publish(self, client, userdata, mid):
-        log.debug("mid: {0}".format(str(mid)))
+        publish() only queues the message. A sender thread publishes queued
+        messages while the broker is connected, with at most `max_inflight`
+        of them waiting for their PUBACK at a time, so a slow broker holds
+        messages in the queue rather than in the client. Messages published
+        while the broker is unreachable wait in the same queue, and with a
+        `queue_path` the queue is journaled to that file so that messages
+        the broker has not acknowledged survive a restart (see OfflineQueue).
+        paho reconnects on its own and sends the messages in flight again.
 
-    def __init__(self, url, port):
+    """
+    def __init__(self, url, port, client_id="", keepalive=60, max_inflight=20, queue_path=None,
+                 max_queued=100000, username=None, password=None):
         self.url = url
         self.port = port
-        self.client = paho.Client()
+        self.keepalive = keepalive
+        self.max_inflight = max_inflight
+        self.client = paho.Client(client_id=client_id, clean_session=True)
+        if username is not None:
+            self.client.username_pw_set(username, password)
+        self.client.max_inflight_messages_set(max_inflight)
+        self.client.reconnect_delay_set(1, 30)
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
         self.client.on_message = self.on_message
         self.client.on_publish = self.on_publish
         self.client.on_subscribe = self.on_subscribe
-        self.connect_soc()
+        self.condition = threading.Condition()
+        self.queue = OfflineQueue(queue_path, max_queued)
+        # mid -> seq of the messages handed to paho and not acknowledged yet
+        self.in_flight = {}
+        self.inflight_count = 0
+        # acknowledgements that arrived before publish() returned their mid
+        self.early_acks = set()
+        self.subscriptions = {}
+        self.connected = False
+        self.closed = False
+        self.connects = 0
+        self.published = 0
+        self.acked = 0
+        self.errors = 0
         TransportLayer.__init__(self)
+        self.connect_soc()
+        thread = threading.Thread(target=self._send_loop, name="MqttSender")
+        thread.daemon = True
+        thread.start()
 
     def connect_soc(self):
-        self.client.connect_soc(host=self.url, port=self.port, keepalive=60)
+        # Retries in the background until the broker can be reached
+        self.client.connect_async(host=self.url, port=self.port, keepalive=self.keepalive)
+        self.client.loop_start()
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc != 0:
+            log.error("Connection refused by MQTT broker {0}:{1}, rc {2}".format(self.url, self.port, rc))
+            return
         log.info("Connection Successful")
+        with self.condition:
+            self.connected = True
+            self.connects += 1
+            subscriptions = self.subscriptions.items()
+            self.condition.notify_all()
+        for topic, qos in subscriptions:
+            self.client.subscribe(topic, qos)
+
+    def on_disconnect(self, client, userdata, rc):
+        with self.condition:
+            self.connected = False
+            # paho sends QoS 1 messages in flight again once it has reconnected,
+            # QoS 0 ones are lost
+            for mid, seq in self.in_flight.items():
+                if seq is None:
+                    del self.in_flight[mid]
+        if rc != 0:
+            log.warn("Lost connection to MQTT broker {0}:{1}, reconnecting".format(self.url, self.port))
+
+    def on_subscribe(self, client, userdata, mid, granted_qos):
+        log.debug("Subscribed: {0} {1}".format(str(mid), str(granted_qos)))
+
+    def on_message(self, client, userdata, msg):
+        log.debug("On Message {0} {1} {2}".format(msg.topic, str(msg.qos), str(msg.payload)))
+
+    def on_publish(self, client, userdata, mid):
+        with self.condition:
+            if mid not in self.in_flight:
+                self.early_acks.add(mid)
+                return
+            self._acknowledge(self.in_flight.pop(mid))
+
+    def _acknowledge(self, seq):
+        if seq is not None:
+            self.queue.ack(seq)
+            self.inflight_count -= 1
+            self.acked += 1
+            self.condition.notify_all()
+
+    def send(self, message):
+        topic, payload = message
+        self.publish(topic, payload)
+
+    def publish(self, topic, message, qos=1, retain=False):
+        if isinstance(message, unicode):
+            message = message.encode('utf-8')
+        with self.condition:
+            self.queue.put(topic, message, qos, retain)
+            self.condition.notify_all()
+
+    def subscribe(self, topic, qos=1, callback=None):
+        """ Subscribes to `topic`, also after every reconnect. Messages are
+            passed to callback(topic, payload) on the network thread.
+
+        """
+        if callback is not None:
+            self.client.message_callback_add(topic, lambda client, userdata, msg: callback(msg.topic, msg.payload))
+        with self.condition:
+            self.subscriptions[topic] = qos
+            connected = self.connected
+        if connected:
+            self.client.subscribe(topic, qos)
+
+    def _send_loop(self):
+        while True:
+            with self.condition:
+                while not self.closed and not (self.connected and len(self.queue) > 0
+                                               and self.inflight_count < self.max_inflight):
+                    self.condition.wait()
+                if self.closed:
+                    return
+                seq, topic, payload, qos, retain = self.queue.pop()
+                if qos == 0:
+                    seq = None
+                else:
+                    self.inflight_count += 1
+            # Not under the lock, paho calls on_publish while holding its own
+            info = self.client.publish(topic, payload, qos, retain)
+            with self.condition:
+                self.published += 1
+                if info.rc not in (paho.MQTT_ERR_SUCCESS, paho.MQTT_ERR_NO_CONN):
+                    log.error("Could not publish to {0}, rc {1}".format(topic, info.rc))
+                    self.errors += 1
+                    self._acknowledge(seq)
+                elif info.mid in self.early_acks:
+                    self.early_acks.discard(info.mid)
+                    self._acknowledge(seq)
+                else:
+                    self.in_flight[info.mid] = seq
+
+    def pending(self):
+        with self.condition:
+            return len(self.queue) + self.inflight_count
+
+    def flush(self, timeout=None):
+        """ Waits until every queued message is acknowledged; returns False
+            if `timeout` seconds passed first.
 
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self.condition:
+            while len(self.queue) > 0 or self.inflight_count > 0:
+                if deadline is None:
+                    self.condition.wait()
+                elif deadline <= time.time():
+                    return False
+                else:
+                    self.condition.wait(deadline - time.time())
+        return True
 
-    def publish(self, topic, message):
-        self.client.publish(topic, message)
-        log.info("Message Sent")
+    def get_stats(self):
+        with self.condition:
+            return {
+                "queued": len(self.queue),
+                "in_flight": self.inflight_count,
+                "published": self.published,
+                "acked": self.acked,
+                "dropped": self.queue.dropped,
+                "errors": self.errors,
+                "connects": self.connects
+            }
 
-    def subscribe(self, topic):
-        self.client.subscribe(topic, qos=1)
-        self.client.loop_forever()
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.client.disconnect()
+        self.client.loop_stop()
+        with self.condition:
+            self.queue.close()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+from collections import deque
+import logging
+
+from liota.utilities.journal import Journal
+
+log = logging.getLogger(__name__)
+
+
+class OfflineQueue:
+    """ Messages waiting to be sent, or waiting for their acknowledgement.
+
+        Messages are taken from the head of the queue with pop() and stay
+        unacknowledged until ack() is called with their sequence number.
+        With a `path`, every message published with QoS > 0 is appended to
+        a Journal, as is every acknowledgement, so that the messages not
+        acknowledged yet are queued again when it is loaded after a restart.
+        The journal is compacted once it has grown well beyond the messages
+        still unacknowledged.
+
+        When `max_messages` are queued the oldest one is dropped.
+
+        The queue is not thread safe, its owner holds a lock around it.
+
+    """
+    def __init__(self, path=None, max_messages=100000, sync_delay=1.0):
+        self.path = path
+        self.max_messages = max_messages
+        self.sync_delay = sync_delay
+        # seq -> (topic, payload, qos, retain) of every message not acknowledged yet
+        self.messages = {}
+        self.backlog = deque()
+        self.sequence = 0
+        self.dropped = 0
+        self.journal = None
+        if path is not None:
+            self.journal = Journal(path, sync_delay, "offline queue")
+            self.journal.load(self._apply)
+            self.backlog.extend(sorted(self.messages))
+            if self.messages:
+                self.sequence = self.backlog[-1]
+                log.info("Loaded {0} unacknowledged messages from offline queue {1}".format(len(self.messages), path))
+            if self.journal.records > 2 * len(self.messages) + 1000:
+                self.compact()
+
+    def __len__(self):
+        return len(self.backlog)
+
+    def unacked(self):
+        return len(self.messages)
+
+    def put(self, topic, payload, qos=1, retain=False):
+        if len(self.backlog) >= self.max_messages:
+            self.ack(self.backlog.popleft())
+            self.dropped += 1
+        self.sequence += 1
+        self.messages[self.sequence] = (topic, payload, qos, retain)
+        self.backlog.append(self.sequence)
+        if qos > 0:
+            self._write(self._record(self.sequence))
+        return self.sequence
+
+    def pop(self):
+        """ Returns (seq, topic, payload, qos, retain) of the oldest message
+            not sent yet, or None. QoS 0 messages are acknowledged right away.
+
+        """
+        if not self.backlog:
+            return None
+        seq = self.backlog.popleft()
+        topic, payload, qos, retain = self.messages[seq]
+        if qos == 0:
+            del self.messages[seq]
+        return seq, topic, payload, qos, retain
+
+    def ack(self, seq):
+        message = self.messages.pop(seq, None)
+        if message is not None and message[2] > 0:
+            self._write({"a": seq})
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def _record(self, seq):
+        topic, payload, qos, retain = self.messages[seq]
+        return {"s": seq, "t": topic, "p": payload.decode('latin-1'), "q": qos, "r": retain}
+
+    def _write(self, record):
+        if self.journal is None:
+            return
+        self.journal.append(record)
+        if self.journal.records > 2 * len(self.messages) + 1000:
+            self.compact()
+
+    def _apply(self, record):
+        if "a" in record:
+            self.messages.pop(record["a"], None)
+        else:
+            self.messages[record["s"]] = (record["t"], record["p"].encode('latin-1'), record["q"], record["r"])
+
+    def compact(self):
+        self.journal.compact(self._record(seq) for seq in sorted(self.messages) if self.messages[seq][2] > 0)
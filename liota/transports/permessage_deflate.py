@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import logging
+import time
+import zlib
+
+from websocket._abnf import ABNF, frame_buffer
+
+log = logging.getLogger(__name__)
+
+# Every message compressed with Z_SYNC_FLUSH ends with these bytes, which
+# permessage-deflate (RFC 7692) leaves out on the wire
+DEFLATE_TAIL = "\x00\x00\xff\xff"
+
+
+class PerMessageDeflate:
+    """ permessage-deflate extension of one WebSocket connection.
+
+        By default one compression context is kept for the whole connection,
+        so every message is compressed against the previous ones, which
+        suits the repetitive add_stats messages. With `context_takeover`
+        False each message is compressed on its own, which costs less memory
+        and CPU but compresses small messages much less. Messages shorter
+        than `min_size` bytes are sent uncompressed.
+
+    """
+    def __init__(self, level=6, context_takeover=True, min_size=64):
+        self.level = level
+        self.context_takeover = context_takeover
+        self.min_size = min_size
+        self._reset()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.messages = 0
+        self.compressed_messages = 0
+        self.compress_sec = 0.0
+
+    def _reset(self):
+        # Parameters until the server's response to the handshake is applied
+        self.client_context_takeover = self.context_takeover
+        self.server_context_takeover = True
+        self.client_window_bits = zlib.MAX_WBITS
+        self.compressor = None
+        self.decompressor = None
+
+    def offer(self):
+        """ Returns the Sec-WebSocket-Extensions header of the handshake.
+
+        """
+        offer = "permessage-deflate; client_max_window_bits"
+        if not self.context_takeover:
+            offer += "; client_no_context_takeover"
+        return "Sec-WebSocket-Extensions: " + offer
+
+    def accept(self, headers):
+        """ Applies the parameters of the server's handshake response; returns
+            False if the server did not accept the extension. Parameters
+            agreed on an earlier connection do not carry over.
+
+        """
+        self._reset()
+        for extension in (headers or {}).get("sec-websocket-extensions", "").split(","):
+            params = [param.strip() for param in extension.split(";")]
+            if params[0] != "permessage-deflate":
+                continue
+            for param in params[1:]:
+                name, _, value = param.partition("=")
+                if name == "client_no_context_takeover":
+                    self.client_context_takeover = False
+                elif name == "server_no_context_takeover":
+                    self.server_context_takeover = False
+                elif name == "client_max_window_bits" and value:
+                    self.client_window_bits = int(value.strip('"'))
+            return True
+        return False
+
+    def compress(self, data):
+        """ Returns the payload of message `data` and whether it is compressed.
+
+        """
+        self.messages += 1
+        self.bytes_in += len(data)
+        if len(data) < self.min_size:
+            self.bytes_out += len(data)
+            return data, False
+        start = time.time()
+        if self.compressor is None or not self.client_context_takeover:
+            self.compressor = zlib.compressobj(self.level, zlib.DEFLATED, -self.client_window_bits)
+        payload = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        if payload.endswith(DEFLATE_TAIL):
+            payload = payload[:-len(DEFLATE_TAIL)]
+        self.compress_sec += time.time() - start
+        self.compressed_messages += 1
+        self.bytes_out += len(payload)
+        return payload, True
+
+    def decompress(self, payload):
+        if self.decompressor is None or not self.server_context_takeover:
+            self.decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self.decompressor.decompress(payload + DEFLATE_TAIL)
+
+    def get_stats(self):
+        return {
+            "messages": self.messages,
+            "compressed_messages": self.compressed_messages,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": float(self.bytes_in) / self.bytes_out if self.bytes_out else 1.0,
+            "compress_sec": self.compress_sec,
+            "compress_us_per_kb": 1e6 * self.compress_sec * 1024 / self.bytes_in if self.bytes_in else 0.0
+        }
+
+
+class InflatingFrameBuffer(frame_buffer):
+    """ frame_buffer of websocket-client which accepts frames with the rsv1
+        bit, which marks the first frame of a compressed message.
+
+    """
+    def recv_frame(self):
+        if self.has_received_header():
+            self.recv_header()
+        (fin, rsv1, rsv2, rsv3, opcode, has_mask, _) = self.header
+        if self.has_received_length():
+            self.recv_length()
+        length = self.length
+        if self.has_received_mask():
+            self.recv_mask()
+        mask = self.mask
+        payload = self.recv_strict(length)
+        if has_mask:
+            payload = ABNF.mask(mask, payload)
+        self.clear()
+        frame = ABNF(fin, 0, rsv2, rsv3, opcode, has_mask, payload)
+        frame.validate(self.skip_utf8_validation)
+        frame.rsv1 = rsv1
+        return frame
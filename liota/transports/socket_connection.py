@@ -32,33 +32,168 @@
 
 #!/usr/bin/env python
 import logging
+from Queue import Queue, Empty
 import socket
+import threading
+import time
+import zlib
 
 from transport_layer_base import TransportLayer
+from liota.utilities.concurrency import Future
 
 
 log = logging.getLogger(__name__)
 
 class Socket(TransportLayer):
+    """ Connection to a carbon endpoint, kept open between sends.
 
-    def __init__(self, carbon_server, carbon_port):
+        Connecting gives up after `timeout` seconds, which also bounds each
+        write. Once connecting failed, sends are given up on right away
+        until a backoff passed, doubling from `initial_backoff` up to
+        `max_backoff` seconds, so that an unreachable relay does not stall
+        the thread sending.
+
+    """
+    def __init__(self, carbon_server, carbon_port, timeout=5.0, initial_backoff=0.5, max_backoff=30.0):
         self.carbon_server = carbon_server
         self.carbon_port = carbon_port
+        self.timeout = timeout
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.backoff = initial_backoff
+        self.retry_at = 0
         self.connect_soc()
         TransportLayer.__init__(self)
 
     def connect_soc(self):
-        self.sock = socket.socket()
+        sock = socket.socket()
+        sock.settimeout(self.timeout)
         log.info("Creating Socket")
         try:
-            self.sock.connect((self.carbon_server, self.carbon_port))
-            log.info("Socket Created")
-        except Exception:
-            log.exception("Socket connection cannot be established to Graphite DCC. Please check the firewall rules an try again.")
-            self.sock.close()
+            sock.connect((self.carbon_server, self.carbon_port))
+        except Exception, err:
+            sock.close()
             self.sock = None
+            self.retry_at = time.time() + self.backoff
+            log.warn("Socket connection cannot be established to Graphite DCC {0}:{1} ({2}), trying again in "
+                     "{3:.1f}s. Please check the firewall rules.".format(self.carbon_server, self.carbon_port, err,
+                                                                        self.backoff))
+            self.backoff = min(self.backoff * 2, self.max_backoff)
+            return
+        log.info("Socket Created")
+        self.sock = sock
+        self.backoff = self.initial_backoff
+
+    def send(self, message, key=None):
+        # A broken connection is re-established once before the message is
+        # given up on, unless connecting is backing off
+        for attempt in range(2):
+            if self.sock is None:
+                if time.time() < self.retry_at:
+                    return False
+                self.connect_soc()
+                if self.sock is None:
+                    return False
+            try:
+                self.sock.sendall(message)
+                return True
+            except socket.error, err:
+                log.warn("Error while sending data to {0}:{1} ({2})".format(self.carbon_server, self.carbon_port, err))
+                self.close()
+        return False
 
-    def send(self, message):
+    def close(self):
         if self.sock is not None:
-            self.sock.sendall(message)
+            self.sock.close()
+            self.sock = None
+
+
+class SocketPool(TransportLayer):
+    """ A pool of `pool_size` parallel connections to the same carbon
+        endpoint, for links where a single TCP connection caps throughput.
+
+        Every connection is drained by its own writer thread. Messages
+        sent with the same `key` (e.g. the metric path) always use the same
+        connection, so per-metric ordering is preserved; messages without
+        a key are spread round-robin.
+
+        send() does not wait for the write: it returns a Future which
+        completes with True once the lane has written the message, or with
+        False if the lane could not.
+
+    """
+    def __init__(self, carbon_server, carbon_port, pool_size=4):
+        self.carbon_server = carbon_server
+        self.carbon_port = carbon_port
+        self.pool_size = max(1, int(pool_size))
+        self.lanes = []
+        self.lock = threading.Lock()
+        self.next_lane = 0
+        for i in range(self.pool_size):
+            self.lanes.append(self.SocketLane(Socket(carbon_server, carbon_port), i))
+        TransportLayer.__init__(self)
+        log.info("Created pool of {0} connections to {1}:{2}".format(self.pool_size, carbon_server, carbon_port))
+
+    def send(self, message, key=None):
+        if key is None:
+            with self.lock:
+                index = self.next_lane
+                self.next_lane = (index + 1) % self.pool_size
+        else:
+            index = (zlib.crc32(key) & 0xffffffff) % self.pool_size
+        return self.lanes[index].put(message)
+
+    def get_stats(self):
+        return [lane.get_stats() for lane in self.lanes]
+
+    def close(self):
+        for lane in self.lanes:
+            lane.con.close()
+
+    class SocketLane:
+
+        def __init__(self, con, index):
+            self.con = con
+            self.index = index
+            self.queue = Queue()
+            self.lock = threading.Lock()
+            self.payloads = 0
+            self.bytes = 0
+            self.errors = 0
+            thread = threading.Thread(target=self._run, name="SocketLane-%d" % index)
+            thread.daemon = True
+            thread.start()
+
+        def put(self, message):
+            future = Future()
+            self.queue.put((message, future))
+            return future
+
+        def _run(self):
+            while True:
+                messages = [self.queue.get()]
+                try:
+                    while True:
+                        messages.append(self.queue.get_nowait())
+                except Empty:
+                    pass
+                payload = ''.join(message for message, _ in messages)
+                sent = self.con.send(payload)
+                with self.lock:
+                    if sent:
+                        self.payloads += len(messages)
+                        self.bytes += len(payload)
+                    else:
+                        self.errors += len(messages)
+                for _, future in messages:
+                    future.set_result(sent)
 
+        def get_stats(self):
+            with self.lock:
+                return {
+                    "lane": self.index,
+                    "payloads": self.payloads,
+                    "bytes": self.bytes,
+                    "errors": self.errors,
+                    "pending": self.queue.qsize()
+                }
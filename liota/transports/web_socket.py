@@ -30,24 +30,106 @@
 #  THE POSSIBILITY OF SUCH DAMAGE.                                            #
 # ----------------------------------------------------------------------------#
 
-import json
+
+from collections import deque
 import logging
 import os
+import random
 import ssl
 import sys
-from websocket import create_connection
+import threading
+import time
+from websocket import ABNF, create_connection
 
 from transport_layer_base import TransportLayer
+from permessage_deflate import InflatingFrameBuffer
+from liota.utilities import serializer
+from liota.utilities.concurrency import Future
 log = logging.getLogger(__name__)
 
+# Lanes of outgoing messages. Session messages (the Helix handshake) are
+# written even while the connection is held after a reconnect; control
+# messages (registration, relationships, properties) are always written
+# before queued stats
+PRIORITY_SESSION = 0
+PRIORITY_CONTROL = 1
+PRIORITY_DATA = 2
+
 class WebSocket(TransportLayer):
     """ WebSocket class implementation
 
+        One receiving thread per connection, started by start(), parses every
+        message once and dispatches it: a response whose transactionID has a
+        pending request() completes that request's Future, any other message
+        goes to the handler added for its type, or to default_handler.
+
+        Messages are written by one sending thread from prioritized lanes.
+        Control messages jump ahead of queued data messages, so that e.g. an
+        action response is not delayed behind a backlog of stats. send()
+        never blocks: once `max_pending_data` data messages are queued the
+        oldest one is dropped.
+
+        A lost connection is reestablished in the background with an
+        exponential backoff. reconnect_handler, if set, is called before
+        the new connection is established, which is then held until
+        release(), e.g. once a handshake completed. Data messages count as
+        delivered once the server answered a ping sent after them; those
+        not acknowledged when the connection was lost are sent again, in
+        order, ahead of the queued ones. At most `max_pending_data` of them
+        are kept; get_stats() counts those dropped beyond that as
+        unacked_dropped, apart from the queued ones dropped.
+
+        send() calls `on_delivered(True)`, if given, once the server
+        answered a ping sent after the message, and `on_delivered(False)`
+        if the message was dropped or the connection was lost first; data
+        messages sent again after a reconnect are not tracked any more.
+
+        Messages are compressed with permessage-deflate if `compression`, a
+        PerMessageDeflate, is given and the server accepts the extension.
+
     """
-    def __init__(self, url):
+    def __init__(self, url, max_pending_data=1024, compression=None, ack_interval=64,
+                 initial_backoff=0.5, max_backoff=30.0):
         self.url = url
+        self.max_pending_data = max_pending_data
+        self.compression = compression
+        self.compressing = False
+        self.ack_interval = ack_interval
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.outbox = threading.Condition(threading.Lock())
+        self.lanes = (deque(), deque(), deque())
+        self.writing = False
+        # While held only session messages are written
+        self.held = False
+        # (sequence, message) of data messages written but not acknowledged
+        self.unacked = deque()
+        self.sequence = 0
+        self.acked = 0
+        # (sequence, on_delivered) of messages written but not acknowledged
+        self.deliveries = deque()
+        # Data messages dropped because the outbox was full, and because
+        # too many were written without an acknowledgement
+        self.dropped = 0
+        self.unacked_dropped = 0
+        self.replayed = 0
+        self.reconnects = 0
+        self.closed = False
+        self.connect_lock = threading.Lock()
+        self.reconnect_handler = None
+        self.lock = threading.Lock()
+        self.counter = 0
+        # message type -> handler(msg)
+        self.handlers = {}
+        self.default_handler = None
+        # transactionID -> Future of the response
+        self.waiters = {}
+        self.receiver = None
         self.connect_soc()
         TransportLayer.__init__(self)
+        self.writer = threading.Thread(target=self._write_loop, name="WebSocketWriter")
+        self.writer.daemon = True
+        self.writer.start()
 
     def connect_soc(self):
         try:
@@ -60,81 +142,364 @@ class WebSocket(TransportLayer):
 
     def WebSocketConnection(self, host, verify_cert=True, CERTDIR="/var/lib/helix-agent/cert"):
 
+      header = []
+      if self.compression is not None:
+          header.append(self.compression.offer())
+      ws = None
       if not verify_cert:
-            self.ws = None
-            self.ws = create_connection(host, enable_multithread=True,
+            ws = create_connection(host, enable_multithread=True, header=header,
               sslopt={"cert_reqs": ssl.CERT_NONE})
       else:
-         self.ws = None
          for filename in os.listdir(CERTDIR):
             if os.path.isfile(CERTDIR + "/" + filename):
                try:
-                  self.ws = create_connection(host, enable_multithread=True,
+                  ws = create_connection(host, enable_multithread=True, header=header,
                      sslopt={"cert_reqs": ssl.CERT_REQUIRED, "ca_certs": CERTDIR + "/" + filename})
                   break
                except ssl.SSLError:
                   pass
-         if self.ws is None:
+         if ws is None:
             raise(IOError("Couldn't verify host certificate"))
 
-      self.counter = 0
+      self.compressing = False
+      if self.compression is not None:
+          self.compressing = self.compression.accept(ws.getheaders())
+          if self.compressing:
+              log.info("Using permessage-deflate")
+          else:
+              log.warn("Server did not accept permessage-deflate, sending uncompressed")
+      # Accepts compressed frames, and hands out pongs which acknowledge data messages
+      ws.frame_buffer = InflatingFrameBuffer(ws._recv, True)
+      self.ws = ws
+
+    def add_handler(self, msg_type, handler):
+        with self.lock:
+            self.handlers[msg_type] = handler
+
+    def remove_handler(self, msg_type):
+        with self.lock:
+            self.handlers.pop(msg_type, None)
+
+    def request(self, msg):
+        """ Sends `msg` and returns a Future which completes with the
+            response carrying the same transactionID, or fails if the
+            connection is lost first.
+
+        """
+        future = Future()
+        with self.lock:
+            self.waiters[msg["transactionID"]] = future
+        self.send(msg)
+        return future
+
+    def cancel(self, transaction_id):
+        """ Stops waiting for the response to a request, e.g. before it is
+            sent again; a late response goes to the handler of its type.
+
+        """
+        with self.lock:
+            future = self.waiters.pop(transaction_id, None)
+        if future is not None:
+            future.set_exception(RuntimeError("Request {0} cancelled".format(transaction_id)))
+
+    def start(self):
+        """ Starts the receiving thread, unless it is running already.
+
+        """
+        with self.lock:
+            if self.receiver is not None:
+                return
+            self.receiver = threading.Thread(target=self.run, name="WebSocketReceiver")
+            self.receiver.daemon = True
+        self.receiver.start()
+
+    def dispatch(self, msg):
+        with self.lock:
+            future = self.waiters.pop(msg.get("transactionID"), None)
+            if future is None:
+                handler = self.handlers.get(msg.get("type"), self.default_handler)
+        if future is not None:
+            future.set_result(msg)
+        elif handler is not None:
+            handler(msg)
+        else:
+            log.warn("No handler for message {0}".format(msg.get("type")))
 
     def run(self):
-        try:
-            log.debug("Stream Opened")
-            while True:
-                msg = self.ws.recv()
-                log.debug ("Message received while running {0}".format(msg))
-                if msg is "":
-                    # TO DO Check if os._exit(0) required everywhere
-                    log.error("Stream Closed")
-                    os._exit(0)
+        log.debug("Stream Opened")
+        while not self.closed:
+            ws = self.ws
+            try:
+                msg = self._recv_message(ws)
+            except Exception, err:
+                if self.closed:
                     break
-                log.debug("RX {0}".format(msg))
-                if self.on_receive is not None:
-                    self.on_receive(msg)
-        except Exception:
-            log.exception("Exception on receiving the response from Server, please check the connection and try again.")
-            self.close()
-            os._exit(0)
-
-    def send(self, msg):
-      request_calls = ['request', 'response']
-      complete_message = json.dumps(msg)
-      log.info("TX Sending message {0}".format(complete_message))
+                log.warn("Connection lost while receiving ({0}), reconnecting".format(err))
+                self._reconnect(ws)
+                continue
+            if msg is None:
+                continue
+            if msg == "":
+                log.error("Stream Closed")
+                self._reconnect(ws)
+                continue
+            log.debug("RX {0}".format(msg))
+            try:
+                msg = serializer.loads(msg)
+            except ValueError:
+                log.exception("Malformed message received")
+                continue
+            try:
+                self.dispatch(msg)
+            except Exception:
+                log.exception("Error while handling message {0}".format(msg.get("type")))
+
+    def _recv_message(self, ws):
+        # Returns the next message, "" if the server closed the connection
+        # or None after a pong
+        fragments = []
+        compressed = False
+        while True:
+            frame = ws.recv_frame()
+            if frame.opcode == ABNF.OPCODE_PING:
+                ws.pong(frame.data)
+                continue
+            if frame.opcode == ABNF.OPCODE_PONG:
+                self._acknowledge(frame.data)
+                return None
+            if frame.opcode == ABNF.OPCODE_CLOSE:
+                return ""
+            if frame.opcode != ABNF.OPCODE_CONT:
+                # rsv1 of the first frame marks a compressed message
+                compressed = frame.rsv1
+                fragments = []
+            fragments.append(frame.data)
+            if frame.fin:
+                break
+        data = "".join(fragments)
+        if compressed:
+            if not self.compressing:
+                raise IOError("Compressed message without permessage-deflate")
+            data = self.compression.decompress(data)
+        return data
+
+    def _send_message(self, ws, complete_message):
+        if not self.compressing:
+            ws.send(complete_message)
+            return
+        if isinstance(complete_message, unicode):
+            complete_message = complete_message.encode("utf-8")
+        payload, compressed = self.compression.compress(complete_message)
+        frame = ABNF.create_frame(payload, ABNF.OPCODE_TEXT)
+        frame.rsv1 = 1 if compressed else 0
+        ws.send_frame(frame)
+
+    def get_stats(self):
+        with self.outbox:
+            stats = {
+                "pending": [len(lane) for lane in self.lanes],
+                "unacked": len(self.unacked),
+                "dropped": self.dropped,
+                "unacked_dropped": self.unacked_dropped,
+                "replayed": self.replayed,
+                "reconnects": self.reconnects
+            }
+        if self.compression is not None:
+            stats["compression"] = self.compression.get_stats()
+        return stats
+
+    def send(self, msg, priority=PRIORITY_CONTROL, on_delivered=None):
+      """ Queues `msg` in the lane of `priority`, PRIORITY_SESSION,
+          PRIORITY_CONTROL or PRIORITY_DATA, for the sending thread.
+          on_delivered(delivered), if given, is called once the server
+          acknowledged the message, or it was lost.
+
+      """
+      # Messages may be handed over already serialized
+      if isinstance(msg, basestring):
+          complete_message = msg
+      else:
+          complete_message = serializer.dumps(msg)
+      lane = self.lanes[priority]
+      dropped = None
+      with self.outbox:
+          if priority == PRIORITY_DATA and len(lane) >= self.max_pending_data:
+              _, dropped = lane.popleft()
+              self.dropped += 1
+              if self.dropped % 100 == 1:
+                  log.warn("Outbox full, dropped {0} data messages so far".format(self.dropped))
+          lane.append((complete_message, on_delivered))
+          self.outbox.notify_all()
+      if dropped is not None:
+          dropped(False)
+
+    def pending(self):
+      """ Returns the number of queued messages.
+
+      """
+      with self.outbox:
+          return sum(len(lane) for lane in self.lanes)
+
+    def flush(self, timeout=None):
+      """ Waits until all queued messages are written; returns False if
+          `timeout` seconds passed first.
+
+      """
+      deadline = None if timeout is None else time.time() + timeout
+      with self.outbox:
+          while self.writing or any(self.lanes):
+              if deadline is None:
+                  self.outbox.wait()
+              else:
+                  remaining = deadline - time.time()
+                  if remaining <= 0:
+                      return False
+                  self.outbox.wait(remaining)
+      return True
+
+    def hold(self):
+      """ Writes only session messages until release() is called.
+
+      """
+      with self.outbox:
+          self.held = True
+
+    def release(self):
+      with self.outbox:
+          self.held = False
+          self.outbox.notify_all()
+
+    def _next_message(self):
+      # Called with the outbox lock held
+      if self.lanes[PRIORITY_SESSION]:
+          return PRIORITY_SESSION, self.lanes[PRIORITY_SESSION].popleft()
+      if self.held:
+          return None, None
+      for priority in (PRIORITY_CONTROL, PRIORITY_DATA):
+          if self.lanes[priority]:
+              return priority, self.lanes[priority].popleft()
+      return None, None
+
+    def _write_loop(self):
+      while not self.closed:
+          with self.outbox:
+              self.writing = False
+              self.outbox.notify_all()
+              priority, entry = self._next_message()
+              while entry is None and not self.closed:
+                  self.outbox.wait()
+                  priority, entry = self._next_message()
+              if entry is None:
+                  break
+              self.writing = True
+              complete_message, on_delivered = entry
+              tracked = priority == PRIORITY_DATA or on_delivered is not None
+              if tracked:
+                  self.sequence += 1
+                  sequence = self.sequence
+              if priority == PRIORITY_DATA:
+                  self.unacked.append((sequence, complete_message))
+                  if len(self.unacked) > self.max_pending_data:
+                      self.unacked.popleft()
+                      self.unacked_dropped += 1
+                      if self.unacked_dropped % 100 == 1:
+                          log.warn("Too many unacknowledged data messages, dropped {0} so far".format(
+                              self.unacked_dropped))
+              idle = not any(self.lanes)
+          ws = self.ws
+          log.debug("TX Sending message %s", complete_message)
+          try:
+              self._send_message(ws, complete_message)
+              if on_delivered is not None:
+                  with self.outbox:
+                      self.deliveries.append((sequence, on_delivered))
+              if tracked and (idle or on_delivered is not None or sequence % self.ack_interval == 0):
+                  # Acknowledged by the pong, once the server has read everything before
+                  ws.ping(str(sequence))
+          except Exception, err:
+              log.warn("Connection lost while sending ({0}), reconnecting".format(err))
+              if priority != PRIORITY_DATA:
+                  # Data messages are sent again from unacked
+                  with self.outbox:
+                      self.lanes[priority].appendleft(entry)
+              self._reconnect(ws)
+
+    def _acknowledge(self, data):
       try:
-          self.ws.send(complete_message)
-      except:
-          # Retry logic only for publishing stats, not for request or response calls
-          if all(request not in complete_message for request in request_calls):
-              attempts = 1
-              while attempts < 4:
-                  try:
-                      log.info("Exception while sending data, applying retry logic.")
-                      self.connect_soc()
-                      log.info("Created New Websocket")
-                      log.info("TX Sending message {0}".format(complete_message))
-                      self.ws.send(complete_message)
-                      break
-                  except Exception:
-                      # Three times retry websocket connection for publishing data
-                      log.info("{0} attempt".format(attempts))
-                      attempts += 1
-                      if attempts == 4:
-                          log.exception("Exception while sending data, please check the connection and try again.")
-                          self.close()
-                          os._exit(0)
-          else:
-              log.exception("Exception while sending data, please check the connection and try again.")
-              self.close()
-              os._exit(0)
+          sequence = int(data)
+      except ValueError:
+          return
+      delivered = []
+      with self.outbox:
+          while self.unacked and self.unacked[0][0] <= sequence:
+              self.unacked.popleft()
+          while self.deliveries and self.deliveries[0][0] <= sequence:
+              delivered.append(self.deliveries.popleft()[1])
+          self.acked = max(self.acked, sequence)
+      for on_delivered in delivered:
+          on_delivered(True)
+
+    def _reconnect(self, failed_ws):
+      """ Replaces the connection `failed_ws`, unless another thread did
+          already, retrying with an exponential backoff.
+
+      """
+      with self.connect_lock:
+          if self.ws is not failed_ws or self.closed:
+              return
+          try:
+              failed_ws.close()
+          except Exception:
+              pass
+          if self.reconnect_handler is not None:
+              # Nothing but session messages until the handler releases
+              # the connection, e.g. once a handshake completed
+              self.hold()
+              try:
+                  self.reconnect_handler()
+              except Exception:
+                  log.exception("Error in reconnect handler")
+          backoff = self.initial_backoff
+          while not self.closed:
+              try:
+                  self.WebSocketConnection(self.url, False)
+                  break
+              except Exception, err:
+                  delay = backoff * random.uniform(0.8, 1.2)
+                  log.warn("Could not reconnect to {0} ({1}), trying again in {2:.1f}s".format(self.url, err, delay))
+                  time.sleep(delay)
+                  backoff = min(backoff * 2, self.max_backoff)
+          if self.closed:
+              return
+          self.reconnects += 1
+          log.info("Reconnected to {0}".format(self.url))
+          with self.outbox:
+              # Stats not acknowledged by the old connection go first, in order
+              replay = [(message, None) for _, message in self.unacked]
+              self.unacked.clear()
+              self.lanes[PRIORITY_DATA].extendleft(reversed(replay))
+              self.replayed += len(replay)
+              lost = [on_delivered for _, on_delivered in self.deliveries]
+              self.deliveries.clear()
+              self.outbox.notify_all()
+          for on_delivered in lost:
+              on_delivered(False)
+          # Responses to requests sent on the old connection will not come
+          with self.lock:
+              waiters, self.waiters = self.waiters, {}
+          for transaction_id, future in waiters.items():
+              future.set_exception(IOError("Connection lost before response to {0}".format(transaction_id)))
 
     def next_id(self):
-      self.counter = (self.counter + 1) & 0xffffff
-      # Enforce even IDs
-      return self.counter * 2
+      with self.lock:
+          self.counter = (self.counter + 1) & 0xffffff
+          # Enforce even IDs
+          return self.counter * 2
 
     def close(self):
+      self.closed = True
+      with self.outbox:
+          self.outbox.notify_all()
       if self.ws is not None:
           self.ws.close()
       log.debug("Connection closed, cleanup done")
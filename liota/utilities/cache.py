@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+from collections import OrderedDict
+import functools
+import logging
+import threading
+import time
+
+from liota.utilities.concurrency import Future
+
+log = logging.getLogger(__name__)
+
+
+class ReadCache:
+    """ Recent results of source reads, e.g. of a sensor that several
+        metrics are computed from, so that metrics sampled at about the same
+        time share one read.
+
+        A value is reused for `ttl` seconds after it was read. At most
+        `max_size` values are kept; the least recently used one is evicted
+        beyond that. Callers asking for a key while it is being read wait
+        for that read instead of starting another one. A read that raises is
+        not cached; the exception is raised to every caller waiting for it.
+
+    """
+    def __init__(self, ttl=1.0, max_size=128):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        # key -> (time read, value), least recently used first
+        self.entries = OrderedDict()
+        # key -> Future of the read in progress
+        self.loading = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def get(self, key, read):
+        """ Returns the value of `key`, calling read() if there is no value
+            younger than ttl.
+
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                self.entries[key] = entry
+                self.hits += 1
+                return entry[1]
+            future = self.loading.get(key)
+            if future is not None:
+                self.hits += 1
+                owner = False
+            else:
+                self.misses += 1
+                future = self.loading[key] = Future()
+                owner = True
+        if not owner:
+            return future.result()
+        try:
+            value = read()
+        except Exception, err:
+            with self.lock:
+                self.errors += 1
+                del self.loading[key]
+            future.set_exception(err)
+            raise
+        with self.lock:
+            del self.loading[key]
+            self.entries[key] = (time.time(), value)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        future.set_result(value)
+        return value
+
+    def invalidate(self, key=None):
+        """ Forgets the value of `key`, or of every key.
+
+        """
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "size": len(self.entries),
+                "hit_ratio": float(self.hits) / max(self.hits + self.misses, 1)
+            }
+
+
+def cached(ttl=1.0, max_size=128, cache=None):
+    """ Decorator sharing the results of a source read through a ReadCache,
+        keyed by the arguments of the call:
+
+            @cached(ttl=5)
+            def read_temperature():
+                ...
+
+        The cache is available as the `cache` attribute of the decorated
+        function, e.g. for its statistics, and the function itself as its
+        `__wrapped__` attribute, through which Metric.collect() finds the
+        arguments it takes.
+
+    """
+    def decorator(fn):
+        read_cache = cache if cache is not None else ReadCache(ttl, max_size)
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            return read_cache.get((fn, args), lambda: fn(*args))
+        wrapper.cache = read_cache
+        wrapper.__wrapped__ = fn
+        return wrapper
+    return decorator
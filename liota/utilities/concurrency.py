@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import logging
+from Queue import Queue
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class Future:
+    """ Handle on the result of an operation that completes on another
+        thread, e.g. a resource registration waiting for its response.
+
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._done = False
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+
+    def done(self):
+        with self._condition:
+            return self._done
+
+    def _wait(self, timeout):
+        if timeout is None:
+            while not self._done:
+                self._condition.wait()
+            return
+        deadline = time.time() + timeout
+        while not self._done:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            self._condition.wait(remaining)
+
+    def result(self, timeout=None):
+        with self._condition:
+            self._wait(timeout)
+            if not self._done:
+                raise RuntimeError("Timed out waiting for result")
+            if self._exception is not None:
+                raise self._exception
+            return self._result
+
+    def exception(self, timeout=None):
+        with self._condition:
+            self._wait(timeout)
+            return self._exception
+
+    def add_done_callback(self, fn):
+        """ Calls fn(future) once the future is done, right away if it
+            already is.
+
+        """
+        with self._condition:
+            if not self._done:
+                self._callbacks.append(fn)
+                return
+        self._invoke(fn)
+
+    def set_result(self, result):
+        self._complete(result, None)
+
+    def set_exception(self, exception):
+        self._complete(None, exception)
+
+    def _complete(self, result, exception):
+        with self._condition:
+            if self._done:
+                return
+            self._result = result
+            self._exception = exception
+            self._done = True
+            callbacks, self._callbacks = self._callbacks, []
+            self._condition.notify_all()
+        for fn in callbacks:
+            self._invoke(fn)
+
+    def _invoke(self, fn):
+        try:
+            fn(self)
+        except Exception:
+            log.exception("Exception in future callback")
+
+
+class WorkerPool:
+    """ Small fixed set of daemon threads running submitted calls, so that
+        slow callbacks never block the thread that triggered them.
+
+        Every thread has a queue of its own. Calls submitted with
+        submit_ordered() and the same key go to the same thread, so they run
+        one after another in the order they were submitted; calls submitted
+        with submit() are spread over the threads and may run concurrently
+        and complete in any order.
+
+    """
+    def __init__(self, size=2, name="WorkerPool"):
+        self.queues = []
+        self.threads = []
+        self.lock = threading.Lock()
+        self.next_queue = 0
+        for i in range(size):
+            queue = Queue()
+            thread = threading.Thread(target=self._run, args=(queue,), name="%s-%d" % (name, i))
+            thread.daemon = True
+            thread.start()
+            self.queues.append(queue)
+            self.threads.append(thread)
+
+    def submit(self, fn, *args, **kwargs):
+        """ Queues fn(*args, **kwargs) and returns a Future of its result.
+
+        """
+        with self.lock:
+            queue = self.queues[self.next_queue]
+            self.next_queue = (self.next_queue + 1) % len(self.queues)
+        return self._put(queue, fn, args, kwargs)
+
+    def submit_ordered(self, key, fn, *args, **kwargs):
+        """ Queues fn(*args, **kwargs) behind the calls submitted with the
+            same `key` before, and returns a Future of its result.
+
+        """
+        return self._put(self.queues[hash(key) % len(self.queues)], fn, args, kwargs)
+
+    def _put(self, queue, fn, args, kwargs):
+        future = Future()
+        queue.put((future, fn, args, kwargs))
+        return future
+
+    def pending(self):
+        return sum(queue.qsize() for queue in self.queues)
+
+    def _run(self, queue):
+        while True:
+            future, fn, args, kwargs = queue.get()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception, err:
+                log.exception("Exception in worker")
+                future.set_exception(err)
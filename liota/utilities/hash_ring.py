@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import bisect
+import hashlib
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class ConsistentHashRing:
+    """ Maps keys (e.g. metric paths) onto a set of nodes using consistent
+        hashing, so that adding or removing a node only moves the keys
+        owned by that node.
+
+        Every node is placed on the ring `replicas` times (virtual nodes)
+        to keep the distribution of keys even across nodes.
+
+    """
+    def __init__(self, nodes=None, replicas=100):
+        self.replicas = replicas
+        self.nodes = []
+        self._keys = []
+        self._ring = {}
+        if nodes is not None:
+            for node in nodes:
+                self.add_node(node)
+
+    def _hash(self, key):
+        return long(hashlib.md5(str(key)).hexdigest()[:16], 16)
+
+    def add_node(self, node):
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for i in range(self.replicas):
+            point = self._hash("%s#%d" % (node, i))
+            self._ring[point] = node
+            bisect.insort(self._keys, point)
+        log.debug("Added node {0} to hash ring".format(node))
+
+    def remove_node(self, node):
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        for i in range(self.replicas):
+            point = self._hash("%s#%d" % (node, i))
+            del self._ring[point]
+            self._keys.remove(point)
+        log.debug("Removed node {0} from hash ring".format(node))
+
+    def get_node(self, key):
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, self._hash(key))
+        if index == len(self._keys):
+            index = 0
+        return self._ring[self._keys[index]]
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class Journal:
+    """ File of JSON records, one per line, which local state is rebuilt
+        from after a restart, e.g. by the ResourceRegistry and the
+        OfflineQueue.
+
+        load() reads the records of the file and then opens it for
+        append(). Every record appended is flushed right away, so it
+        survives a crash of the process, and a background thread syncs it to
+        disk within `sync_delay` seconds, so append() never waits for the
+        disk; a power loss may lose the records of the last `sync_delay`
+        seconds. close() syncs what is left. A line torn by a crash is
+        dropped when the file is loaded. compact() atomically replaces the
+        file with a new one holding only the given records.
+
+    """
+    def __init__(self, path, sync_delay=1.0, name="journal"):
+        self.path = path
+        self.sync_delay = sync_delay
+        self.name = name
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.file = None
+        self.records = 0
+        self.dirty = False
+        self.closed = False
+
+    def load(self, apply):
+        """ Calls apply(record) for every record of the file, in order, and
+            opens it for append(). Records that cannot be parsed, or for
+            which apply raises ValueError, KeyError, TypeError or
+            AttributeError, are skipped.
+
+        """
+        skipped = 0
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                data = f.read()
+            end = data.rfind("\n") + 1
+            if end < len(data):
+                # Drop a record torn by a crash, so new records start on a line of their own
+                with open(self.path, 'r+') as f:
+                    f.truncate(end)
+                skipped += 1
+            for line in data[:end].splitlines():
+                self.records += 1
+                try:
+                    apply(json.loads(line))
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    skipped += 1
+        if skipped:
+            log.warn("Skipped {0} unreadable records of {1} {2}".format(skipped, self.name, self.path))
+        self.file = open(self.path, 'a')
+        thread = threading.Thread(target=self._sync_loop, name="JournalSync")
+        thread.daemon = True
+        thread.start()
+
+    def append(self, record):
+        with self.lock:
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+            self.records += 1
+            self.dirty = True
+            self.changed.notify()
+
+    def compact(self, records):
+        """ Replaces the file with one holding only `records`.
+
+        """
+        with self.lock:
+            tmp_path = self.path + ".tmp"
+            count = 0
+            with open(tmp_path, 'w') as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+                    count += 1
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(tmp_path, self.path)
+            if self.file is not None:
+                self.file.close()
+                self.file = open(self.path, 'a')
+            self.records = count
+            self.dirty = False
+        log.info("Compacted {0} {1}".format(self.name, self.path))
+
+    def close(self):
+        with self.lock:
+            if self.closed or self.file is None:
+                return
+            self.closed = True
+            self.changed.notify()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+    def _sync_loop(self):
+        while True:
+            with self.lock:
+                while not self.dirty and not self.closed:
+                    self.changed.wait()
+                if self.closed:
+                    return
+                self.dirty = False
+                # Synced through a descriptor of its own, so that append()
+                # and compact() need not wait for the disk
+                fd = os.dup(self.file.fileno())
+            try:
+                os.fsync(fd)
+            except OSError:
+                log.exception("Error while syncing {0} {1}".format(self.name, self.path))
+            finally:
+                os.close(fd)
+            time.sleep(self.sync_delay)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+from array import array
+
+
+class RingBuffer:
+    """ Fixed-size buffer of the most recent `capacity` numbers, stored
+        unboxed in an array of `typecode` (see the array module), for a
+        single writer sampling at a high rate.
+
+        Every value written gets a sequence number, counting from 0. Values
+        can be read back by sequence number as long as they have not been
+        overwritten, i.e. are among the last `capacity` values written.
+
+    """
+    def __init__(self, capacity, typecode="d"):
+        self.capacity = capacity
+        self.data = array(typecode, [0]) * capacity
+        # Sequence number of the next value written
+        self.written = 0
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    def write(self, value):
+        self.data[self.written % self.capacity] = value
+        # Readers only use slots below `written`, so it is updated last
+        self.written += 1
+
+    def read(self, start, count):
+        """ Returns an array of the `count` values starting at sequence number
+            `start`. Raises IndexError if some of them have been overwritten
+            or not written yet.
+
+        """
+        written = self.written
+        if start < written - self.capacity or start + count > written:
+            raise IndexError("Values {0} to {1} are not in the buffer (written: {2})".format(
+                start, start + count, written))
+        begin = start % self.capacity
+        end = begin + count
+        if end <= self.capacity:
+            block = self.data[begin:end]
+        else:
+            block = self.data[begin:] + self.data[:end - self.capacity]
+        if start < self.written - self.capacity:
+            # Overwritten while it was copied
+            raise IndexError("Values from {0} were overwritten while read".format(start))
+        return block
+
+    def latest(self, count):
+        """ Returns the last `count` values written, or all of them if fewer.
+
+        """
+        written = self.written
+        count = min(count, written, self.capacity)
+        return self.read(written - count, count)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import json
+
+# JSON backend: ujson if it is installed, the standard library otherwise
+try:
+    import ujson
+    # Older releases round floats to 9 digits by default
+    ujson.dumps(0.1, double_precision=15)
+except (ImportError, TypeError):
+    ujson = None
+
+if ujson is not None:
+    BACKEND = "ujson"
+
+    def dumps(obj):
+        return ujson.dumps(obj, double_precision=15)
+
+    loads = ujson.loads
+else:
+    BACKEND = "json"
+    _encoder = json.JSONEncoder(separators=(',', ':'))
+    dumps = _encoder.encode
+    loads = json.loads
+    if json.encoder.c_make_encoder is not None:
+        # JSONEncoder.encode() sets up the C encoder again on every call,
+        # which costs more than encoding a short list of samples
+        _c_encode = json.encoder.c_make_encoder(None, _encoder.default, json.encoder.encode_basestring_ascii,
+                                                None, ':', ',', False, False, True)
+
+        def dumps(obj):
+            return "".join(_c_encode(obj, 0))
+
+
+class Template:
+    """ JSON object which is serialized once, except for the values of
+        `fields`, so that only those are serialized on every render(),
+        e.g. the timestamps and data of an add_stats message of a metric.
+
+        The fields follow the other members of the object, in the order
+        they are given.
+
+    """
+    def __init__(self, obj, fields):
+        self.fields = fields
+        static = dumps(dict((key, value) for key, value in obj.items() if key not in fields))
+        parts = [static[:-1]]
+        for field in fields:
+            if parts[-1] != "{":
+                parts[-1] += ","
+            parts[-1] += dumps(field) + ":"
+            parts.append("")
+        parts[-1] += "}"
+        self.static_size = sum(len(part) for part in parts)
+        self.format = "%s".join(part.replace("%", "%%") for part in parts)
+
+    def render(self, *values):
+        """ Returns the serialized object, given the values of `fields` in
+            the same order.
+
+        """
+        return self.format % tuple(map(dumps, values))
+
+    def render_serialized(self, *texts):
+        """ Like render(), for values which are serialized already.
+
+        """
+        return self.format % texts
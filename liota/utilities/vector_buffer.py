@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+from array import array
+
+# Backend: numpy if it is installed, the array module otherwise
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Typecodes of the array module, which numpy takes as dtype codes of the same
+# C types, so both backends store e.g. "l" as a C long of the platform
+TYPECODES = "bBhHiIlLfd"
+
+
+class RowView:
+    """ Row of a VectorBuffer on the array backend, read in place.
+
+    """
+    def __init__(self, data, start, length):
+        self.data = data
+        self.start = start
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.tolist()[index]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("Row index out of range")
+        return self.data[self.start + index]
+
+    def __iter__(self):
+        return iter(self.data[self.start:self.start + self.length])
+
+    def tolist(self):
+        return self.data[self.start:self.start + self.length].tolist()
+
+
+class VectorBuffer:
+    """ Preallocated storage of `capacity` vectors of `length` numbers of
+        type `typecode` (see the array module), one row per vector.
+
+        Rows are written in place, so storing a vector allocates no Python
+        objects per element, and are read through views of the buffer: a
+        numpy array if numpy is installed (or `use_numpy` is set), a RowView
+        otherwise. A view shows whatever the row holds when it is read, so
+        it is only valid until the row is written again.
+
+    """
+    def __init__(self, length, capacity, typecode="d", use_numpy=None):
+        if typecode not in TYPECODES:
+            raise ValueError("Unsupported typecode {0}, expected one of {1}".format(typecode, TYPECODES))
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        self.length = length
+        self.capacity = capacity
+        self.typecode = typecode
+        self.use_numpy = use_numpy
+        if use_numpy:
+            self.data = numpy.zeros((capacity, length), dtype=typecode)
+            self.rows = [self.data[i] for i in range(capacity)]
+        else:
+            self.data = array(typecode, [0]) * (capacity * length)
+            self.rows = [RowView(self.data, i * length, length) for i in range(capacity)]
+
+    def write(self, row, vector):
+        """ Copies `vector`, any sequence of `length` numbers, into row `row`
+            and returns the view of that row.
+
+        """
+        if len(vector) != self.length:
+            raise ValueError("Expected a vector of {0} values, got {1}".format(self.length, len(vector)))
+        if self.use_numpy:
+            self.data[row] = vector
+        else:
+            if not isinstance(vector, array) or vector.typecode != self.typecode:
+                vector = array(self.typecode, vector)
+            start = row * self.length
+            self.data[start:start + self.length] = vector
+        return self.rows[row]
+
+    def columns(self, views):
+        """ Returns the elements of the given row views by column, as lists
+            of Python numbers ready to be serialized: [[v[0] of every view],
+            [v[1] of every view], ...].
+
+        """
+        if not views:
+            return [[] for _ in range(self.length)]
+        if self.use_numpy:
+            return numpy.array(views).T.tolist()
+        return [list(column) for column in zip(*views)]
+
+    def tolists(self, views):
+        """ Returns the given row views as lists of Python numbers.
+
+        """
+        return [view.tolist() for view in views]
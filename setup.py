@@ -87,6 +87,7 @@ setup(
                 'example/vrops_simulated.py',
                 'example/graphite_withTemp.py',
                 'example/graphite_event_based.py',
+                'example/mqtt_simulated.py',
                 'example/sampleProp.conf']),
                 (os.path.abspath(os.sep) + '/../etc/liota/conf', ['config/liota.conf', 'config/logging.json']),
                 (os.path.abspath(os.sep) + '/../etc/liota', ['BSD_LICENSE.txt', 'BSD_NOTICE.txt']),
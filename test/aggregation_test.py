@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import unittest
+
+from liota.core.metric_handler import Metric
+from liota.transformers import aggregation
+from liota.transformers.aggregation import WindowAggregator
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.transformers.aggregation
+# It checks the statistics of every complete window, with numpy if it is
+# installed and without, that the samples of the latest window are kept for
+# the next call, and that a metric sends the derived series instead of its
+# samples.
+
+class WindowAggregatorTest(unittest.TestCase):
+
+    def check(self, use_numpy):
+        aggregator = WindowAggregator(window_sec=10, use_numpy=use_numpy)
+        outputs = dict(aggregator.process("temp", [(0, 1), (5000, 3), (10000, 10), (19999, 10), (20000, 7)]))
+        self.assertEqual(outputs["temp.count"], [(0, 2), (10000, 2)])
+        self.assertEqual(outputs["temp.min"], [(0, 1.0), (10000, 10.0)])
+        self.assertEqual(outputs["temp.max"], [(0, 3.0), (10000, 10.0)])
+        self.assertEqual(outputs["temp.mean"], [(0, 2.0), (10000, 10.0)])
+        self.assertEqual(outputs["temp.stddev"], [(0, 1.0), (10000, 0.0)])
+        self.assertNotIn("temp", outputs)
+        self.assertEqual(aggregator.pending, [(20000, 7)])
+        outputs = dict(aggregator.process("temp", [(25000, 9), (30000, 0)]))
+        self.assertEqual(outputs["temp.mean"], [(20000, 8.0)])
+
+    def test_python(self):
+        self.check(False)
+
+    @unittest.skipIf(aggregation.numpy is None, "numpy is not installed")
+    def test_numpy(self):
+        self.check(True)
+
+    def test_metric_sends_derived_series(self):
+        metric = Metric(None, "temp", None, 1, 3, None, None)
+        metric.add_transform(WindowAggregator(window_sec=1, statistics=("mean",), keep_raw=True))
+        for t in (0, 500, 1000):
+            metric.add_sample(t, t / 100)
+        ready = metric.get_ready_to_send()
+        self.assertEqual([(series.details, series.values) for series in ready],
+                         [("temp", [(0, 0), (500, 5), (1000, 10)]), ("temp.mean", [(0, 2.5)])])
+        self.assertEqual(metric.values, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
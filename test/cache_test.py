@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import threading
+import time
+import unittest
+
+from liota.core.metric_handler import Metric
+from liota.utilities.cache import ReadCache, cached
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.utilities.cache
+# It checks that reads are shared within the ttl, also by callers asking at
+# the same time, that the least recently used values are evicted, and that
+# failed reads are not cached.
+
+class ReadCacheTest(unittest.TestCase):
+
+    def test_ttl(self):
+        reads = []
+        cache = ReadCache(ttl=0.05)
+        read = lambda: reads.append(1) or len(reads)
+        self.assertEqual(cache.get("temp", read), 1)
+        self.assertEqual(cache.get("temp", read), 1)
+        time.sleep(0.06)
+        self.assertEqual(cache.get("temp", read), 2)
+        stats = cache.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+
+    def test_lru(self):
+        cache = ReadCache(ttl=60, max_size=2)
+        cache.get("a", lambda: 1)
+        cache.get("b", lambda: 2)
+        cache.get("a", lambda: 0)
+        cache.get("c", lambda: 3)
+        self.assertEqual(cache.get("a", lambda: 0), 1)
+        self.assertEqual(cache.get("b", lambda: 0), 0)
+        self.assertEqual(cache.get_stats()["evictions"], 2)
+
+    def test_concurrent_callers_share_read(self):
+        reads = []
+        started = threading.Event()
+
+        @cached(ttl=60)
+        def read_sensor():
+            reads.append(1)
+            started.set()
+            time.sleep(0.1)
+            return 42
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(read_sensor())) for _ in range(5)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [42] * 5)
+        self.assertEqual(len(reads), 1)
+        self.assertEqual(read_sensor.cache.get_stats()["misses"], 1)
+
+    def test_error_not_cached(self):
+        cache = ReadCache(ttl=60)
+
+        def fail():
+            raise IOError("device gone")
+        self.assertRaises(IOError, cache.get, "temp", fail)
+        self.assertEqual(cache.get("temp", lambda: 7), 7)
+        self.assertEqual(cache.get_stats()["errors"], 1)
+
+
+class CachedSamplingFunctionTest(unittest.TestCase):
+
+    def test_arguments_kept(self):
+        calls = []
+
+        @cached(ttl=60)
+        def read_scaled(scale):
+            calls.append(scale)
+            return 10 * scale
+
+        @cached(ttl=60)
+        def read_default(scale=2):
+            calls.append(scale)
+            return 10 * scale
+
+        for sampling_function in (read_scaled, read_default):
+            metric = Metric(None, "temp", None, 1, 10, sampling_function, None)
+            metric.collect()
+            metric.collect()
+            self.assertEqual([v for _, v in metric.values], [10, 10])
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual(read_scaled.__wrapped__.__name__, "read_scaled")
+
+
+if __name__ == '__main__':
+    unittest.main()
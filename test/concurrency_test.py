@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import random
+import threading
+import time
+import unittest
+
+from liota.dcc.helix_protocol import HelixProtocol, SteadyState
+from liota.utilities.concurrency import WorkerPool
+
+#---------------------------------------------------------------------------
+# This is a testing script of WorkerPool of module liota.utilities.concurrency
+# and of the dispatch of vROps actions to it
+# It checks that calls submitted with one key run one after another in the
+# order submitted while those of other keys run alongside, and that actions
+# of each resource reach their handler in the order received.
+
+class Handler:
+
+    def __init__(self):
+        self.codes = []
+        self.running = 0
+        self.overlapped = False
+        self.lock = threading.Lock()
+
+    def on_change(self, code):
+        with self.lock:
+            self.running += 1
+            self.overlapped = self.overlapped or self.running > 1
+        time.sleep(random.uniform(0, 0.005))
+        with self.lock:
+            self.running -= 1
+            self.codes.append(code)
+
+
+class WorkerPoolTest(unittest.TestCase):
+
+    def test_ordered_per_key(self):
+        pool = WorkerPool(4)
+        handlers = dict((key, Handler()) for key in ("a", "b", "c"))
+        futures = [pool.submit_ordered(key, handlers[key].on_change, i) for i in range(20) for key in handlers]
+        for future in futures:
+            future.result(5)
+        for handler in handlers.values():
+            self.assertEqual(handler.codes, range(20))
+            self.assertFalse(handler.overlapped)
+        self.assertEqual(pool.pending(), 0)
+
+    def test_unordered_calls_spread(self):
+        pool = WorkerPool(2)
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+        pool.submit(block)
+        started.wait(5)
+        # Runs on the other thread while the first one is blocked
+        self.assertEqual(pool.submit(lambda: 42).result(5), 42)
+        release.set()
+
+    def test_exception(self):
+        pool = WorkerPool(1)
+        future = pool.submit(lambda: 1 / 0)
+        self.assertTrue(isinstance(future.exception(5), ZeroDivisionError))
+        self.assertEqual(pool.submit(lambda: 1).result(5), 1)
+
+
+class Connection:
+
+    def send(self, msg, priority=None):
+        pass
+
+
+class ActionDispatchTest(unittest.TestCase):
+
+    def test_actions_in_order_per_resource(self):
+        proto = HelixProtocol(Connection(), "user", "password", executor=WorkerPool(4))
+        state = SteadyState(proto.state, proto)
+        handlers = {"uuid-1": Handler(), "uuid-2": Handler()}
+        proto.action_map.update(handlers)
+        for code in ("on", "off", "on", "off"):
+            for uuid in handlers:
+                state.on_receive({"type": "action", "body": {"uuid": uuid, "code": code}})
+        state.on_receive({"type": "action", "body": {"uuid": "unknown", "code": "on"}})
+        deadline = time.time() + 5
+        while sum(len(handler.codes) for handler in handlers.values()) < 8 and time.time() < deadline:
+            time.sleep(0.01)
+        for handler in handlers.values():
+            self.assertEqual(handler.codes, ["on", "off", "on", "off"])
+            self.assertFalse(handler.overlapped)
+
+    def test_without_executor(self):
+        proto = HelixProtocol(Connection(), "user", "password")
+        state = SteadyState(proto.state, proto)
+        handler = Handler()
+        proto.action_map["uuid-1"] = handler
+        self.assertTrue(state.on_receive({"type": "action", "body": {"uuid": "uuid-1", "code": "on"}}))
+        self.assertEqual(handler.codes, ["on"])
+
+
+if __name__ == '__main__':
+    unittest.main()
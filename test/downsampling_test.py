@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import math
+import random
+import unittest
+
+from liota.core import metric_handler
+from liota.core.metric_handler import Metric
+from liota.dcc.dcc_base import DataCenterComponent
+from liota.transformers import downsampling
+from liota.transformers.downsampling import LttbDownsampler
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.transformers.downsampling
+# It checks that LTTB keeps the first and last samples and the peaks of a
+# series, that numpy and the pure Python version pick the same samples, and
+# that a data center component with a downsampler publishes downsampled
+# series while the metric is cleared as usual.
+
+class RecordingDcc(DataCenterComponent):
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, metric):
+        self.published.append((metric.details, list(metric.values)))
+
+    def subscribe(self):
+        pass
+
+
+class LttbDownsamplerTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.samples = [(1000 * i, math.sin(i / 50.0) + rng.gauss(0, 0.05)) for i in range(2000)]
+        self.samples[1234] = (1234000, 10.0)
+
+    def test_shape(self):
+        kept = LttbDownsampler(points=100, use_numpy=False).process("wave", self.samples)[0][1]
+        self.assertEqual(len(kept), 100)
+        self.assertEqual((kept[0], kept[-1]), (self.samples[0], self.samples[-1]))
+        self.assertIn((1234000, 10.0), kept)
+        self.assertEqual(kept, sorted(kept))
+
+    @unittest.skipIf(downsampling.numpy is None, "numpy is not installed")
+    def test_numpy_picks_the_same_samples(self):
+        for points in (3, 100, 1999):
+            self.assertEqual(LttbDownsampler(points, use_numpy=True).process("wave", self.samples),
+                             LttbDownsampler(points, use_numpy=False).process("wave", self.samples))
+
+    def test_short_and_non_numeric_series(self):
+        downsampler = LttbDownsampler(points=3)
+        self.assertEqual(downsampler.process("a", [(0, 1), (1, 2)]), [("a", [(0, 1), (1, 2)])])
+        states = [(i, "open") for i in range(10)]
+        self.assertEqual(downsampler.process("door", states), [("door", states)])
+
+    def test_dcc_transform(self):
+        dcc = RecordingDcc()
+        dcc.add_transform(LttbDownsampler(points=50))
+        metric = Metric(None, "wave", None, 1, len(self.samples), None, dcc)
+        for t, v in self.samples:
+            metric.add_sample(t, v)
+        metric_handler.send_batch([metric])
+        (details, values), = dcc.published
+        self.assertEqual((details, len(values)), ("wave", 50))
+        self.assertEqual(metric.values, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import unittest
+
+from liota.core.metric_handler import Metric
+from liota.transformers.filters import DeadbandFilter
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.transformers.filters
+# It checks which samples pass absolute and percent deadbands and plain
+# report-on-change, that the heartbeat sends an unchanged value, and that a
+# metric whose samples are all suppressed sends nothing.
+
+class DeadbandFilterTest(unittest.TestCase):
+
+    def values(self, deadband, samples):
+        return [v for _, v in deadband.process("temp", samples)[0][1]]
+
+    def test_absolute(self):
+        deadband = DeadbandFilter(absolute=0.5)
+        samples = list(enumerate([20.0, 20.1, 20.4, 20.6, 20.2, 20.0, 19.9]))
+        self.assertEqual(self.values(deadband, samples), [20.0, 20.6, 20.0])
+        self.assertEqual(deadband.get_stats()["suppressed"], 4)
+
+    def test_percent(self):
+        deadband = DeadbandFilter(percent=10)
+        self.assertEqual(self.values(deadband, list(enumerate([100, 109, 111, 121, 123]))), [100, 111, 123])
+
+    def test_on_change_and_heartbeat(self):
+        deadband = DeadbandFilter(heartbeat_sec=10)
+        samples = [(0, "closed"), (4000, "closed"), (8000, "open"), (12000, "open"), (18000, "open")]
+        self.assertEqual(deadband.process("door", samples), [("door", [(0, "closed"), (8000, "open"), (18000, "open")])])
+
+    def test_metric_sends_nothing_while_unchanged(self):
+        metric = Metric(None, "temp", None, 1, 2, None, None)
+        metric.add_transform(DeadbandFilter(absolute=0.5))
+        for t in range(4):
+            metric.add_sample(t, 20.0)
+            ready = metric.get_ready_to_send()
+            if t == 1:
+                self.assertEqual([series.values for series in ready], [[(0, 20.0)]])
+            else:
+                self.assertEqual(ready, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
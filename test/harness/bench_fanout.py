@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from liota.boards.gateway_dk300 import Dk300
+from liota.dcc.graphite_dcc import Graphite
+from liota.transports.socket_connection import Socket
+
+from run_benchmark import StandIn, drive
+
+log = logging.getLogger(__name__)
+
+#---------------------------------------------------------------------------
+# Benchmark of publishing the same metrics to two data center components.
+#
+# "separate" creates every metric on both Graphite DCCs, as the examples used
+# to, so every sensor is read twice; "bound" creates it on the first one and
+# binds it to the second, so every sensor is read once. Reading a sensor is
+# simulated by reading /proc/self/stat. Both DCCs send to carbon stand-ins in
+# a child process, so the CPU time reported belongs to the agent only.
+#
+# Example:
+#   python bench_fanout.py --metrics 500 --rounds 20
+
+sensor_reads = [0]
+
+
+def read_sensor():
+    sensor_reads[0] += 1
+    with open("/proc/self/stat") as f:
+        return len(f.read())
+
+
+def run(mode, args, stand_in):
+    sensor_reads[0] = 0
+    graphite = [Graphite(Socket("127.0.0.1", port)) for port in stand_in.endpoints]
+    gateways = [dcc.register(Dk300("bench-fanout-gw")) for dcc in graphite]
+    metrics = []
+    for m in range(args.metrics):
+        details = "bench.fanout.metric%d" % m
+        metric = graphite[0].create_metric(gateways[0], details, unit=None, sampling_function=read_sensor,
+                                           aggregation_size=args.aggregation)
+        metrics.append(metric)
+        if mode == "bound":
+            metric.bind(graphite[1], gateways[1])
+        else:
+            metrics.append(graphite[1].create_metric(gateways[1], details, unit=None, sampling_function=read_sensor,
+                                                     aggregation_size=args.aggregation))
+    stand_in.request("reset")
+    expected = 2 * args.metrics * args.rounds
+    times_before = os.times()
+    start = time.time()
+    drive(metrics, args.rounds)
+    stats = stand_in.wait_for(expected, args.timeout)
+    elapsed = time.time() - start
+    times_after = os.times()
+    cpu = (times_after[0] - times_before[0]) + (times_after[1] - times_before[1])
+    return {
+        "mode": mode,
+        "sensor_reads": sensor_reads[0],
+        "received": stats["datapoints"],
+        "expected": expected,
+        "elapsed_sec": elapsed,
+        "cpu_sec": cpu,
+        "cpu_us_per_datapoint": 1e6 * cpu / max(stats["datapoints"], 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of one metric published to two DCCs")
+    parser.add_argument("--metrics", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20, help="samples collected per metric")
+    parser.add_argument("--aggregation", type=int, default=5, help="aggregation_size of every metric")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    stand_in = StandIn("carbon", relays=2)
+    try:
+        print "%d metrics to 2 Graphite DCCs, %d rounds" % (args.metrics, args.rounds)
+        for mode in ("separate", "bound"):
+            report = run(mode, args, stand_in)
+            print "  %-10s %8d sensor reads  %8d/%d datapoints  %6.3f s CPU  %6.1f us/datapoint" % (
+                mode, report["sensor_reads"], report["received"], report["expected"], report["cpu_sec"],
+                report["cpu_us_per_datapoint"])
+    finally:
+        stand_in.stop()
+
+
+if __name__ == '__main__':
+    main()
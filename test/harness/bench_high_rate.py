@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import argparse
+import json
+import logging
+import math
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from liota.boards.gateway_dk300 import Dk300
+from liota.core.high_rate import HighRateSampler
+from liota.dcc.mqtt_dcc import MqttDcc
+from liota.transports.mqtt import Mqtt
+
+from run_benchmark import StandIn
+
+log = logging.getLogger(__name__)
+
+#---------------------------------------------------------------------------
+# Sustained sampling rate of waveform channels, published through MqttDcc to
+# the MQTT stand-in.
+#
+# "scheduler" samples every channel as a Metric with a sampling interval of
+# one period, through the priority queue and collection threads of the
+# metric handler; "high-rate" samples all channels in a HighRateSampler. The
+# sensor is a sine wave per channel. Every mode runs in a process of its
+# own; the report shows the samples per second and channel reached, the
+# datapoints received by the stand-in and the CPU time of the agent.
+#
+# Example:
+#   python bench_high_rate.py --channels 3 --rate 1000 --duration 5
+
+calls = [0]
+
+
+def make_sensor(channels):
+    frequencies = [2 * math.pi * (50 + 10 * c) for c in range(channels)]
+
+    def read_waveform():
+        calls[0] += 1
+        t = time.time()
+        return [math.sin(f * t) for f in frequencies]
+    return read_waveform
+
+
+def sample(mode, args):
+    mqtt = MqttDcc(Mqtt("127.0.0.1", args.port, max_inflight=args.max_inflight), batch_size=args.block_size)
+    gateway = mqtt.register(Dk300("bench-high-rate-gw"))
+    read_waveform = make_sensor(args.channels)
+    period = 1.0 / args.rate
+    sampler = None
+    times_before = os.times()
+    start = time.time()
+    if mode == "scheduler":
+        for c in range(args.channels):
+            metric = mqtt.create_metric(gateway, "wave%d" % c, unit=None,
+                                        sampling_function=lambda c=c: read_waveform()[c],
+                                        sampling_interval_sec=period, aggregation_size=args.block_size)
+            metric.start_collecting()
+    else:
+        sampler = HighRateSampler(read_waveform, period, block_size=args.block_size)
+        for c in range(args.channels):
+            sampler.add_metric(mqtt, gateway, "wave%d" % c, unit=None, channel=c)
+        sampler.start()
+    time.sleep(args.duration)
+    if sampler is not None:
+        sampler.stop()
+    elapsed = time.time() - start
+    times_after = os.times()
+    samples = calls[0] if mode == "high-rate" else calls[0] / args.channels
+    report = {
+        "mode": mode,
+        "rate_per_channel": samples / elapsed,
+        "samples": samples * args.channels,
+        "cpu_sec": (times_after[0] - times_before[0]) + (times_after[1] - times_before[1])
+    }
+    if sampler is not None:
+        report.update(sampler.get_stats())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sustained sampling rate of waveform channels")
+    parser.add_argument("--channels", type=int, default=3)
+    parser.add_argument("--rate", type=float, default=1000.0, help="samples per second and channel")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of sampling")
+    parser.add_argument("--block-size", type=int, default=500, help="samples per block or MQTT payload")
+    parser.add_argument("--max-inflight", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--mode", choices=["scheduler", "high-rate"], help="run one mode in this process")
+    parser.add_argument("--port", type=int, help="port of the MQTT stand-in, with --mode")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.mode is not None:
+        print json.dumps(sample(args.mode, args))
+        sys.stdout.flush()
+        # The scheduler threads of metric_handler never end
+        os._exit(0)
+
+    stand_in = StandIn("mqtt")
+    try:
+        print "%d channels at %d Hz for %.1f s" % (args.channels, args.rate, args.duration)
+        for mode in ("scheduler", "high-rate"):
+            stand_in.request("reset")
+            output = subprocess.check_output([
+                sys.executable, os.path.abspath(__file__), "--mode", mode, "--port", str(stand_in.endpoints[0]),
+                "--channels", str(args.channels), "--rate", str(args.rate), "--duration", str(args.duration),
+                "--block-size", str(args.block_size), "--max-inflight", str(args.max_inflight)])
+            report = json.loads(output.strip().splitlines()[-1])
+            # Samples still buffered when the process ended are not counted
+            stats = stand_in.wait_for(report["samples"] - args.block_size * args.channels, args.timeout)
+            line = "  %-10s %8.0f samples/s per channel  %8d datapoints received  %6.2f s CPU" % (
+                mode, report["rate_per_channel"], stats["datapoints"], report["cpu_sec"])
+            if mode == "high-rate":
+                line += "  %d missed  lateness mean %.0f us max %.0f us" % (
+                    report["missed"], report["mean_lateness_us"], report["max_lateness_us"])
+            print line
+    finally:
+        stand_in.stop()
+
+
+if __name__ == '__main__':
+    main()
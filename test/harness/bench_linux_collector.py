@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from linux_metrics import cpu_stat, disk_stat, net_stat, mem_stat
+from liota.collectors.linux_collector import LinuxCollector
+
+log = logging.getLogger(__name__)
+
+#---------------------------------------------------------------------------
+# Benchmark of the LinuxCollector against the sampling functions of
+# example/vrops_graphite_dk300_sample.py, which use linux_metrics.
+#
+# A tick reads CPU processes and utilization, disk busy time, free memory
+# and network bits received. The example functions open and parse a /proc
+# file per value, and sleep `--sample-duration` seconds to measure the CPU
+# utilization and the disk busy time; the collector reads all of them in one
+# pass over files it keeps open. The report shows the wall and CPU time per
+# tick, i.e. how long a collection thread is busy.
+#
+# Example:
+#   python bench_linux_collector.py --disk sda --interface eth0
+
+def example_tick(args):
+    # The sampling functions of the example, one per metric
+    return [
+        cpu_stat.procs_running(),
+        round(100 - cpu_stat.cpu_percents(args.sample_duration)['idle'], 2),
+        round(disk_stat.disk_busy(args.disk, args.sample_duration), 4),
+        round(mem_stat.mem_stats()[3] / 1048576, 3),
+        round(net_stat.rx_tx_bits(args.interface)[0] / 8192, 2)
+    ]
+
+
+def collector_tick(collector, args):
+    values = collector.sample()
+    return [values["cpu.procs_running"], values["cpu.utilization"], values["disk.%s.busy" % args.disk],
+            values["mem.free"], values["net.%s.rx" % args.interface]]
+
+
+def measure(tick, ticks):
+    times_before = os.times()
+    start = time.time()
+    for _ in range(ticks):
+        tick()
+    elapsed = time.time() - start
+    times_after = os.times()
+    cpu = (times_after[0] - times_before[0]) + (times_after[1] - times_before[1])
+    return elapsed / ticks, cpu / ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the Linux system metrics collector")
+    parser.add_argument("--disk", default="sda")
+    parser.add_argument("--interface", default="eth0")
+    parser.add_argument("--sample-duration", type=float, default=1.0,
+                        help="seconds the example functions sleep to measure utilizations")
+    parser.add_argument("--example-ticks", type=int, default=3)
+    parser.add_argument("--collector-ticks", type=int, default=10000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    collector = LinuxCollector(disks=[args.disk], interfaces=[args.interface])
+    print "5 system metrics per tick"
+    for name, tick, ticks in (("example", lambda: example_tick(args), args.example_ticks),
+                              ("collector", lambda: collector_tick(collector, args), args.collector_ticks)):
+        wall, cpu = measure(tick, ticks)
+        print "  %-10s %10.1f us wall  %8.1f us CPU per tick" % (name, 1e6 * wall, 1e6 * cpu)
+    collector.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from liota.boards.gateway_dk300 import Dk300
+from liota.dcc.vrops import Vrops
+from liota.transports.web_socket import WebSocket
+
+from helix_server import HelixServer
+
+#---------------------------------------------------------------------------
+# Startup time of a gateway with many metrics against the Helix stand-in:
+# creating the metrics, publishing their units and scheduling them, one
+# metric at a time (create_metric + start_collecting) or in bulk
+# (create_metrics, from a list of specs or from a spec file). Every mode
+# runs in a process of its own, so each starts with an empty scheduler.
+#
+# Example:
+#   python bench_provisioning.py --metrics 10000
+
+def sample():
+    return 0
+
+
+def specs(count):
+    return [{"details": "metric%d" % i, "unit": None, "sampling_function": sample,
+             "sampling_interval_sec": 3600, "aggregation_size": 6} for i in range(count)]
+
+
+def provision(mode, count):
+    server = HelixServer().start()
+    vrops = Vrops("bench", "bench", WebSocket(server.url))
+    gateway = vrops.register(Dk300("bench-provisioning-gw"))
+    server.reset()
+    spec_file = None
+    if mode == "file":
+        # Sampling functions are named by their dotted path in spec files
+        fd, spec_file = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump([dict(spec, sampling_function="bench_provisioning.sample") for spec in specs(count)], f)
+
+    start = time.time()
+    if mode == "single":
+        for spec in specs(count):
+            metric = vrops.create_metric(gateway, spec["details"], spec["unit"], spec["sampling_function"],
+                                         spec["sampling_interval_sec"], spec["aggregation_size"])
+            metric.start_collecting()
+    elif mode == "bulk":
+        vrops.create_metrics(gateway, specs(count), start_collecting=True)
+    else:
+        vrops.create_metrics(gateway, spec_file, start_collecting=True)
+    elapsed = time.time() - start
+
+    vrops.flush_properties()
+    vrops.con.flush(10)
+    time.sleep(0.2)
+    stats = server.get_stats()
+    if spec_file is not None:
+        os.remove(spec_file)
+    return {
+        "mode": mode,
+        "startup_sec": elapsed,
+        "property_frames": stats["messages"].get("add_properties", 0),
+        "property_bytes": stats["bytes"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time of a gateway with many metrics")
+    parser.add_argument("--metrics", type=int, default=10000)
+    parser.add_argument("--mode", choices=["single", "bulk", "file"], help="run one mode in this process")
+    args = parser.parse_args()
+
+    if args.mode is not None:
+        print json.dumps(provision(args.mode, args.metrics))
+        sys.stdout.flush()
+        # The scheduler threads of metric_handler never end
+        os._exit(0)
+    print "%d metrics on one gateway" % args.metrics
+    for mode in ("single", "bulk", "file"):
+        output = subprocess.check_output([sys.executable, os.path.abspath(__file__), "--mode", mode,
+                                          "--metrics", str(args.metrics)])
+        report = json.loads(output.strip().splitlines()[-1])
+        print "  %-8s %8.3f s  %4d add_properties frames  %8d bytes" % (
+            mode, report["startup_sec"], report["property_frames"], report["property_bytes"])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from liota.boards.gateway_dk300 import Dk300
+from liota.core.metric_handler import SamplerGroup
+from liota.dcc.graphite_dcc import Graphite
+from liota.transports.socket_connection import Socket
+
+from run_benchmark import StandIn, drive
+
+log = logging.getLogger(__name__)
+
+#---------------------------------------------------------------------------
+# Benchmark of sampling many metrics from one source read.
+#
+# Every gateway has the 12 system metrics of /proc/stat below. "separate"
+# gives each metric its own sampling function reading /proc/stat; "group"
+# reads it once per round in a SamplerGroup. The report counts the collect
+# calls (scheduler events) and file reads, and the CPU time of the agent.
+#
+# Example:
+#   python bench_sampler_group.py --gateways 50 --rounds 20
+
+CPU_FIELDS = ["user", "nice", "system", "idle", "iowait", "irq", "softirq", "steal"]
+COUNTERS = ["ctxt", "processes", "procs_running", "procs_blocked"]
+METRICS = CPU_FIELDS + COUNTERS
+
+file_reads = [0]
+
+
+def read_proc_stat():
+    file_reads[0] += 1
+    values = {}
+    with open("/proc/stat") as f:
+        for line in f:
+            fields = line.split()
+            if fields[0] == "cpu":
+                values.update(zip(CPU_FIELDS, [int(v) for v in fields[1:9]]))
+            elif fields[0] in COUNTERS:
+                values[fields[0]] = int(fields[1])
+    return values
+
+
+def read_one(name):
+    def read():
+        return read_proc_stat()[name]
+    return read
+
+
+class CountingGroup(SamplerGroup):
+    collects = 0
+
+    def collect(self):
+        CountingGroup.collects += 1
+        SamplerGroup.collect(self)
+
+
+def run(mode, args, stand_in):
+    file_reads[0] = 0
+    CountingGroup.collects = 0
+    graphite = Graphite(Socket("127.0.0.1", stand_in.endpoints[0]))
+    events = []
+    for g in range(args.gateways):
+        graphite_gateway = graphite.register(Dk300("bench-sampler-gw-%d" % g))
+        group = CountingGroup(read_proc_stat, sampling_interval_sec=10)
+        for name in METRICS:
+            details = "bench.gw%d.%s" % (g, name)
+            if mode == "group":
+                group.add(graphite.create_metric(graphite_gateway, details, unit=None, sampling_function=None,
+                                                 aggregation_size=args.aggregation), name)
+            else:
+                events.append(graphite.create_metric(graphite_gateway, details, unit=None,
+                                                     sampling_function=read_one(name),
+                                                     aggregation_size=args.aggregation))
+        if mode == "group":
+            events.append(group)
+    stand_in.request("reset")
+    expected = args.gateways * len(METRICS) * args.rounds
+    times_before = os.times()
+    drive(events, args.rounds)
+    times_after = os.times()
+    stats = stand_in.wait_for(expected, args.timeout)
+    cpu = (times_after[0] - times_before[0]) + (times_after[1] - times_before[1])
+    return {
+        "mode": mode,
+        "events": CountingGroup.collects if mode == "group" else len(events) * args.rounds,
+        "file_reads": file_reads[0],
+        "received": stats["datapoints"],
+        "expected": expected,
+        "cpu_sec": cpu
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of sampler groups")
+    parser.add_argument("--gateways", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20, help="samples collected per metric")
+    parser.add_argument("--aggregation", type=int, default=5, help="aggregation_size of every metric")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    stand_in = StandIn("carbon")
+    try:
+        print "%d gateways x %d metrics of /proc/stat, %d rounds" % (args.gateways, len(METRICS), args.rounds)
+        for mode in ("separate", "group"):
+            report = run(mode, args, stand_in)
+            print "  %-10s %8d events  %8d file reads  %8d/%d datapoints  %6.3f s CPU" % (
+                mode, report["events"], report["file_reads"], report["received"], report["expected"],
+                report["cpu_sec"])
+    finally:
+        stand_in.stop()
+
+
+if __name__ == '__main__':
+    main()
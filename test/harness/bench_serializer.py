@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from liota.utilities import serializer
+from liota.utilities.serializer import Template
+
+#---------------------------------------------------------------------------
+# Encode cost of one add_stats message of a metric, with the standard
+# library on the full message as WebSocket.send did before, with the
+# configured serializer backend on the full message, and with the
+# pre-serialized envelope and metric_data templates used by Vrops.
+#
+# Example:
+#   python bench_serializer.py --samples 10 --messages 20000
+
+def full_message(uuid, statkey, values):
+    return {
+        "type": "add_stats",
+        "uuid": uuid,
+        "metric_data": [{
+            "statKey": statkey,
+            "timestamps": [t for t, _ in values],
+            "data": [v for _, v in values]
+        }]
+    }
+
+
+def encode_stdlib(uuid, statkey, values):
+    return json.dumps(full_message(uuid, statkey, values))
+
+
+def encode_backend(uuid, statkey, values):
+    return serializer.dumps(full_message(uuid, statkey, values))
+
+
+def make_encode_template(uuid, statkey):
+    envelope = Template({"type": "add_stats", "uuid": uuid}, ("metric_data",))
+    entry = Template({"statKey": statkey}, ("timestamps", "data"))
+
+    def encode_template(uuid, statkey, values):
+        return envelope.render_serialized("[" + entry.render(*zip(*values)) + "]")
+    return encode_template
+
+
+def measure(encode, values, messages, repeat):
+    # Best of `repeat` runs, as timeit does
+    uuid = "1b4e28ba-2fa1-11d2-883f-0016d3cca427"
+    statkey = "bench_metric"
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        for _ in xrange(messages):
+            payload = encode(uuid, statkey, values)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return 1e6 * best / messages, len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode cost of add_stats messages")
+    parser.add_argument("--samples", type=int, default=10, help="samples per message")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    now = int(time.time() * 1000)
+    values = [(now + i * 1000, 20.0 + i * 0.25) for i in range(args.samples)]
+    uuid = "1b4e28ba-2fa1-11d2-883f-0016d3cca427"
+    print "backend: %s, %d samples per message" % (serializer.BACKEND, args.samples)
+    for name, encode in (("stdlib json, full message", encode_stdlib),
+                         ("backend, full message", encode_backend),
+                         ("backend, templates", make_encode_template(uuid, "bench_metric"))):
+        us, size = measure(encode, values, args.messages, args.repeat)
+        print "  %-28s %8.2f us/message %6d bytes" % (name, us, size)
+
+
+if __name__ == '__main__':
+    main()
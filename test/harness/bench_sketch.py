@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from liota.transformers.sketch import QuantileSketch
+from liota.utilities import serializer
+
+#---------------------------------------------------------------------------
+# Accuracy, memory and speed of QuantileSketch against exact quantiles.
+#
+# For every distribution, N values are added to a sketch and kept in a list.
+# The report shows the relative error of p50, p95 and p99 against the exact
+# quantiles of the sorted list, the buckets of the sketch, its serialized
+# size against the serialized values, and the time per added value. The
+# sketch is also built from 10 parts merged together, as a parent gateway
+# would.
+#
+# Example:
+#   python bench_sketch.py --values 100000 --accuracy 0.01
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def distributions(rng):
+    return [
+        ("lognormal latency", lambda: rng.lognormvariate(3, 1)),
+        ("exponential", lambda: rng.expovariate(0.01)),
+        ("pareto", lambda: rng.paretovariate(1.5)),
+        ("normal around 0", lambda: rng.gauss(0, 10)),
+        ("uniform", lambda: rng.uniform(0, 1000))
+    ]
+
+
+def run(name, draw, args):
+    values = [draw() for _ in range(args.values)]
+    sketch = QuantileSketch(args.accuracy, args.max_buckets)
+    start = time.time()
+    for v in values:
+        sketch.add(v)
+    add_us = 1e6 * (time.time() - start) / len(values)
+
+    parts = [QuantileSketch(args.accuracy, args.max_buckets) for _ in range(10)]
+    for i, v in enumerate(values):
+        parts[i % 10].add(v)
+    start = time.time()
+    merged = QuantileSketch.from_dict(parts[0].to_dict())
+    for part in parts[1:]:
+        merged.merge(QuantileSketch.from_dict(serializer.loads(serializer.dumps(part.to_dict()))))
+    merge_ms = 1000 * (time.time() - start)
+
+    ordered = sorted(values)
+    errors = []
+    for q in QUANTILES:
+        exact = ordered[int(q * (len(ordered) - 1))]
+        errors.append(max(abs(s.quantile(q) - exact) / abs(exact) for s in (sketch, merged)))
+    return {
+        "name": name,
+        "errors": errors,
+        "buckets": sketch.buckets(),
+        "sketch_bytes": len(serializer.dumps(sketch.to_dict())),
+        "raw_bytes": len(serializer.dumps(values)),
+        "add_us": add_us,
+        "merge_ms": merge_ms
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy and memory of QuantileSketch")
+    parser.add_argument("--values", type=int, default=100000)
+    parser.add_argument("--accuracy", type=float, default=0.01, help="relative accuracy of the sketch")
+    parser.add_argument("--max-buckets", type=int, default=2048)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print "%d values, relative accuracy %g, at most %d buckets" % (args.values, args.accuracy, args.max_buckets)
+    print "  %-18s %8s %8s %8s %8s %10s %12s %8s %10s" % (
+        "distribution", "p50 err", "p95 err", "p99 err", "buckets", "bytes", "raw bytes", "us/add", "merge ms")
+    for name, draw in distributions(random.Random(args.seed)):
+        report = run(name, draw, args)
+        print "  %-18s %7.3f%% %7.3f%% %7.3f%% %8d %10d %12d %8.2f %10.2f" % (
+            report["name"], 100 * report["errors"][0], 100 * report["errors"][1], 100 * report["errors"][2],
+            report["buckets"], report["sketch_bytes"], report["raw_bytes"], report["add_us"], report["merge_ms"])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import argparse
+import cPickle
+import logging
+import socket
+import struct
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+#---------------------------------------------------------------------------
+# A local stand-in for a carbon receiver, used to benchmark the Graphite DCC
+# without a real Graphite instance. It accepts the plaintext protocol over TCP
+# and UDP and the pickle protocol over TCP, and only counts what it receives.
+#
+# Every datapoint is passed to `on_datapoint(path, value, timestamp, recv_ms)`
+# if one is given, e.g. to compute end-to-end latencies.
+
+class CarbonServer:
+
+    def __init__(self, host="127.0.0.1", line_port=0, pickle_port=0, udp_port=0, on_datapoint=None):
+        self.host = host
+        self.on_datapoint = on_datapoint
+        self.lock = threading.Lock()
+        self.datapoints = 0
+        self.bytes = 0
+        self.connections = 0
+        self.running = False
+
+        self.line_sock = self._listen(socket.SOCK_STREAM, line_port)
+        self.pickle_sock = self._listen(socket.SOCK_STREAM, pickle_port)
+        self.udp_sock = self._listen(socket.SOCK_DGRAM, udp_port)
+        self.line_port = self.line_sock.getsockname()[1]
+        self.pickle_port = self.pickle_sock.getsockname()[1]
+        self.udp_port = self.udp_sock.getsockname()[1]
+
+    def _listen(self, sock_type, port):
+        sock = socket.socket(socket.AF_INET, sock_type)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, port))
+        if sock_type == socket.SOCK_STREAM:
+            sock.listen(128)
+        return sock
+
+    def start(self):
+        self.running = True
+        self._spawn(self._accept, self.line_sock, self._handle_lines)
+        self._spawn(self._accept, self.pickle_sock, self._handle_pickle)
+        self._spawn(self._serve_udp)
+        log.info("Carbon stand-in listening on line:{0} pickle:{1} udp:{2}".format(
+            self.line_port, self.pickle_port, self.udp_port))
+        return self
+
+    def stop(self):
+        self.running = False
+        for sock in (self.line_sock, self.pickle_sock, self.udp_sock):
+            try:
+                sock.close()
+            except socket.error:
+                pass
+
+    def reset(self):
+        with self.lock:
+            self.datapoints = 0
+            self.bytes = 0
+
+    def get_stats(self):
+        with self.lock:
+            return {"datapoints": self.datapoints, "bytes": self.bytes, "connections": self.connections}
+
+    def _spawn(self, target, *args):
+        thread = threading.Thread(target=target, args=args)
+        thread.daemon = True
+        thread.start()
+
+    def _accept(self, sock, handler):
+        while self.running:
+            try:
+                con, _ = sock.accept()
+            except socket.error:
+                break
+            with self.lock:
+                self.connections += 1
+            self._spawn(handler, con)
+
+    def _record(self, path, value, timestamp, nbytes):
+        recv_ms = time.time() * 1000
+        with self.lock:
+            self.datapoints += 1
+            self.bytes += nbytes
+        if self.on_datapoint is not None:
+            self.on_datapoint(path, value, timestamp, recv_ms)
+
+    def _parse_line(self, line):
+        parts = line.split()
+        if len(parts) != 3:
+            log.warn("Malformed line: {0}".format(line))
+            return
+        self._record(parts[0], float(parts[1]), float(parts[2]), len(line) + 1)
+
+    def _handle_lines(self, con):
+        pending = ""
+        while self.running:
+            data = con.recv(65536)
+            if not data:
+                break
+            pending += data
+            lines = pending.split("\n")
+            pending = lines.pop()
+            for line in lines:
+                if line:
+                    self._parse_line(line)
+        con.close()
+
+    def _recv_exact(self, con, size):
+        chunks = []
+        while size > 0:
+            data = con.recv(size)
+            if not data:
+                return None
+            chunks.append(data)
+            size -= len(data)
+        return "".join(chunks)
+
+    def _handle_pickle(self, con):
+        while self.running:
+            header = self._recv_exact(con, 4)
+            if header is None:
+                break
+            length = struct.unpack("!L", header)[0]
+            payload = self._recv_exact(con, length)
+            if payload is None:
+                break
+            datapoints = cPickle.loads(payload)
+            for path, (timestamp, value) in datapoints:
+                self._record(path, float(value), float(timestamp), (length + 4) / len(datapoints))
+        con.close()
+
+    def _serve_udp(self):
+        while self.running:
+            try:
+                data, _ = self.udp_sock.recvfrom(65536)
+            except socket.error:
+                break
+            for line in data.split("\n"):
+                if line:
+                    self._parse_line(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local carbon stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--line-port", type=int, default=2003)
+    parser.add_argument("--pickle-port", type=int, default=2004)
+    parser.add_argument("--udp-port", type=int, default=2003)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = CarbonServer(args.host, args.line_port, args.pickle_port, args.udp_port).start()
+    last = 0
+    while True:
+        time.sleep(1)
+        stats = server.get_stats()
+        print "datapoints: %d (%d/s) bytes: %d connections: %d" % (
+            stats["datapoints"], stats["datapoints"] - last, stats["bytes"], stats["connections"])
+        last = stats["datapoints"]
@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import socket
+import struct
+import threading
+import time
+import uuid
+import zlib
+
+log = logging.getLogger(__name__)
+
+#---------------------------------------------------------------------------
+# A local stand-in for the vROps Helix adapter, used to benchmark the Vrops
+# DCC without a real vROps instance. It speaks just enough of RFC 6455 to
+# accept a WebSocket client, runs the Helix handshake
+# (connection_request / connection_response / connection_verified) and
+# answers create_or_find_resource_request and create_relationship_request.
+# add_stats and add_properties messages are only counted.
+#
+# With `pending_polls` > 0 every resource is reported as "null" that many
+# times before its uuid is handed out, like a vROps instance that is slow to
+# create resources. Like vROps, the same resource always gets the same uuid.
+#
+# Every stat datapoint is passed to `on_datapoint(stat_key, value,
+# timestamp, recv_ms)` if one is given, e.g. to compute end-to-end latencies.
+#
+# With `deflate` the stand-in accepts permessage-deflate, and counts the
+# bytes on the wire next to the bytes of the messages.
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OPCODE_CONT = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xa
+
+DEFLATE_TAIL = "\x00\x00\xff\xff"
+
+
+class WebSocketPeer:
+    """ Server side of a single WebSocket connection.
+
+    """
+    def __init__(self, con, deflate=False):
+        self.con = con
+        self.lock = threading.Lock()
+        self.buffer = ""
+        self.deflate = deflate
+        self.compressor = None
+        self.decompressor = None
+        # bytes on the wire of the last message received
+        self.wire_bytes = 0
+
+    def _recv_exact(self, size):
+        while len(self.buffer) < size:
+            data = self.con.recv(65536)
+            if not data:
+                raise EOFError("Connection closed by peer")
+            self.buffer += data
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def handshake(self):
+        request = ""
+        while "\r\n\r\n" not in request:
+            data = self.con.recv(4096)
+            if not data:
+                raise EOFError("Connection closed during handshake")
+            request += data
+        request, self.buffer = request.split("\r\n\r\n", 1)
+        headers = {}
+        for line in request.split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        accept = base64.b64encode(hashlib.sha1(headers["sec-websocket-key"] + WS_GUID).digest())
+        response = [
+            "HTTP/1.1 101 Switching Protocols",
+            "Upgrade: websocket",
+            "Connection: Upgrade",
+            "Sec-WebSocket-Accept: %s" % accept
+        ]
+        if self.deflate and "permessage-deflate" in headers.get("sec-websocket-extensions", ""):
+            response.append("Sec-WebSocket-Extensions: permessage-deflate")
+            self.compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+            self.decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        self.con.sendall("\r\n".join(response) + "\r\n\r\n")
+        return headers
+
+    def recv_frame(self):
+        b1, b2 = struct.unpack("!BB", self._recv_exact(2))
+        fin = b1 >> 7 & 1
+        rsv1 = b1 >> 6 & 1
+        opcode = b1 & 0xf
+        length = b2 & 0x7f
+        if length == 126:
+            length = struct.unpack("!H", self._recv_exact(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self._recv_exact(8))[0]
+        mask = self._recv_exact(4) if b2 >> 7 & 1 else None
+        payload = self._recv_exact(length)
+        if mask is not None:
+            key = [ord(c) for c in mask]
+            data = bytearray(payload)
+            for i in xrange(len(data)):
+                data[i] ^= key[i % 4]
+            payload = str(data)
+        return fin, rsv1, opcode, payload
+
+    def recv_message(self):
+        """ Returns (opcode, payload) of the next data message, answering
+            pings on the way. Returns (OPCODE_CLOSE, "") on close.
+
+        """
+        message_opcode = None
+        compressed = False
+        fragments = []
+        while True:
+            fin, rsv1, opcode, payload = self.recv_frame()
+            if opcode == OPCODE_PING:
+                self.send(payload, OPCODE_PONG)
+                continue
+            if opcode == OPCODE_PONG:
+                continue
+            if opcode == OPCODE_CLOSE:
+                return OPCODE_CLOSE, ""
+            if opcode != OPCODE_CONT:
+                message_opcode = opcode
+                compressed = rsv1
+            fragments.append(payload)
+            if fin:
+                payload = "".join(fragments)
+                self.wire_bytes = len(payload)
+                if compressed:
+                    payload = self.decompressor.decompress(payload + DEFLATE_TAIL)
+                return message_opcode, payload
+
+    def send(self, payload, opcode=OPCODE_TEXT):
+        with self.lock:
+            b1 = 0x80 | opcode
+            if self.compressor is not None and opcode == OPCODE_TEXT and len(payload) >= 64:
+                payload = self.compressor.compress(payload) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+                payload = payload[:-len(DEFLATE_TAIL)]
+                b1 |= 0x40
+            length = len(payload)
+            if length < 126:
+                header = struct.pack("!BB", b1, length)
+            elif length < 65536:
+                header = struct.pack("!BBH", b1, 126, length)
+            else:
+                header = struct.pack("!BBQ", b1, 127, length)
+            self.con.sendall(header + payload)
+
+    def send_json(self, msg):
+        self.send(json.dumps(msg))
+
+    def close(self):
+        try:
+            self.con.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        try:
+            self.con.close()
+        except socket.error:
+            pass
+
+
+class HelixServer:
+
+    def __init__(self, host="127.0.0.1", port=0, username=None, password=None, pending_polls=0, on_datapoint=None,
+                 deflate=False):
+        self.host = host
+        self.deflate = deflate
+        self.username = username
+        self.password = password
+        self.pending_polls = pending_polls
+        self.on_datapoint = on_datapoint
+        self.lock = threading.Lock()
+        self.running = False
+        self.peers = []
+        self.resources = {}
+        self.polls = {}
+        self.counters = {}
+        self.datapoints = 0
+        self.frames = 0
+        self.bytes = 0
+        self.wire_bytes = 0
+        # code of actions sent -> time sent in ms, answered by an
+        # add_properties with propertyKey "action_code"
+        self.actions = {}
+        self.action_sequence = 0
+        self.action_rtts = []
+
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen(16)
+        self.port = self.sock.getsockname()[1]
+        self.url = "ws://%s:%d/" % (host, self.port)
+
+    def start(self):
+        self.running = True
+        thread = threading.Thread(target=self._accept)
+        thread.daemon = True
+        thread.start()
+        log.info("Helix stand-in listening on {0}".format(self.url))
+        return self
+
+    def stop(self):
+        self.running = False
+        self.sock.close()
+        for peer in self.peers:
+            peer.close()
+
+    def drop_connections(self):
+        """ Closes every connection, like a network failure would.
+
+        """
+        peers, self.peers = self.peers, []
+        for peer in peers:
+            peer.close()
+        log.info("Dropped {0} connections".format(len(peers)))
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.datapoints = 0
+            self.frames = 0
+            self.bytes = 0
+            self.wire_bytes = 0
+            self.actions = {}
+            self.action_rtts = []
+
+    def send_action(self, res_uuid):
+        """ Sends an action to resource `res_uuid` on every connection.
+
+        """
+        with self.lock:
+            self.action_sequence += 1
+            code = str(self.action_sequence)
+            self.actions[code] = time.time() * 1000
+        for peer in self.peers[:]:
+            peer.send_json({"transactionID": self.action_sequence * 2 + 1, "type": "action",
+                            "body": {"uuid": res_uuid, "code": code}})
+
+    def start_actions(self, res_uuid, interval):
+        """ Sends an action to `res_uuid` every `interval` seconds.
+
+        """
+        def run():
+            while self.running:
+                time.sleep(interval)
+                self.send_action(res_uuid)
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "datapoints": self.datapoints,
+                "frames": self.frames,
+                "bytes": self.bytes,
+                "wire_bytes": self.wire_bytes,
+                "messages": dict(self.counters),
+                "resources": len(self.resources),
+                "actions_pending": len(self.actions),
+                "action_rtt_ms": self.action_rtts[:]
+            }
+
+    def _accept(self):
+        while self.running:
+            try:
+                con, _ = self.sock.accept()
+            except socket.error:
+                break
+            thread = threading.Thread(target=self._serve, args=(WebSocketPeer(con, self.deflate),))
+            thread.daemon = True
+            thread.start()
+
+    def _count(self, msg_type, nbytes, wire_bytes):
+        with self.lock:
+            self.counters[msg_type] = self.counters.get(msg_type, 0) + 1
+            self.frames += 1
+            self.bytes += nbytes
+            self.wire_bytes += wire_bytes
+
+    def _serve(self, peer):
+        try:
+            peer.handshake()
+            self.peers.append(peer)
+            peer.send_json({"transactionID": 1, "type": "connection_request", "body": {}})
+            while self.running:
+                opcode, payload = peer.recv_message()
+                if opcode == OPCODE_CLOSE:
+                    break
+                msg = json.loads(payload)
+                self._count(msg.get("type"), len(payload), peer.wire_bytes)
+                handler = self.handlers.get(msg.get("type"))
+                if handler is not None:
+                    handler(self, peer, msg)
+        except EOFError:
+            pass
+        except Exception:
+            log.exception("Error while serving Helix client")
+        finally:
+            peer.close()
+
+    def _on_connection_response(self, peer, msg):
+        body = msg["body"]
+        if self.username is not None and (body.get("username") != self.username or body.get("password") != self.password):
+            result = "failed"
+        else:
+            result = "succeeded"
+        peer.send_json({"transactionID": msg["transactionID"], "type": "connection_verified", "body": {"result": result}})
+
+    def _on_create_or_find_resource(self, peer, msg):
+        key = (msg["body"]["id"], msg["body"]["kind"])
+        with self.lock:
+            polls = self.polls.get(key, 0)
+            self.polls[key] = polls + 1
+            if polls < self.pending_polls:
+                res_uuid = "null"
+            else:
+                res_uuid = self.resources.setdefault(key, str(uuid.uuid5(uuid.NAMESPACE_URL, "|".join(key).encode("utf-8"))))
+        peer.send_json({
+            "transactionID": msg["transactionID"],
+            "type": "create_or_find_resource_response",
+            "body": {"uuid": res_uuid}
+        })
+
+    def _on_create_relationship(self, peer, msg):
+        peer.send_json({
+            "transactionID": msg["transactionID"],
+            "type": "create_relationship_response",
+            "body": {"result": "succeeded"}
+        })
+
+    def _on_add_stats(self, peer, msg):
+        recv_ms = time.time() * 1000
+        count = 0
+        for metric_data in msg["metric_data"]:
+            count += len(metric_data["data"])
+            if self.on_datapoint is not None:
+                for timestamp, value in zip(metric_data["timestamps"], metric_data["data"]):
+                    self.on_datapoint(metric_data["statKey"], value, timestamp, recv_ms)
+        with self.lock:
+            self.datapoints += count
+
+    def _on_add_properties(self, peer, msg):
+        recv_ms = time.time() * 1000
+        for prop in msg["body"]["property_data"]:
+            if prop["propertyKey"] == "action_code":
+                with self.lock:
+                    sent = self.actions.pop(prop["propertyValue"], None)
+                    if sent is not None:
+                        self.action_rtts.append(recv_ms - sent)
+
+    handlers = {
+        "connection_response": _on_connection_response,
+        "create_or_find_resource_request": _on_create_or_find_resource,
+        "create_relationship_request": _on_create_relationship,
+        "add_stats": _on_add_stats,
+        "add_properties": _on_add_properties
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local vROps Helix adapter stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pending-polls", type=int, default=0)
+    parser.add_argument("--deflate", action="store_true", help="accept permessage-deflate")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = HelixServer(args.host, args.port, pending_polls=args.pending_polls, deflate=args.deflate).start()
+    last = 0
+    while True:
+        time.sleep(1)
+        stats = server.get_stats()
+        print "datapoints: %d (%d/s) frames: %d resources: %d" % (
+            stats["datapoints"], stats["datapoints"] - last, stats["frames"], stats["resources"])
+        last = stats["datapoints"]
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import argparse
+import json
+import logging
+import socket
+import struct
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+#---------------------------------------------------------------------------
+# A local stand-in for an MQTT broker, used to benchmark the MQTT DCC without
+# a real broker. It speaks just enough of MQTT 3.1.1 to accept a client,
+# acknowledge QoS 1 publishes, answer pings and forward publishes to matching
+# subscriptions (at QoS 0, topic filters may end in '#').
+#
+# With `ack_delay` every PUBACK is sent that many seconds after the publish,
+# like a broker far away, without slowing down reading; this is what the
+# in-flight window of the client has to hide.
+#
+# Payloads of the form {"t": [timestamps], "v": [values]}, or {"t0": first
+# timestamp, "dt": period, "v": [values]}, are counted as datapoints, and every datapoint is passed to `on_datapoint(topic, value,
+# timestamp, recv_ms)` if one is given, e.g. to compute end-to-end latencies.
+
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+SUBSCRIBE = 8
+SUBACK = 9
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+
+def encode_length(length):
+    encoded = ""
+    while True:
+        digit = length % 128
+        length //= 128
+        if length > 0:
+            digit |= 0x80
+        encoded += chr(digit)
+        if length == 0:
+            return encoded
+
+
+def encode_string(text):
+    return struct.pack("!H", len(text)) + text
+
+
+class MqttPeer:
+    """ Broker side of a single MQTT connection.
+
+    """
+    def __init__(self, con, ack_delay=0.0):
+        self.con = con
+        self.ack_delay = ack_delay
+        self.send_lock = threading.Lock()
+        self.acks = []
+        self.acks_ready = threading.Condition()
+        self.closed = False
+        if ack_delay > 0:
+            thread = threading.Thread(target=self._send_acks)
+            thread.daemon = True
+            thread.start()
+
+    def _recv_exact(self, size):
+        chunks = []
+        while size > 0:
+            data = self.con.recv(size)
+            if not data:
+                raise EOFError("Connection closed")
+            chunks.append(data)
+            size -= len(data)
+        return "".join(chunks)
+
+    def recv_packet(self):
+        """ Returns (packet type, flags, body) of the next packet.
+
+        """
+        first = ord(self._recv_exact(1))
+        length = 0
+        shift = 0
+        while True:
+            digit = ord(self._recv_exact(1))
+            length += (digit & 0x7f) << shift
+            shift += 7
+            if not digit & 0x80:
+                break
+        return first >> 4, first & 0x0f, self._recv_exact(length)
+
+    def send_packet(self, packet_type, flags, body):
+        data = chr((packet_type << 4) | flags) + encode_length(len(body)) + body
+        with self.send_lock:
+            self.con.sendall(data)
+
+    def send_publish(self, topic, payload):
+        self.send_packet(PUBLISH, 0, encode_string(topic) + payload)
+
+    def acknowledge(self, packet_id):
+        if self.ack_delay <= 0:
+            self.send_packet(PUBACK, 0, struct.pack("!H", packet_id))
+            return
+        with self.acks_ready:
+            self.acks.append((time.time() + self.ack_delay, packet_id))
+            self.acks_ready.notify()
+
+    def _send_acks(self):
+        while not self.closed:
+            with self.acks_ready:
+                while not self.acks and not self.closed:
+                    self.acks_ready.wait(1.0)
+                if self.closed:
+                    return
+                due, packet_id = self.acks.pop(0)
+            delay = due - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                self.send_packet(PUBACK, 0, struct.pack("!H", packet_id))
+            except socket.error:
+                return
+
+    def close(self):
+        self.closed = True
+        try:
+            self.con.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        try:
+            self.con.close()
+        except socket.error:
+            pass
+
+
+class MqttBroker:
+
+    def __init__(self, host="127.0.0.1", port=0, ack_delay=0.0, on_datapoint=None):
+        self.host = host
+        self.ack_delay = ack_delay
+        self.on_datapoint = on_datapoint
+        self.lock = threading.Lock()
+        self.running = False
+        self.peers = []
+        # topic filter -> peers subscribed to it
+        self.subscriptions = {}
+        self.connections = 0
+        self.messages = 0
+        self.duplicates = 0
+        self.datapoints = 0
+        self.bytes = 0
+
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen(16)
+        self.port = self.sock.getsockname()[1]
+
+    def start(self):
+        self.running = True
+        thread = threading.Thread(target=self._accept)
+        thread.daemon = True
+        thread.start()
+        log.info("MQTT stand-in listening on {0}:{1}".format(self.host, self.port))
+        return self
+
+    def stop(self):
+        self.running = False
+        self.sock.close()
+        for peer in self.peers:
+            peer.close()
+
+    def drop_connections(self):
+        """ Closes every connection, like a network failure would.
+
+        """
+        peers, self.peers = self.peers, []
+        for peer in peers:
+            peer.close()
+        log.info("Dropped {0} connections".format(len(peers)))
+
+    def reset(self):
+        with self.lock:
+            self.messages = 0
+            self.duplicates = 0
+            self.datapoints = 0
+            self.bytes = 0
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "datapoints": self.datapoints,
+                "messages": self.messages,
+                "duplicates": self.duplicates,
+                "bytes": self.bytes,
+                "connections": self.connections
+            }
+
+    def _accept(self):
+        while self.running:
+            try:
+                con, _ = self.sock.accept()
+            except socket.error:
+                break
+            con.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self.lock:
+                self.connections += 1
+            thread = threading.Thread(target=self._serve, args=(MqttPeer(con, self.ack_delay),))
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, peer):
+        self.peers.append(peer)
+        try:
+            while self.running:
+                packet_type, flags, body = peer.recv_packet()
+                if packet_type == CONNECT:
+                    peer.send_packet(CONNACK, 0, "\x00\x00")
+                elif packet_type == PUBLISH:
+                    self._on_publish(peer, flags, body)
+                elif packet_type == SUBSCRIBE:
+                    self._on_subscribe(peer, body)
+                elif packet_type == PINGREQ:
+                    peer.send_packet(PINGRESP, 0, "")
+                elif packet_type == DISCONNECT:
+                    break
+        except (EOFError, socket.error):
+            pass
+        finally:
+            with self.lock:
+                for peers in self.subscriptions.values():
+                    if peer in peers:
+                        peers.remove(peer)
+            peer.close()
+
+    def _on_publish(self, peer, flags, body):
+        recv_ms = time.time() * 1000
+        qos = (flags >> 1) & 0x03
+        topic_length = struct.unpack("!H", body[:2])[0]
+        topic = body[2:2 + topic_length]
+        offset = 2 + topic_length
+        if qos > 0:
+            peer.acknowledge(struct.unpack("!H", body[offset:offset + 2])[0])
+            offset += 2
+        payload = body[offset:]
+        samples = []
+        if not topic.endswith("/unit"):
+            try:
+                msg = json.loads(payload)
+                if "t0" in msg:
+                    samples = [(msg["t0"] + i * msg["dt"], v) for i, v in enumerate(msg["v"])]
+                else:
+                    samples = zip(msg["t"], msg["v"])
+            except (ValueError, KeyError, TypeError):
+                pass
+        with self.lock:
+            self.messages += 1
+            self.bytes += len(body)
+            self.datapoints += len(samples)
+            if flags & 0x08:
+                self.duplicates += 1
+            subscribers = [p for f, peers in self.subscriptions.items() if self._matches(f, topic) for p in peers]
+        if self.on_datapoint is not None:
+            for timestamp, value in samples:
+                self.on_datapoint(topic, value, timestamp, recv_ms)
+        for subscriber in subscribers:
+            try:
+                subscriber.send_publish(topic, payload)
+            except socket.error:
+                pass
+
+    def _on_subscribe(self, peer, body):
+        packet_id = body[:2]
+        offset = 2
+        granted = ""
+        with self.lock:
+            while offset < len(body):
+                length = struct.unpack("!H", body[offset:offset + 2])[0]
+                topic_filter = body[offset + 2:offset + 2 + length]
+                offset += 3 + length
+                self.subscriptions.setdefault(topic_filter, []).append(peer)
+                granted += "\x00"
+        peer.send_packet(SUBACK, 0, packet_id + granted)
+
+    def _matches(self, topic_filter, topic):
+        if topic_filter.endswith("#"):
+            return topic.startswith(topic_filter[:-1])
+        return topic_filter == topic
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local MQTT broker stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--ack-delay", type=float, default=0.0, help="seconds before a publish is acknowledged")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    broker = MqttBroker(args.host, args.port, args.ack_delay).start()
+    last = 0
+    while True:
+        time.sleep(1)
+        stats = broker.get_stats()
+        print "datapoints: %d (%d/s) messages: %d bytes: %d connections: %d" % (
+            stats["datapoints"], stats["datapoints"] - last, stats["messages"], stats["bytes"], stats["connections"])
+        last = stats["datapoints"]
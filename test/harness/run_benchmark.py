@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import argparse
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from liota.boards.gateway_dk300 import Dk300
+from liota.core.metric_handler import send_batch
+from liota.dcc.graphite_dcc import Graphite
+from liota.dcc.mqtt_dcc import MqttDcc
+from liota.dcc.vrops import Vrops
+from liota.transports.mqtt import Mqtt
+from liota.transports.permessage_deflate import PerMessageDeflate
+from liota.transports.socket_connection import Socket, SocketPool
+from liota.transports.web_socket import WebSocket
+from liota.utilities.utility import getUTCmillis
+
+from carbon_server import CarbonServer
+from helix_server import HelixServer
+from mqtt_broker import MqttBroker
+
+log = logging.getLogger(__name__)
+
+#---------------------------------------------------------------------------
+# End-to-end throughput benchmark of the Graphite, vROps and MQTT DCCs.
+#
+# The stand-in servers run in a child process, so the CPU time and RSS
+# reported here belong to the liota agent only. N gateways x M metrics are
+# created on each DCC and every metric is collected and sent `rounds` times.
+# The sampling function returns the current time in milliseconds, which lets
+# the stand-ins compute the end-to-end latency of every datapoint.
+#
+# Example:
+#   python run_benchmark.py --dcc both --gateways 10 --metrics 50 --rounds 20
+
+def sample_now():
+    return getUTCmillis()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def current_rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _serve(kind, pipe, options):
+    """ Runs a stand-in server in the child process and answers 'stats',
+        'reset', ('actions', uuid, interval), ('drop', delay) and 'stop'
+        requests from the benchmark over `pipe`.
+
+    """
+    latencies = []
+    lock = threading.Lock()
+
+    def on_datapoint(path, value, timestamp, recv_ms):
+        with lock:
+            latencies.append(recv_ms - value)
+
+    if kind == "carbon":
+        servers = [CarbonServer(on_datapoint=on_datapoint).start() for _ in range(options.get("relays", 1))]
+        pipe.send([server.line_port for server in servers])
+    elif kind == "mqtt":
+        servers = [MqttBroker(ack_delay=options.get("ack_delay", 0.0), on_datapoint=on_datapoint).start()]
+        pipe.send([server.port for server in servers])
+    else:
+        servers = [HelixServer(pending_polls=options.get("pending_polls", 0), on_datapoint=on_datapoint,
+                               deflate=options.get("deflate", False)).start()]
+        pipe.send([server.url for server in servers])
+
+    while True:
+        command = pipe.recv()
+        if command == "stats":
+            with lock:
+                samples = latencies[:]
+            stats = [server.get_stats() for server in servers]
+            pipe.send({
+                "datapoints": sum(s["datapoints"] for s in stats),
+                "per_server": stats,
+                "latencies": samples
+            })
+        elif command == "reset":
+            with lock:
+                del latencies[:]
+            for server in servers:
+                server.reset()
+            pipe.send(True)
+        elif command[0] == "actions":
+            _, res_uuid, interval = command
+            for server in servers:
+                server.start_actions(res_uuid, interval)
+            pipe.send(True)
+        elif command[0] == "drop":
+            for server in servers:
+                if hasattr(server, "drop_connections"):
+                    threading.Timer(command[1], server.drop_connections).start()
+            pipe.send(True)
+        elif command == "stop":
+            for server in servers:
+                server.stop()
+            pipe.send(True)
+            break
+
+
+class StandIn:
+
+    def __init__(self, kind, **options):
+        self.pipe, child_pipe = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve, args=(kind, child_pipe, options))
+        self.process.daemon = True
+        self.process.start()
+        self.endpoints = self.pipe.recv()
+
+    def request(self, command):
+        self.pipe.send(command)
+        return self.pipe.recv()
+
+    def wait_for(self, datapoints, timeout):
+        deadline = time.time() + timeout
+        while True:
+            stats = self.request("stats")
+            if stats["datapoints"] >= datapoints or time.time() > deadline:
+                return stats
+            time.sleep(0.05)
+
+    def stop(self):
+        self.request("stop")
+        self.process.join(5)
+
+
+def create_graphite_metrics(args, stand_in):
+    if args.pool_size > 1:
+        endpoints = [SocketPool("127.0.0.1", port, args.pool_size) for port in stand_in.endpoints]
+    else:
+        endpoints = [Socket("127.0.0.1", port) for port in stand_in.endpoints]
+    graphite = Graphite(endpoints if len(endpoints) > 1 else endpoints[0])
+    metrics = []
+    for g in range(args.gateways):
+        graphite_gateway = graphite.register(Dk300("bench-graphite-gw-%d" % g))
+        for m in range(args.metrics):
+            metrics.append(graphite.create_metric(graphite_gateway, "bench.gw%d.metric%d" % (g, m), unit=None,
+                                                  sampling_function=sample_now, aggregation_size=args.aggregation))
+    return graphite, metrics
+
+
+class ActionAck:
+    # Answers every action with its code as a property, which the Helix
+    # stand-in uses to measure the action round trip
+    def __init__(self, vrops, registered_res):
+        self.vrops = vrops
+        self.registered_res = registered_res
+
+    def on_change(self, value):
+        self.vrops.set_properties(self.registered_res, {"action_code": value}, flush=True)
+
+
+def create_vrops_metrics(args, stand_in):
+    compression = None
+    if args.compression != "none":
+        compression = PerMessageDeflate(level=args.compression_level, context_takeover=args.compression == "deflate")
+    vrops = Vrops("bench", "bench", WebSocket(url=stand_in.endpoints[0], compression=compression))
+    metrics = []
+    registrations = [vrops.register_async(Dk300("bench-vrops-gw-%d" % g)) for g in range(args.gateways)]
+    for registration in registrations:
+        vrops_gateway = registration.result()
+        if args.action_interval > 0 and not vrops.proto.action_map:
+            vrops.add_action_handler(vrops_gateway, ActionAck(vrops, vrops_gateway))
+        for m in range(args.metrics):
+            metrics.append(vrops.create_metric(vrops_gateway, "metric%d" % m, unit=None,
+                                               sampling_function=sample_now, aggregation_size=args.aggregation))
+    return vrops, metrics
+
+
+def create_mqtt_metrics(args, stand_in):
+    mqtt = MqttDcc(Mqtt("127.0.0.1", stand_in.endpoints[0], max_inflight=args.max_inflight),
+                   batch_size=args.batch_size, batch_delay=args.batch_delay)
+    metrics = []
+    for g in range(args.gateways):
+        mqtt_gateway = mqtt.register(Dk300("bench-mqtt-gw-%d" % g))
+        for m in range(args.metrics):
+            metrics.append(mqtt.create_metric(mqtt_gateway, "metric%d" % m, unit=None,
+                                              sampling_function=sample_now, aggregation_size=args.aggregation))
+    return mqtt, metrics
+
+
+def outputs(event):
+    # The metrics and bindings of a metric or sampler group
+    metrics = [metric for _, metric in event.metrics] if hasattr(event, "metrics") else [event]
+    return metrics + [binding for metric in metrics for binding in metric.bindings]
+
+
+def drive(metrics, rounds):
+    # Same path as SendThread: metrics that are ready together are sent as one batch
+    for _ in range(rounds):
+        ready = []
+        for metric in metrics:
+            metric.collect()
+            ready.extend(metric.get_ready_to_send())
+        if ready:
+            send_batch(ready)
+    send_batch([output for metric in metrics for output in outputs(metric)])
+
+
+def run(name, args, stand_in, factory):
+    setup_start = time.time()
+    dcc, metrics = factory(args, stand_in)
+    setup_time = time.time() - setup_start
+    stand_in.request("reset")
+    expected = len(metrics) * args.rounds
+    if args.action_interval > 0 and getattr(dcc, "proto", None) is not None:
+        stand_in.request(("actions", dcc.proto.action_map.keys()[0], args.action_interval))
+
+    if args.drop_after > 0:
+        stand_in.request(("drop", args.drop_after))
+    times_before = os.times()
+    start = time.time()
+    drive(metrics, args.rounds)
+    send_time = time.time() - start
+    stats = stand_in.wait_for(expected, args.timeout)
+    elapsed = time.time() - start
+    times_after = os.times()
+
+    cpu = (times_after[0] - times_before[0]) + (times_after[1] - times_before[1])
+    latencies = sorted(stats["latencies"])
+    report = {
+        "dcc": name,
+        "metrics": len(metrics),
+        "expected": expected,
+        "received": stats["datapoints"],
+        "setup_sec": setup_time,
+        "send_sec": send_time,
+        "elapsed_sec": elapsed,
+        "datapoints_per_sec": stats["datapoints"] / elapsed if elapsed > 0 else 0.0,
+        "latency_p50_ms": percentile(latencies, 50),
+        "latency_p95_ms": percentile(latencies, 95),
+        "latency_p99_ms": percentile(latencies, 99),
+        "latency_max_ms": latencies[-1] if latencies else 0.0,
+        "cpu_sec": cpu,
+        "cpu_us_per_datapoint": 1e6 * cpu / max(stats["datapoints"], 1),
+        "rss_kb": current_rss_kb(),
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "per_server": stats["per_server"]
+    }
+    rtts = sorted(sum([server.pop("action_rtt_ms", []) for server in stats["per_server"]], []))
+    if rtts:
+        report["actions_answered"] = len(rtts)
+        report["action_rtt_p50_ms"] = percentile(rtts, 50)
+        report["action_rtt_p99_ms"] = percentile(rtts, 99)
+        report["action_rtt_max_ms"] = rtts[-1]
+    if hasattr(dcc, "get_stats"):
+        report["dcc_stats"] = dcc.get_stats()
+    if hasattr(getattr(dcc, "con", None), "get_stats"):
+        report["transport_stats"] = dcc.con.get_stats()
+    return report
+
+
+def print_report(report):
+    print "-" * 76
+    print "  %s: %d metrics, %d/%d datapoints received" % (
+        report["dcc"], report["metrics"], report["received"], report["expected"])
+    print "-" * 76
+    for key in ("setup_sec", "send_sec", "elapsed_sec", "datapoints_per_sec",
+                "latency_p50_ms", "latency_p95_ms", "latency_p99_ms", "latency_max_ms",
+                "cpu_sec", "cpu_us_per_datapoint", "rss_kb", "max_rss_kb"):
+        print "  %-24s %14.2f" % (key, report[key])
+    for key in ("actions_answered", "action_rtt_p50_ms", "action_rtt_p99_ms", "action_rtt_max_ms"):
+        if key in report:
+            print "  %-24s %14.2f" % (key, report[key])
+    for key in ("per_server", "dcc_stats", "transport_stats"):
+        if key in report:
+            print "  %-24s %s" % (key, report[key])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end throughput benchmark for liota DCCs")
+    parser.add_argument("--dcc", choices=["graphite", "vrops", "mqtt", "both", "all"], default="both")
+    parser.add_argument("--gateways", type=int, default=4)
+    parser.add_argument("--metrics", type=int, default=50, help="metrics per gateway")
+    parser.add_argument("--rounds", type=int, default=20, help="samples collected per metric")
+    parser.add_argument("--aggregation", type=int, default=5, help="aggregation_size of every metric")
+    parser.add_argument("--relays", type=int, default=1, help="number of carbon stand-ins to shard across")
+    parser.add_argument("--pool-size", type=int, default=1, help="parallel connections per carbon stand-in")
+    parser.add_argument("--pending-polls", type=int, default=0, help="'null' uuid replies before a resource is created")
+    parser.add_argument("--action-interval", type=float, default=0.0,
+                        help="seconds between actions sent by the Helix stand-in while stats are sent, 0 for none")
+    parser.add_argument("--compression", choices=["none", "deflate", "deflate-no-context"], default="none",
+                        help="permessage-deflate of the vROps connection, with or without context takeover")
+    parser.add_argument("--compression-level", type=int, default=6)
+    parser.add_argument("--drop-after", type=float, default=0.0,
+                        help="seconds after which the stand-ins drop all connections while sending, 0 for never")
+    parser.add_argument("--max-inflight", type=int, default=20, help="QoS 1 publishes in flight on the MQTT connection")
+    parser.add_argument("--batch-size", type=int, default=100, help="samples per MQTT payload")
+    parser.add_argument("--batch-delay", type=float, default=1.0, help="seconds a sample waits for its MQTT payload")
+    parser.add_argument("--ack-delay", type=float, default=0.0, help="seconds before the MQTT stand-in sends a PUBACK")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.dcc in ("graphite", "both", "all"):
+        stand_in = StandIn("carbon", relays=args.relays)
+        try:
+            print_report(run("graphite", args, stand_in, create_graphite_metrics))
+        finally:
+            stand_in.stop()
+    if args.dcc in ("vrops", "both", "all"):
+        stand_in = StandIn("helix", pending_polls=args.pending_polls, deflate=args.compression != "none")
+        try:
+            print_report(run("vrops", args, stand_in, create_vrops_metrics))
+        finally:
+            stand_in.stop()
+    if args.dcc in ("mqtt", "all"):
+        stand_in = StandIn("mqtt", ack_delay=args.ack_delay)
+        try:
+            print_report(run("mqtt", args, stand_in, create_mqtt_metrics))
+        finally:
+            stand_in.stop()
+    print "-" * 76
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import unittest
+
+from liota.dcc.graphite_dcc import Graphite
+from liota.utilities.hash_ring import ConsistentHashRing
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.utilities.hash_ring
+# It checks that metric paths are spread evenly across the nodes of the ring
+# and that removing a node only moves the metric paths owned by that node,
+# and that Graphite refuses an empty list of endpoints.
+
+class ConsistentHashRingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = ["relay1:2003", "relay2:2003", "relay3:2003", "relay4:2003"]
+        self.keys = ["gateway%d.device%d.metric" % (i, j) for i in range(50) for j in range(40)]
+
+    def test_same_key_same_node(self):
+        ring = ConsistentHashRing(self.nodes)
+        other = ConsistentHashRing(list(reversed(self.nodes)))
+        for key in self.keys:
+            self.assertEqual(ring.get_node(key), other.get_node(key))
+
+    def test_balance(self):
+        ring = ConsistentHashRing(self.nodes)
+        counts = dict((node, 0) for node in self.nodes)
+        for key in self.keys:
+            counts[ring.get_node(key)] += 1
+        expected = len(self.keys) / len(self.nodes)
+        for node, count in counts.items():
+            self.assertTrue(0.5 * expected < count < 1.5 * expected, "%s got %d keys" % (node, count))
+
+    def test_remove_node_moves_only_its_keys(self):
+        ring = ConsistentHashRing(self.nodes)
+        before = dict((key, ring.get_node(key)) for key in self.keys)
+        ring.remove_node("relay2:2003")
+        for key in self.keys:
+            if before[key] != "relay2:2003":
+                self.assertEqual(ring.get_node(key), before[key])
+            else:
+                self.assertNotEqual(ring.get_node(key), "relay2:2003")
+
+    def test_empty_ring(self):
+        self.assertEqual(ConsistentHashRing().get_node("a.b.c"), None)
+
+
+class GraphiteEndpointsTest(unittest.TestCase):
+
+    def test_no_endpoints(self):
+        self.assertRaises(ValueError, Graphite, [])
+        self.assertRaises(ValueError, Graphite, ())
+
+
+if __name__ == '__main__':
+    unittest.main()
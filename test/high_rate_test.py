@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import time
+import unittest
+from Queue import Queue
+
+from liota.core import high_rate, metric_handler
+from liota.core.high_rate import HighRateSampler
+from liota.utilities.ring_buffer import RingBuffer
+
+#---------------------------------------------------------------------------
+# This is a testing script of modules liota.utilities.ring_buffer and
+# liota.core.high_rate
+# It checks that the ring buffer returns values by sequence number until they
+# are overwritten, that the samples of blocks get integer millisecond
+# timestamps, and that a high-rate sampler hands over blocks of every
+# channel whose implicit timestamps match the period.
+
+class RingBufferTest(unittest.TestCase):
+
+    def test_read_wraps_around(self):
+        ring = RingBuffer(4)
+        for v in range(6):
+            ring.write(v)
+        self.assertEqual(len(ring), 4)
+        self.assertEqual(list(ring.read(3, 3)), [3.0, 4.0, 5.0])
+        self.assertEqual(list(ring.latest(10)), [2.0, 3.0, 4.0, 5.0])
+        self.assertRaises(IndexError, ring.read, 1, 2)
+        self.assertRaises(IndexError, ring.read, 5, 2)
+
+
+class BlockValuesTest(unittest.TestCase):
+
+    def test_integer_timestamps(self):
+        block = high_rate.SampleBlock(1792409094247.3, 0.25, [1.0, 2.0, 3.0, 4.0])
+        values = list(high_rate.BlockValues([block, high_rate.SampleBlock(1792409094248.5, 1.0, [5.0])]))
+        self.assertEqual(values, [(1792409094247, 1.0), (1792409094248, 2.0), (1792409094248, 3.0),
+                                  (1792409094248, 4.0), (1792409094249, 5.0)])
+        self.assertTrue(all(isinstance(t, (int, long)) for t, _ in values))
+        self.assertEqual((block.start_ms, block.period_ms), (1792409094247.3, 0.25))
+
+
+class Dcc:
+
+    def publish_unit(self, registered_gw, details, unit):
+        pass
+
+
+class Registered:
+    resource = None
+
+
+class HighRateSamplerTest(unittest.TestCase):
+
+    def setUp(self):
+        # Collect what is handed to the send queue, without the threads of
+        # the metric handler
+        self.saved = metric_handler.is_initialization_done, metric_handler.send_queue
+        metric_handler.is_initialization_done = True
+        metric_handler.send_queue = Queue()
+
+    def tearDown(self):
+        metric_handler.is_initialization_done, metric_handler.send_queue = self.saved
+
+    def test_blocks(self):
+        count = [0]
+
+        def read():
+            count[0] += 1
+            return (count[0], -count[0])
+
+        sampler = HighRateSampler(read, period_sec=0.001, block_size=10)
+        x = sampler.add_metric(Dcc(), Registered(), "x", None, channel=0)
+        y = sampler.add_metric(Dcc(), Registered(), "y", None, channel=1, aggregation_size=2)
+        sampler.start()
+        time.sleep(0.1)
+        sampler.stop()
+        batches = []
+        while not metric_handler.send_queue.empty():
+            batches.append(metric_handler.send_queue.get())
+        xs = [v for batch in batches if batch.metric is x for _, v in batch.values]
+        ys = [v for batch in batches if batch.metric is y for _, v in batch.values]
+        self.assertEqual(len(xs), sampler.samples)
+        self.assertEqual(ys, [-v for v in xs])
+        for batch in batches:
+            for block in batch.blocks:
+                timestamps = [t for t, _ in high_rate.BlockValues([block])]
+                self.assertAlmostEqual(timestamps[-1] - timestamps[0], (len(block) - 1) * 1.0)
+        self.assertTrue(all(len(batch.blocks) <= 2 for batch in batches if batch.metric is y))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import os
+import shutil
+import tempfile
+import unittest
+
+from liota.utilities.journal import Journal
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.utilities.journal
+# It checks that records appended are loaded again in order, that torn and
+# unreadable records are skipped, and that compaction leaves only the records
+# given.
+
+class JournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "state.journal")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def load(self):
+        records = []
+
+        def apply(record):
+            records.append(record["n"])
+        journal = Journal(self.path, sync_delay=0.01)
+        journal.load(apply)
+        return journal, records
+
+    def test_reload(self):
+        journal, records = self.load()
+        self.assertEqual(records, [])
+        for n in range(3):
+            journal.append({"n": n})
+        journal.close()
+        journal, records = self.load()
+        self.assertEqual(records, [0, 1, 2])
+        self.assertEqual(journal.records, 3)
+        journal.close()
+
+    def test_unreadable_records(self):
+        with open(self.path, "w") as f:
+            f.write('{"n": 0}\nnot json\n{"m": 1}\n{"n": 2}\n{"n": 3')
+        journal, records = self.load()
+        self.assertEqual(records, [0, 2])
+        journal.append({"n": 4})
+        journal.close()
+        journal, records = self.load()
+        self.assertEqual(records, [0, 2, 4])
+        journal.close()
+
+    def test_compact(self):
+        journal, _ = self.load()
+        for n in range(100):
+            journal.append({"n": n})
+        journal.compact({"n": n} for n in (98, 99))
+        journal.append({"n": 100})
+        journal.close()
+        journal, records = self.load()
+        self.assertEqual(records, [98, 99, 100])
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+        journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
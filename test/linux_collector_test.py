@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import os
+import shutil
+import tempfile
+import unittest
+
+from liota.collectors import linux_collector
+from liota.collectors.linux_collector import LinuxCollector, ProcFile
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.collectors.linux_collector
+# It lays out fixture /proc and /sys files in a temporary directory, changes
+# them between two samples and checks the utilizations and rates computed
+# from /proc/stat, /proc/diskstats and /proc/net/dev, the other statistics,
+# and that a ProcFile kept open reads the current content again.
+
+STAT = """cpu  %d 0 %d %d %d 0 0 0 0 0
+cpu0 %d 0 %d %d %d 0 0 0 0 0
+intr 12345 0 0
+ctxt %d
+btime 1500000000
+processes 4321
+procs_running %d
+procs_blocked 1
+"""
+
+DISKSTATS = """   8       0 sda 100 0 %d 0 50 0 %d 0 0 %d 0
+   8       1 sda1 100 0 10 0 50 0 10 0 0 10 0
+   8      16 sdb 100 0 999 0 50 0 999 0 0 999 0
+"""
+
+NET_DEV = """Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+    lo:  500000    100    0    0    0     0          0         0   500000     100    0    0    0     0       0          0
+  eth0: %d      10    0    0    0     0          0         0 %d      20    0    0    0     0       0          0
+"""
+
+MEMINFO = """MemTotal:        1024000 kB
+MemFree:          256000 kB
+MemAvailable:     512000 kB
+Buffers:           10000 kB
+Cached:           100000 kB
+SwapTotal:          2048 kB
+SwapFree:           1024 kB
+"""
+
+
+class Clock:
+
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+class LinuxCollectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.proc = os.path.join(self.dir, "proc")
+        self.sys = os.path.join(self.dir, "sys")
+        os.makedirs(os.path.join(self.proc, "net"))
+        os.makedirs(os.path.join(self.sys, "class", "thermal", "thermal_zone0"))
+        self.clock = Clock(1000.0)
+        self.time = linux_collector.time
+        linux_collector.time = self.clock
+
+    def tearDown(self):
+        linux_collector.time = self.time
+        shutil.rmtree(self.dir)
+
+    def write(self, name, content):
+        # Rewritten in place, like the kernel does, so open files see it
+        with open(os.path.join(self.proc, name), "w") as f:
+            f.write(content)
+
+    def write_counters(self, user, system, idle, iowait, ctxt, running, sectors_read, sectors_written, io_ms,
+                       rx, tx):
+        self.write("stat", STAT % (user, system, idle, iowait, user, system, idle, iowait, ctxt, running))
+        self.write("diskstats", DISKSTATS % (sectors_read, sectors_written, io_ms))
+        self.write("net/dev", NET_DEV % (rx, tx))
+
+    def test_sample(self):
+        self.write_counters(100, 50, 800, 50, 1000, 2, 2000, 4000, 300, 1000, 2000)
+        self.write("meminfo", MEMINFO)
+        self.write("loadavg", "0.50 0.25 0.10 1/100 1234\n")
+        with open(os.path.join(self.sys, "class", "thermal", "thermal_zone0", "temp"), "w") as f:
+            f.write("45000\n")
+        collector = LinuxCollector(disks=["sda"], interfaces=["eth0"], proc_path=self.proc, sys_path=self.sys)
+        self.write_counters(200, 100, 1600, 100, 3000, 3, 4000, 8000, 5300, 11000, 4500)
+        self.clock.now += 10
+        values = collector.sample()
+        self.assertEqual(values["cpu.utilization"], 20.0)
+        self.assertEqual((values["cpu.user"], values["cpu.system"], values["cpu.iowait"]), (10.0, 5.0, 5.0))
+        self.assertEqual((values["cpu.procs_running"], values["cpu.procs_blocked"]), (3, 1))
+        self.assertEqual(values["cpu.context_switches"], 200.0)
+        self.assertEqual(values["disk.sda.read"], 102400.0)
+        self.assertEqual(values["disk.sda.write"], 204800.0)
+        self.assertEqual(values["disk.sda.busy"], 50.0)
+        self.assertEqual((values["net.eth0.rx"], values["net.eth0.tx"]), (8000.0, 2000.0))
+        self.assertFalse([key for key in values if "sdb" in key or "sda1" in key or "net.lo" in key])
+        self.assertEqual((values["mem.total"], values["mem.free"], values["mem.available"]), (1000.0, 250.0, 500.0))
+        self.assertEqual((values["mem.swap_used"], values["mem.used"]), (1.0, 50.0))
+        self.assertEqual((values["load.1"], values["load.5"], values["load.15"]), (0.5, 0.25, 0.1))
+        self.assertEqual(values["thermal.thermal_zone0"], 45.0)
+        # Unchanged counters: no ticks passed, so the CPU values stay
+        self.clock.now += 10
+        values = collector.sample()
+        self.assertEqual(values["cpu.utilization"], 20.0)
+        self.assertEqual((values["disk.sda.read"], values["net.eth0.rx"]), (0.0, 0.0))
+        collector.close()
+
+    def test_missing_files(self):
+        self.write("loadavg", "1.00 2.00 3.00 1/100 1234\n")
+        collector = LinuxCollector(proc_path=self.proc, sys_path=os.path.join(self.dir, "nosys"))
+        self.assertEqual(collector.sample(), {"load.1": 1.0, "load.5": 2.0, "load.15": 3.0})
+        collector.close()
+
+    def test_proc_file_reads_again(self):
+        path = os.path.join(self.proc, "stat")
+        self.write("stat", "first\n")
+        proc_file = ProcFile(path)
+        self.assertEqual(proc_file.read(), "first\n")
+        self.assertEqual(proc_file.read(), "first\n")
+        # Content longer than one read is read in full, and at once next time
+        content = "".join("line %d\n" % i for i in range(2000))
+        self.write("stat", content)
+        self.assertEqual(proc_file.read(), content)
+        self.assertTrue(proc_file.size > len(content))
+        self.write("stat", "second\n")
+        self.assertEqual(proc_file.read(), "second\n")
+        proc_file.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
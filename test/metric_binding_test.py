@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import unittest
+
+from liota.core import metric_handler
+from liota.core.metric_handler import Metric
+
+#---------------------------------------------------------------------------
+# This is a testing script of Metric.bind and MetricBinding of module
+# liota.core.metric_handler
+# It checks that the samples of a metric reach every bound data center
+# component once its own aggregation_size is reached, under the details of
+# the binding, that a failing data center component only holds back its own
+# samples, and that it keeps at most max_buffered of them.
+
+class Dcc:
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.units = []
+        self.fail = fail
+
+    def publish_unit(self, registered_gw, details, unit):
+        self.units.append((registered_gw.resource, details, unit))
+
+    def publish_batch(self, metrics):
+        if self.fail:
+            raise IOError("DCC unreachable")
+        self.batches.append([(metric.details, metric.values[:]) for metric in metrics])
+
+
+class Registered:
+
+    def __init__(self, resource):
+        self.resource = resource
+
+
+def send(metric):
+    metric_handler.send_batch(metric.get_ready_to_send())
+
+
+class MetricBindingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.primary = Dcc()
+        self.metric = Metric("gw", "temp", "degC", 1, 2, None, self.primary)
+
+    def test_own_aggregation_size(self):
+        other = Dcc()
+        binding = self.metric.bind(other, Registered("other-gw"), details="room.temp", aggregation_size=3)
+        self.assertEqual(other.units, [("other-gw", "room.temp", "degC")])
+        self.assertEqual((binding.gw, binding.unit), ("other-gw", "degC"))
+        for t in (1, 2):
+            self.metric.add_sample(t, t * 10)
+        self.assertEqual(self.metric.get_ready_to_send(), [self.metric])
+        send(self.metric)
+        self.assertEqual(self.primary.batches, [[("temp", [(1, 10), (2, 20)])]])
+        self.assertEqual(other.batches, [])
+        self.metric.add_sample(3, 30)
+        self.assertEqual(self.metric.get_ready_to_send(), [binding])
+        send(self.metric)
+        self.assertEqual(other.batches, [[("room.temp", [(1, 10), (2, 20), (3, 30)])]])
+        self.assertEqual((binding.values, binding.current_aggregation_size), ([], 0))
+        self.assertEqual(self.metric.values, [(3, 30)])
+
+    def test_failing_dcc_isolated(self):
+        failing = Dcc(fail=True)
+        working = Dcc()
+        held = self.metric.bind(failing, Registered("gw"), aggregation_size=1, max_buffered=3)
+        sent = self.metric.bind(working, Registered("gw"), aggregation_size=1)
+        for t in range(1, 6):
+            self.metric.add_sample(t, t)
+            send(self.metric)
+        # The metric and the working binding are not held back
+        self.assertEqual(sum(len(values) for batch in working.batches for _, values in batch), 5)
+        self.assertEqual(sum(len(values) for batch in self.primary.batches for _, values in batch), 4)
+        self.assertEqual((self.metric.values, sent.values), ([(5, 5)], []))
+        # The oldest samples of the failing one are dropped
+        self.assertEqual(held.values, [(3, 3), (4, 4), (5, 5)])
+        self.assertEqual(held.dropped, 2)
+        failing.fail = False
+        send(self.metric)
+        self.assertEqual(failing.batches, [[("temp", [(3, 3), (4, 4), (5, 5)])]])
+
+
+if __name__ == '__main__':
+    unittest.main()
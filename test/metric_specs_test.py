@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from liota.boards.gateway_dk300 import Dk300
+from liota.core.metric_handler import EventsPriorityQueue, Metric
+from liota.core.metric_specs import normalize_spec
+from liota.dcc.vrops import Vrops
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.core.metric_specs and of
+# create_metrics of the data center components
+# It checks that metrics are created from a list of specs and from a spec
+# file, with units given by their pint names, that their units are published
+# in one message, and that put_all_and_notify schedules many metrics at once.
+
+class Connection:
+
+    def __init__(self):
+        self.sent = []
+        self.counter = 0
+
+    def next_id(self):
+        self.counter += 2
+        return self.counter
+
+    def send(self, msg, priority=None, on_delivered=None):
+        self.sent.append(msg)
+
+
+def read_temperature():
+    return 21.5
+
+
+class CreateMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.vrops = Vrops.__new__(Vrops)
+        self.vrops.con = Connection()
+        self.vrops.max_frame_size = 65536
+        self.vrops.property_delay = 0.1
+        self.vrops.property_condition = threading.Condition()
+        self.vrops.pending_properties = {}
+        self.vrops.property_due = None
+        self.vrops.sent_properties = {}
+        self.vrops.unacked_properties = {}
+        self.vrops.property_sequence = 0
+        gw = Dk300("gw")
+        gw.res_uuid = "uuid-1"
+        self.gw = Vrops.VropsResource(gw, True)
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def published_properties(self):
+        [msg] = self.vrops.con.sent
+        return dict((entry["propertyKey"], entry["propertyValue"]) for entry in msg["body"]["property_data"])
+
+    def test_list_of_specs(self):
+        metrics = self.vrops.create_metrics(self.gw, [
+            {"details": "cpu.temperature", "unit": "degC", "sampling_function": read_temperature},
+            {"details": "fan.power", "unit": "kilowatt", "sampling_function": read_temperature,
+             "sampling_interval_sec": 5, "aggregation_size": 1}])
+        self.assertEqual([metric.details for metric in metrics], ["cpu.temperature", "fan.power"])
+        self.assertEqual(str(metrics[0].unit), "degC")
+        self.assertEqual((metrics[0].sampling_interval_sec, metrics[0].aggregation_size), (10, 6))
+        self.assertEqual((metrics[1].sampling_interval_sec, metrics[1].aggregation_size), (5, 1))
+        self.assertEqual(metrics[0].sampling_function(), 21.5)
+        self.assertEqual(self.published_properties(), {
+            "cpu.temperature_unit": "degree Celsius", "cpu.temperature_prefix": "",
+            "fan.power_unit": "watt", "fan.power_prefix": "kilo"})
+
+    def test_spec_file(self):
+        path = os.path.join(self.dir, "specs.json")
+        with open(path, "w") as f:
+            json.dump([{"details": "uptime", "unit": None, "sampling_function": "time.time"}], f)
+        [metric] = self.vrops.create_metrics(self.gw, path)
+        self.assertTrue(metric.sampling_function is time.time)
+        self.assertEqual(self.published_properties(), {"uptime_unit": "", "uptime_prefix": ""})
+
+    def test_missing_keys(self):
+        self.assertRaises(ValueError, normalize_spec, {"details": "cpu.temperature"})
+        self.assertRaises(ValueError, normalize_spec, {"sampling_function": read_temperature})
+
+
+class PutAllAndNotifyTest(unittest.TestCase):
+
+    def test_scheduled_in_order(self):
+        queue = EventsPriorityQueue()
+        metrics = []
+        for next_run_time in (500, 300, 100, 200):
+            metric = Metric(None, "m%d" % next_run_time, None, 1, 1, None, None)
+            metric.next_run_time = next_run_time
+            metrics.append(metric)
+        queue.put_and_notify(metrics[0])
+        queue.put_all_and_notify(metrics[1:])
+        queue.put_all_and_notify([])
+        self.assertEqual(queue.unfinished_tasks, 4)
+        self.assertEqual([queue.get_nowait().next_run_time for _ in range(4)], [100, 200, 300, 500])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "harness"))
+
+from liota.core.high_rate import BlockBatch, SampleBlock
+from liota.core.metric_handler import Metric
+from liota.dcc.mqtt_dcc import MqttDcc
+from liota.transports.mqtt import Mqtt
+from mqtt_broker import MqttBroker
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.transports.mqtt and of MqttDcc
+# It publishes to the MQTT broker stand-in of the test harness and checks
+# that no more than max_inflight messages wait for their PUBACK, that a
+# PUBACK arriving before publish() returned is not lost, that messages not
+# acknowledged before a restart are sent from the offline queue, and that
+# MqttDcc sends a topic's samples once batch_size of them are buffered or
+# batch_delay passed, and blocks of samples with their exact start and period.
+
+def unused_port():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+class Received:
+    """ Collects the datapoints the broker receives, per topic.
+
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def __call__(self, topic, value, timestamp, recv_ms):
+        with self.lock:
+            self.values.setdefault(topic, []).append((timestamp, value))
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self.lock:
+                if sum(len(values) for values in self.values.values()) >= count:
+                    break
+            time.sleep(0.01)
+        with self.lock:
+            return dict(self.values)
+
+
+def payload(t, v):
+    return json.dumps({"t": [t], "v": [v]})
+
+
+class MqttTest(unittest.TestCase):
+
+    def setUp(self):
+        self.received = Received()
+        self.broker = None
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        if self.broker is not None:
+            self.broker.stop()
+        shutil.rmtree(self.dir)
+
+    def start_broker(self, **kwargs):
+        self.broker = MqttBroker(on_datapoint=self.received, **kwargs).start()
+        return self.broker
+
+    def test_in_flight_window(self):
+        broker = self.start_broker(ack_delay=0.05)
+        con = Mqtt("127.0.0.1", broker.port, max_inflight=4)
+        for i in range(20):
+            con.publish("liota/gw/m", payload(i, i))
+        most = 0
+        deadline = time.time() + 5
+        while con.pending() > 0 and time.time() < deadline:
+            most = max(most, con.get_stats()["in_flight"])
+            time.sleep(0.005)
+        self.assertTrue(con.flush(5))
+        stats = con.get_stats()
+        con.close()
+        self.assertTrue(0 < most <= 4)
+        self.assertEqual((stats["published"], stats["acked"], stats["in_flight"]), (20, 20, 0))
+        self.assertEqual(self.received.wait_for(20)["liota/gw/m"], [(i, i) for i in range(20)])
+
+    def test_early_ack(self):
+        con = Mqtt("127.0.0.1", unused_port(), max_inflight=2)
+        con.client.loop_stop()
+
+        class Info:
+
+            def __init__(self, mid):
+                self.mid = mid
+                self.rc = 0
+
+        class Client:
+            """ Acknowledges every message before publish() returns.
+
+            """
+            def __init__(self):
+                self.mid = 0
+
+            def publish(self, topic, payload, qos, retain):
+                self.mid += 1
+                con.on_publish(self, None, self.mid)
+                return Info(self.mid)
+
+            def disconnect(self):
+                pass
+
+            def loop_stop(self):
+                pass
+        con.client = Client()
+        con.on_connect(con.client, None, {}, 0)
+        for i in range(5):
+            con.publish("liota/gw/m", payload(i, i))
+        self.assertTrue(con.flush(2))
+        self.assertEqual((con.in_flight, con.early_acks), ({}, set()))
+        self.assertEqual(con.get_stats()["acked"], 5)
+        con.close()
+
+    def test_replay_after_restart(self):
+        path = os.path.join(self.dir, "mqtt.queue")
+        port = unused_port()
+        con = Mqtt("127.0.0.1", port, queue_path=path)
+        for i in range(3):
+            con.publish("liota/gw/m", payload(i, i))
+        con.publish("liota/gw/m", payload(3, 3), qos=0)
+        con.close()
+        self.start_broker()
+        con = Mqtt("127.0.0.1", self.broker.port, queue_path=path)
+        self.assertTrue(con.flush(5))
+        con.close()
+        # QoS 0 messages are not kept
+        self.assertEqual(self.received.wait_for(3)["liota/gw/m"], [(0, 0), (1, 1), (2, 2)])
+        con = Mqtt("127.0.0.1", port, queue_path=path)
+        self.assertEqual(con.pending(), 0)
+        con.close()
+
+
+class Gateway:
+
+    def __init__(self, res_name):
+        self.res_name = res_name
+
+
+class Transport:
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, message, qos=1, retain=False):
+        self.published.append((topic, json.loads(message)))
+
+
+def make_metric(dcc, details, values):
+    metric = Metric(Gateway("gw"), details, None, 1, 1, None, dcc)
+    for t, v in values:
+        metric.add_sample(t, v)
+    return metric
+
+
+class MqttDccTest(unittest.TestCase):
+
+    def test_batch_size(self):
+        con = Transport()
+        dcc = MqttDcc(con, batch_size=3, batch_delay=60)
+        dcc.publish(make_metric(dcc, "a", [(1, 1.0), (2, 2.0)]))
+        self.assertEqual(con.published, [])
+        dcc.publish_batch([make_metric(dcc, "a", [(3, 3.0)]), make_metric(dcc, "b", [(3, 5.0)])])
+        self.assertEqual(con.published, [("liota/gw/a", {"t": [1, 2, 3], "v": [1.0, 2.0, 3.0]})])
+        dcc.flush()
+        self.assertEqual(con.published[1:], [("liota/gw/b", {"t": [3], "v": [5.0]})])
+        self.assertEqual(dcc.get_stats()["samples"], 4)
+
+    def test_batch_delay(self):
+        con = Transport()
+        dcc = MqttDcc(con, batch_size=100, batch_delay=0.05)
+        dcc.publish(make_metric(dcc, "a", [(1, 1.0)]))
+        dcc.publish(make_metric(dcc, "a", [(2, 2.0)]))
+        self.assertEqual(con.published, [])
+        deadline = time.time() + 2
+        while not con.published and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(con.published, [("liota/gw/a", {"t": [1, 2], "v": [1.0, 2.0]})])
+        self.assertEqual(dcc.get_stats()["buffered_topics"], 0)
+
+    def test_blocks_exact(self):
+        con = Transport()
+        dcc = MqttDcc(con, batch_size=100)
+        block = SampleBlock(1792409094247.3, 0.25, [1.0, 2.0])
+        dcc.publish(BlockBatch(make_metric(dcc, "vibration", []), [block]))
+        self.assertEqual(con.published, [("liota/gw/vibration", {"t0": 1792409094247.3, "dt": 0.25, "v": [1.0, 2.0]})])
+
+    def test_through_broker(self):
+        received = Received()
+        broker = MqttBroker(on_datapoint=received).start()
+        con = Mqtt("127.0.0.1", broker.port)
+        dcc = MqttDcc(con, batch_size=2)
+        dcc.publish(make_metric(dcc, "a", [(1, 1.0), (2, 2.0)]))
+        self.assertTrue(con.flush(5))
+        con.close()
+        broker.stop()
+        self.assertEqual(received.wait_for(2), {"liota/gw/a": [(1, 1.0), (2, 2.0)]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from liota.transports.offline_queue import OfflineQueue
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.transports.offline_queue
+# It checks that messages not acknowledged survive a restart in order, that
+# QoS 0 messages are not journaled, and that a full queue drops the oldest.
+
+class OfflineQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "mqtt.journal")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_reload_unacked(self):
+        queue = OfflineQueue(self.path)
+        for i in range(5):
+            queue.put("liota/gw/m", "payload-%d" % i)
+        queue.put("liota/gw/m", "qos0", qos=0)
+        first = queue.pop()
+        second = queue.pop()
+        queue.ack(first[0])
+        queue.close()
+        queue = OfflineQueue(self.path)
+        self.assertEqual(len(queue), 4)
+        self.assertEqual(queue.pop()[1:3], ("liota/gw/m", second[2]))
+        self.assertEqual(queue.pop()[2], "payload-2")
+        queue.put("liota/gw/m", "payload-5")
+        queue.close()
+        queue = OfflineQueue(self.path)
+        self.assertEqual([queue.pop()[2] for _ in range(len(queue))],
+                         ["payload-1", "payload-2", "payload-3", "payload-4", "payload-5"])
+        queue.close()
+
+    def test_binary_payload(self):
+        queue = OfflineQueue(self.path)
+        queue.put("t", "\x00\xff\x80\n")
+        queue.close()
+        queue = OfflineQueue(self.path)
+        self.assertEqual(queue.pop()[2], "\x00\xff\x80\n")
+        queue.close()
+
+    def test_drop_oldest(self):
+        queue = OfflineQueue(self.path, max_messages=3)
+        for i in range(5):
+            queue.put("t", str(i))
+        self.assertEqual(queue.dropped, 2)
+        queue.close()
+        queue = OfflineQueue(self.path)
+        self.assertEqual([queue.pop()[2] for _ in range(len(queue))], ["2", "3", "4"])
+        queue.close()
+
+    def test_compact(self):
+        queue = OfflineQueue(self.path)
+        for i in range(3000):
+            seq = queue.put("t", str(i))
+            queue.pop()
+            queue.ack(seq)
+        queue.put("t", "last")
+        queue.close()
+        with open(self.path) as f:
+            self.assertTrue(len(f.readlines()) < 2000)
+        queue = OfflineQueue(self.path)
+        self.assertEqual(queue.pop()[2], "last")
+        queue.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import unittest
+import zlib
+
+from liota.transports.permessage_deflate import PerMessageDeflate, DEFLATE_TAIL
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.transports.permessage_deflate
+# It checks that the parameters of the server's handshake response are
+# applied, that those of an earlier connection do not carry over to the next
+# one, and that compressed messages can be inflated by the server.
+
+class PerMessageDeflateTest(unittest.TestCase):
+
+    def test_parameters_reset_on_every_handshake(self):
+        deflate = PerMessageDeflate()
+        self.assertTrue(deflate.accept({"sec-websocket-extensions":
+            "permessage-deflate; client_no_context_takeover; server_no_context_takeover; client_max_window_bits=10"}))
+        self.assertEqual((deflate.client_context_takeover, deflate.server_context_takeover,
+                          deflate.client_window_bits), (False, False, 10))
+        deflate.compress("x" * 100)
+        # Reconnected to a server which agrees to the defaults
+        self.assertTrue(deflate.accept({"sec-websocket-extensions": "permessage-deflate"}))
+        self.assertEqual((deflate.client_context_takeover, deflate.server_context_takeover,
+                          deflate.client_window_bits), (True, True, zlib.MAX_WBITS))
+        self.assertEqual(deflate.compressor, None)
+        self.assertFalse(deflate.accept({}))
+
+    def test_round_trip(self):
+        deflate = PerMessageDeflate(min_size=8)
+        deflate.accept({"sec-websocket-extensions": "permessage-deflate"})
+        server = zlib.decompressobj(-zlib.MAX_WBITS)
+        for message in ['{"type":"add_stats","n":%d}' % i for i in range(3)]:
+            payload, compressed = deflate.compress(message)
+            self.assertTrue(compressed)
+            self.assertEqual(server.decompress(payload + DEFLATE_TAIL), message)
+        self.assertEqual(deflate.compress("short"), ("short", False))
+
+
+if __name__ == '__main__':
+    unittest.main()
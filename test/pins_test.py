@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import os
+import shutil
+import tempfile
+import unittest
+
+from liota.boards.gateway_dk50 import Dk50
+from liota.boards.pins import Pin, PinBank, SimulatedPinBank, SysfsPinBank
+from liota.core.metric_handler import Metric
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.boards.pins
+# It sets pins of a simulated, file-backed register bank and checks that one
+# read returns all of them, that pins are read from a directory laid out like
+# sysfs, and that a board distributes the values read to the metrics mapped
+# to its pins.
+
+class PinsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "registers")
+        self.pins = [Pin("D3", 3), Pin("D40", 40), Pin("A1", 1, analog=True, scale=0.5)]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_read(self):
+        bank = SimulatedPinBank(self.path, self.pins)
+        self.assertEqual(bank.read(), {"D3": 0, "D40": 0, "A1": 0.0})
+        bank.set("D3", 1)
+        bank.set("D40", 1)
+        bank.set("A1", 1000)
+        self.assertEqual(bank.read(), {"D3": 1, "D40": 1, "A1": 500.0})
+        bank.set("D3", 0)
+        self.assertEqual(bank.read()["D3"], 0)
+        self.assertEqual(bank.read()["D40"], 1)
+        bank.close()
+
+    def test_sysfs(self):
+        gpio = os.path.join(self.dir, "gpio")
+        iio = os.path.join(self.dir, "iio:device0")
+        os.makedirs(os.path.join(gpio, "gpio3"))
+        os.makedirs(iio)
+
+        def write(path, value):
+            with open(path, "w") as f:
+                f.write("%s\n" % value)
+        write(os.path.join(gpio, "gpio3", "value"), 1)
+        write(os.path.join(iio, "in_voltage1_raw"), 1000)
+        # D40 is not exported, so it is not sampled
+        bank = SysfsPinBank(self.pins, gpio_path=gpio, iio_path=iio)
+        self.assertEqual(bank.read(), {"D3": 1, "A1": 500.0})
+        write(os.path.join(gpio, "gpio3", "value"), 0)
+        write(os.path.join(iio, "in_voltage1_raw"), 4095)
+        self.assertEqual(bank.read(), {"D3": 0, "A1": 2047.5})
+        write(os.path.join(iio, "in_voltage1_raw"), "busy")
+        self.assertEqual(bank.read(), {"D3": 0})
+        bank.close()
+
+    def test_pin_bank_is_abstract(self):
+        self.assertRaises(TypeError, PinBank, self.pins)
+
+    def test_board_distributes_values(self):
+        bank = SimulatedPinBank(self.path, self.pins)
+        gw = Dk50("pins-test", pin_bank=bank)
+        self.assertEqual(sorted(gw.pins), ["A1", "D3", "D40"])
+        switch = gw.map_pin("D3", Metric(gw, "switch", None, 1, 1, None, None))
+        voltage = gw.map_pin("A1", Metric(gw, "voltage", None, 1, 1, None, None))
+        self.assertRaises(KeyError, gw.map_pin, "D99", switch)
+        bank.set("D3", 1)
+        bank.set("A1", 6)
+        group = gw.create_pin_sampler(sampling_interval_sec=3600)
+        group.collect()
+        self.assertEqual([v for _, v in switch.values], [1])
+        self.assertEqual([v for _, v in voltage.values], [3.0])
+        bank.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import threading
+import time
+import unittest
+
+from liota.dcc.resource_registration import RegistrationPipeline
+from liota.utilities.concurrency import Future
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.dcc.resource_registration
+# It runs the RegistrationPipeline against a fake connection and checks the
+# window of requests in flight, that responses are matched by transactionID,
+# that resources not created yet are polled again, and that requests are
+# sent again after response_timeout, with the old one cancelled, and when
+# the connection was lost.
+
+class Connection:
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.counter = 0
+        # (msg, Future of the response) in the order sent
+        self.requests = []
+        self.cancelled = []
+
+    def next_id(self):
+        with self.condition:
+            self.counter += 2
+            return self.counter
+
+    def request(self, msg):
+        future = Future()
+        with self.condition:
+            self.requests.append((msg, future))
+            self.condition.notify_all()
+        return future
+
+    def cancel(self, transaction_id):
+        self.cancelled.append(transaction_id)
+        for msg, future in self.requests:
+            if msg["transactionID"] == transaction_id:
+                future.set_exception(RuntimeError("Request {0} cancelled".format(transaction_id)))
+
+    def wait_for_requests(self, count, timeout=2):
+        deadline = time.time() + timeout
+        with self.condition:
+            while len(self.requests) < count and time.time() < deadline:
+                self.condition.wait(0.01)
+            return list(self.requests)
+
+
+class Resource:
+
+    def __init__(self, res_name):
+        self.res_name = res_name
+
+
+def respond(request, res_uuid):
+    msg, future = request
+    future.set_result({"type": "create_or_find_resource_response", "transactionID": msg["transactionID"],
+                       "body": {"uuid": res_uuid}})
+
+
+class RegistrationPipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.con = Connection()
+        self.pipelines = []
+
+    def tearDown(self):
+        for pipeline in self.pipelines:
+            pipeline.close()
+
+    def pipeline(self, **kwargs):
+        pipeline = RegistrationPipeline(self.con, lambda msg_id, gw: {"transactionID": msg_id, "name": gw.res_name},
+                                        **kwargs)
+        self.pipelines.append(pipeline)
+        return pipeline
+
+    def test_in_flight_window(self):
+        pipeline = self.pipeline(max_in_flight=2)
+        futures = [pipeline.submit(Resource("res%d" % i)) for i in range(5)]
+        requests = self.con.wait_for_requests(2)
+        time.sleep(0.05)
+        self.assertEqual(len(self.con.requests), 2)
+        self.assertEqual(pipeline.pending(), 5)
+        respond(requests[1], "uuid1")
+        requests = self.con.wait_for_requests(3)
+        self.assertEqual([msg["name"] for msg, _ in requests], ["res0", "res1", "res2"])
+        for request in requests[2:] + requests[:1]:
+            respond(request, "uuid-" + request[0]["name"])
+        for request in self.con.wait_for_requests(5)[3:]:
+            respond(request, "uuid-" + request[0]["name"])
+        self.assertEqual([future.result(2) for future in futures],
+                         ["uuid-res0", "uuid1", "uuid-res2", "uuid-res3", "uuid-res4"])
+        self.assertEqual(pipeline.pending(), 0)
+
+    def test_matched_by_transaction_id(self):
+        pipeline = self.pipeline()
+        first = pipeline.submit(Resource("first"))
+        second = pipeline.submit(Resource("second"))
+        requests = self.con.wait_for_requests(2)
+        respond(requests[1], "uuid-second")
+        self.assertFalse(first.done())
+        respond(requests[0], "uuid-first")
+        self.assertEqual((first.result(1), second.result(1)), ("uuid-first", "uuid-second"))
+        self.assertFalse(pipeline.on_response({"transactionID": 999, "body": {"uuid": "other"}}))
+
+    def test_polled_until_created(self):
+        pipeline = self.pipeline(initial_backoff=0.01, max_backoff=0.02)
+        future = pipeline.submit(Resource("res"))
+        respond(self.con.wait_for_requests(1)[0], "null")
+        respond(self.con.wait_for_requests(2)[1], "null")
+        requests = self.con.wait_for_requests(3)
+        self.assertEqual([msg["name"] for msg, _ in requests], ["res"] * 3)
+        self.assertEqual(len(set(msg["transactionID"] for msg, _ in requests)), 3)
+        self.assertFalse(future.done())
+        respond(requests[2], "uuid-res")
+        self.assertEqual(future.result(1), "uuid-res")
+        self.assertTrue(pipeline.creation_estimate > 0)
+
+    def test_sent_again_without_response(self):
+        pipeline = self.pipeline(response_timeout=0.1)
+        future = pipeline.submit(Resource("res"))
+        requests = self.con.wait_for_requests(2)
+        self.assertEqual(len(requests), 2)
+        old_id = requests[0][0]["transactionID"]
+        self.assertEqual(self.con.cancelled[:1], [old_id])
+        self.assertNotEqual(requests[1][0]["transactionID"], old_id)
+        respond(requests[1], "uuid-res")
+        self.assertEqual(future.result(1), "uuid-res")
+
+    def test_sent_again_when_connection_lost(self):
+        pipeline = self.pipeline()
+        future = pipeline.submit(Resource("res"))
+        msg, response = self.con.wait_for_requests(1)[0]
+        response.set_exception(IOError("Connection lost before response to {0}".format(msg["transactionID"])))
+        requests = self.con.wait_for_requests(2)
+        self.assertEqual(requests[1][0]["name"], "res")
+        self.assertEqual(self.con.cancelled, [])
+        respond(requests[1], "uuid-res")
+        self.assertEqual(future.result(1), "uuid-res")
+
+
+if __name__ == '__main__':
+    unittest.main()
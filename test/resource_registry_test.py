@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from liota.dcc.resource_registry import ResourceRegistry
+from liota.utilities.utility import systemUUID
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.dcc.resource_registry
+# It checks that registered resources survive a restart, including a journal
+# whose last record was torn by a crash, that compaction keeps them, and that
+# updates are synced to disk in the background rather than by put(), and
+# that the gateway uuid of the INI file of earlier releases is imported.
+
+class Resource:
+
+    def __init__(self, name, res_uuid, res_kind="HelixGateway"):
+        self.identifier = "id-" + name
+        self.res_name = name
+        self.res_kind = res_kind
+        self.res_uuid = res_uuid
+
+
+class ResourceRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "uuid.ini")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_reload(self):
+        registry = ResourceRegistry(self.path)
+        registry.put(Resource("gw", "uuid-gw"))
+        registry.put(Resource("dev", "uuid-dev", "Device"), parent_uuid="uuid-gw")
+        registry.put(Resource("gw", "uuid-gw-2"))
+        registry.close()
+        registry = ResourceRegistry(self.path)
+        self.assertEqual(registry.get("id-gw", "HelixGateway")["uuid"], "uuid-gw-2")
+        self.assertEqual(registry.get("id-dev", "Device")["parent"], "uuid-gw")
+        self.assertEqual(registry.get("id-dev", "HelixGateway"), None)
+        registry.close()
+
+    def test_parent_kept_on_update(self):
+        registry = ResourceRegistry(self.path)
+        registry.put(Resource("dev", "uuid-dev", "Device"), parent_uuid="uuid-gw")
+        registry.put(Resource("dev", "uuid-dev", "Device"))
+        self.assertEqual(registry.get("id-dev", "Device")["parent"], "uuid-gw")
+        registry.close()
+
+    def test_torn_record(self):
+        registry = ResourceRegistry(self.path)
+        registry.put(Resource("gw", "uuid-gw"))
+        registry.close()
+        with open(self.path, "a") as f:
+            f.write('{"identifier": "id-dev", "ki')
+        registry = ResourceRegistry(self.path)
+        self.assertEqual(registry.get("id-gw", "HelixGateway")["uuid"], "uuid-gw")
+        self.assertEqual(registry.get("id-dev", "Device"), None)
+        registry.put(Resource("dev", "uuid-dev", "Device"))
+        registry.close()
+        registry = ResourceRegistry(self.path)
+        self.assertEqual(registry.get("id-dev", "Device")["uuid"], "uuid-dev")
+        registry.close()
+
+    def test_compact(self):
+        registry = ResourceRegistry(self.path)
+        for i in range(300):
+            registry.put(Resource("gw", "uuid-%d" % i))
+        registry.close()
+        registry = ResourceRegistry(self.path)
+        with open(self.path) as f:
+            self.assertEqual(len(f.readlines()), 1)
+        self.assertEqual(registry.get("id-gw", "HelixGateway")["uuid"], "uuid-299")
+        registry.close()
+
+    def test_synced_in_background(self):
+        synced = []
+        fsync = os.fsync
+
+        def record_fsync(fd):
+            synced.append(threading.current_thread())
+            fsync(fd)
+        os.fsync = record_fsync
+        try:
+            registry = ResourceRegistry(self.path, sync_delay=0.01)
+            registry.put(Resource("gw", "uuid-gw"))
+            deadline = time.time() + 1
+            while not synced and time.time() < deadline:
+                time.sleep(0.01)
+            registry.close()
+        finally:
+            os.fsync = fsync
+        self.assertTrue(len(synced) >= 2)
+        self.assertNotEqual(synced[0], threading.current_thread())
+        # close() syncs what is left
+        self.assertEqual(synced[-1], threading.current_thread())
+
+    def test_import_ini(self):
+        # As written by earlier releases
+        with open(self.path, "w") as f:
+            f.write("[GATEWAY]\nedge-gw = uuid-gw\n\n")
+        registry = ResourceRegistry(self.path)
+        record = registry.get(systemUUID().get_uuid("edge-gw"), "HelixGateway")
+        self.assertEqual((record["name"], record["uuid"]), ("edge-gw", "uuid-gw"))
+        registry.put(Resource("dev", "uuid-dev", "Device"))
+        registry.close()
+        with open(self.path) as f:
+            self.assertEqual([json.loads(line)["uuid"] for line in f], ["uuid-gw", "uuid-dev"])
+        registry = ResourceRegistry(self.path)
+        self.assertEqual(registry.get(systemUUID().get_uuid("edge-gw"), "HelixGateway")["uuid"], "uuid-gw")
+        registry.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
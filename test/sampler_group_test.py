@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import unittest
+
+from Queue import Queue
+
+from liota.core import metric_handler
+from liota.core.metric_handler import EventsPriorityQueue, Metric, SamplerGroup
+
+#---------------------------------------------------------------------------
+# This is a testing script of SamplerGroup of module liota.core.metric_handler
+# It checks that every metric of a group gets the value of its key from one
+# call of the sampling function, that a missing key only skips its own
+# metric, that each metric is sent by its own aggregation_size, and that a
+# group whose collection failed is scheduled again at the next interval.
+
+class Reader:
+
+    def __init__(self, values):
+        self.values = values
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if isinstance(self.values, Exception):
+            raise self.values
+        return self.values
+
+
+def make_metric(details, aggregation_size=1):
+    return Metric("gw", details, None, 1, aggregation_size, None, "dcc")
+
+
+class SamplerGroupTest(unittest.TestCase):
+
+    def test_key_mapping(self):
+        read = Reader({"user": 10, "system": 5, "idle": 85})
+        group = SamplerGroup(read, sampling_interval_sec=5)
+        user = group.add(make_metric("cpu.user"), "user")
+        idle = group.add(make_metric("cpu.idle"), "idle")
+        self.assertEqual((user.sampling_interval_sec, idle.sampling_interval_sec), (5, 5))
+        group.collect()
+        self.assertEqual(read.calls, 1)
+        self.assertEqual([v for _, v in user.values], [10])
+        self.assertEqual([v for _, v in idle.values], [85])
+        self.assertEqual(user.values[0][0], idle.values[0][0])
+
+    def test_sequence(self):
+        group = SamplerGroup(Reader((0.5, 0.25, 0.1)))
+        load = group.add(make_metric("load.5"), 1)
+        group.collect()
+        self.assertEqual([v for _, v in load.values], [0.25])
+
+    def test_missing_key(self):
+        group = SamplerGroup(Reader({"user": 10}))
+        user = group.add(make_metric("cpu.user"), "user")
+        steal = group.add(make_metric("cpu.steal"), "steal")
+        other = group.add(make_metric("cpu.other"), 3)
+        group.collect()
+        self.assertEqual([v for _, v in user.values], [10])
+        self.assertEqual((steal.values, other.values), ([], []))
+
+    def test_own_aggregation_size(self):
+        group = SamplerGroup(Reader({"a": 1, "b": 2}))
+        a = group.add(make_metric("a", aggregation_size=1), "a")
+        b = group.add(make_metric("b", aggregation_size=3), "b")
+        sent = []
+        for _ in range(3):
+            group.collect()
+            ready = group.get_ready_to_send()
+            sent.append([metric.details for metric in ready])
+            for metric in ready:
+                metric.clear_values()
+        self.assertEqual(sent, [["a"], ["a"], ["a", "b"]])
+        self.assertEqual(b.values, [])
+
+
+class CollectAndRescheduleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = metric_handler.event_ds, metric_handler.send_queue
+        metric_handler.event_ds = EventsPriorityQueue()
+        metric_handler.send_queue = Queue()
+
+    def tearDown(self):
+        metric_handler.event_ds, metric_handler.send_queue = self.saved
+
+    def test_failed_collect_retried(self):
+        read = Reader(IOError("/proc/stat unreadable"))
+        group = SamplerGroup(read, sampling_interval_sec=5)
+        metric = group.add(make_metric("cpu.user"), "user")
+        group.next_run_time = 1000
+        metric_handler.collect_and_reschedule(group)
+        self.assertEqual(read.calls, 1)
+        self.assertEqual(metric.values, [])
+        self.assertTrue(metric_handler.send_queue.empty())
+        self.assertTrue(metric_handler.event_ds.get_nowait() is group)
+        self.assertEqual(group.next_run_time, 6000)
+        read.values = {"user": 12}
+        metric_handler.collect_and_reschedule(group)
+        self.assertEqual(group.next_run_time, 11000)
+        self.assertTrue(metric_handler.send_queue.get_nowait() is metric)
+        self.assertEqual([v for _, v in metric.values], [12])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import json
+import threading
+import time
+import unittest
+from Queue import Queue
+
+from liota.boards.gateway_dk300 import Dk300
+from liota.core import metric_handler
+from liota.core.metric_handler import Metric
+from liota.dcc.graphite_dcc import Graphite
+from liota.dcc.vrops import Vrops
+
+#---------------------------------------------------------------------------
+# This is a testing script of the batched send path: next_batch and
+# send_batch of liota.core.metric_handler, and publish_batch of the Graphite
+# and vROps data center components.
+# It checks that a batch closes after the linger time under steady traffic,
+# that the metrics of a batch reach each data center component in one call,
+# that vROps frames are split on max_frame_size without losing samples, and
+# that Graphite writes the lines of a shard in one send.
+
+class Dcc:
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def publish_batch(self, metrics):
+        if self.fail:
+            raise IOError("DCC unreachable")
+        self.batches.append([(metric.details, metric.values[:]) for metric in metrics])
+
+
+def make_metric(dcc, details, values, gw=None):
+    metric = Metric(gw, details, None, 1, 1, None, dcc)
+    for t, v in values:
+        metric.add_sample(t, v)
+    return metric
+
+
+class NextBatchTest(unittest.TestCase):
+
+    def test_batch_closes_under_steady_traffic(self):
+        queue = Queue()
+        running = [True]
+
+        def feed():
+            while running[0]:
+                queue.put(object())
+                time.sleep(0.02)
+        feeder = threading.Thread(target=feed)
+        feeder.start()
+        try:
+            start = time.time()
+            batch = metric_handler.next_batch(queue)
+            elapsed = time.time() - start
+        finally:
+            running[0] = False
+            feeder.join()
+        self.assertTrue(elapsed < metric_handler.SEND_BATCH_LINGER_SEC + 0.1, elapsed)
+        self.assertTrue(1 <= len(batch) <= 5, len(batch))
+
+    def test_batch_closes_at_max_size(self):
+        queue = Queue()
+        for i in range(metric_handler.SEND_BATCH_MAX_SIZE + 5):
+            queue.put(i)
+        self.assertEqual(metric_handler.next_batch(queue), range(metric_handler.SEND_BATCH_MAX_SIZE))
+        self.assertEqual(queue.qsize(), 5)
+
+
+class SendBatchTest(unittest.TestCase):
+
+    def test_one_call_per_dcc(self):
+        first, second = Dcc(), Dcc()
+        a = make_metric(first, "a", [(1000, 1)])
+        b = make_metric(second, "b", [(1000, 2)])
+        c = make_metric(first, "c", [(1000, 3), (2000, 4)])
+        empty = make_metric(first, "empty", [])
+        metric_handler.send_batch([a, b, c, a, empty])
+        self.assertEqual(first.batches, [[("a", [(1000, 1)]), ("c", [(1000, 3), (2000, 4)])]])
+        self.assertEqual(second.batches, [[("b", [(1000, 2)])]])
+        self.assertEqual((a.values, b.values, c.values), ([], [], []))
+        self.assertEqual(c.current_aggregation_size, 0)
+
+    def test_failed_dcc_keeps_its_values(self):
+        failing, working = Dcc(fail=True), Dcc()
+        a = make_metric(failing, "a", [(1000, 1)])
+        b = make_metric(working, "b", [(1000, 2)])
+        metric_handler.send_batch([a, b])
+        self.assertEqual(a.values, [(1000, 1)])
+        self.assertEqual(b.values, [])
+        self.assertEqual(working.batches, [[("b", [(1000, 2)])]])
+
+
+class Connection:
+
+    def __init__(self):
+        self.frames = []
+        self.id = 0
+
+    def next_id(self):
+        self.id += 1
+        return self.id
+
+    def send(self, frame, priority=None):
+        self.frames.append(frame)
+
+
+class VropsBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        # Only the stats encoding is exercised, without logging in
+        self.vrops = Vrops.__new__(Vrops)
+        self.vrops.con = Connection()
+        self.vrops.max_frame_size = 65536
+        self.vrops.envelope_templates = {}
+        self.vrops.entry_templates = {}
+        self.gw = Dk300("vrops-batch-test")
+        self.gw.res_uuid = "uuid-gw"
+        self.other = Dk300("vrops-batch-test-2")
+        self.other.res_uuid = "uuid-other"
+
+    def stats(self):
+        # statKey -> [(timestamp, value)] of all frames, per resource uuid
+        stats = {}
+        for frame in self.vrops.con.frames:
+            msg = json.loads(frame)
+            self.assertEqual(msg["type"], "add_stats")
+            for entry in msg["metric_data"]:
+                samples = stats.setdefault(msg["uuid"], {}).setdefault(entry["statKey"], [])
+                samples.extend(zip(entry["timestamps"], entry["data"]))
+        return stats
+
+    def test_one_frame_per_resource(self):
+        metrics = [make_metric(self.vrops, "a", [(1000, 1), (2000, 2)], self.gw),
+                   make_metric(self.vrops, "b", [(1000, 3)], self.gw),
+                   make_metric(self.vrops, "c", [(1000, 4)], self.other)]
+        self.vrops.publish_batch(metrics)
+        self.assertEqual(len(self.vrops.con.frames), 2)
+        self.assertEqual(self.stats(), {
+            "uuid-gw": {"a": [(1000, 1), (2000, 2)], "b": [(1000, 3)]},
+            "uuid-other": {"c": [(1000, 4)]}
+        })
+
+    def test_frames_split_on_max_frame_size(self):
+        self.vrops.max_frame_size = 300
+        values = [(1000 * i, i) for i in range(100)]
+        metrics = [make_metric(self.vrops, "m%d" % i, values, self.gw) for i in range(3)]
+        frames = self.vrops._stats_frames(self.gw, metrics)
+        self.assertTrue(len(frames) > 3)
+        for frame in frames:
+            self.assertTrue(len(frame) <= 300, len(frame))
+        self.vrops.publish_batch(metrics)
+        self.assertEqual(self.stats(), {"uuid-gw": dict(("m%d" % i, values) for i in range(3))})
+
+
+class Endpoint:
+
+    def __init__(self, port):
+        self.carbon_server = "127.0.0.1"
+        self.carbon_port = port
+        self.payloads = []
+
+    def send(self, message, key=None):
+        self.payloads.append(message)
+        return True
+
+
+class GraphiteBatchTest(unittest.TestCase):
+
+    def test_one_send_per_endpoint(self):
+        endpoint = Endpoint(2003)
+        graphite = Graphite(endpoint)
+        metrics = [make_metric(graphite, "a", [(1000, 1), (2000, 2)]), make_metric(graphite, "b", [(3000, 3)])]
+        graphite.publish_batch(metrics)
+        self.assertEqual(endpoint.payloads, ["a 1 1\na 2 2\nb 3 3\n"])
+        self.assertEqual(graphite.get_stats()["127.0.0.1:2003"]["messages"], 3)
+
+    def test_metrics_stay_on_their_shard(self):
+        endpoints = [Endpoint(2003), Endpoint(2004)]
+        graphite = Graphite(endpoints)
+        # Writer threads of the shards are not exercised here
+        for shard in graphite.shards.values():
+            shard.queue = None
+        names = ["metric%d" % i for i in range(20)]
+        for _ in range(2):
+            graphite.publish_batch([make_metric(graphite, name, [(1000, 1)]) for name in names])
+        lines = [[line.split()[0] for payload in endpoint.payloads for line in payload.splitlines()]
+                 for endpoint in endpoints]
+        self.assertEqual(sorted(lines[0] + lines[1]), sorted(names * 2))
+        self.assertFalse(set(lines[0]) & set(lines[1]))
+        for endpoint in endpoints:
+            self.assertEqual(len(endpoint.payloads), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import json
+import unittest
+
+from liota.utilities import serializer
+from liota.utilities.serializer import Template
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.utilities.serializer
+# It checks that dumps() encodes like the json module, and that what a
+# Template renders, with values given or serialized already, parses back to
+# the object it stands for, also when keys hold "%" and statKeys are not
+# ASCII.
+
+def stdlib(obj):
+    return json.dumps(obj, separators=(',', ':'))
+
+
+STAT_KEYS = ["cpu.temperature", u"température", "d\xc3\xa9bit", "disk|0", "usage %", "%s%d%%"]
+
+
+class DumpsTest(unittest.TestCase):
+
+    def test_like_stdlib(self):
+        for obj in ([], {}, [1, 2.5, -3, 1792409094247, 0.1], {"a": [None, True, False]},
+                    {"statKey": u"température ℃"}, ["d\xc3\xa9bit", "tab\t\"quoted\"\n"],
+                    (1, (2, 3)), {"nested": {"k%": [1e-7, 1e21]}}):
+            self.assertEqual(serializer.dumps(obj), stdlib(obj))
+            self.assertEqual(serializer.loads(serializer.dumps(obj)), json.loads(stdlib(obj)))
+
+
+class TemplateTest(unittest.TestCase):
+
+    def test_render(self):
+        for statkey in STAT_KEYS:
+            template = Template({"statKey": statkey}, ("timestamps", "data"))
+            timestamps, data = (1792409094247, 1792409094347), (21.5, 0.1)
+            text = template.render(timestamps, data)
+            self.assertEqual(json.loads(text),
+                             json.loads(stdlib({"statKey": statkey, "timestamps": timestamps, "data": data})))
+            self.assertEqual(text, stdlib({"statKey": statkey})[:-1] + ',"timestamps":' + stdlib(timestamps) +
+                             ',"data":' + stdlib(data) + "}")
+            self.assertEqual(json.loads(template.render([], [])),
+                             {"statKey": json.loads(stdlib(statkey)), "timestamps": [], "data": []})
+
+    def test_render_serialized(self):
+        obj = {"type": "add_stats", "transactionID": 4, "body": {"uuid": "uuid-1", "%key": "100%"}}
+        template = Template(dict(obj, metric_data=[]), ("metric_data",))
+        entries = [Template({"statKey": statkey}, ("timestamps", "data")).render([i], [i * 1.5])
+                   for i, statkey in enumerate(STAT_KEYS)]
+        text = template.render_serialized("[" + ",".join(entries) + "]")
+        expected = dict(obj, metric_data=[{"statKey": statkey, "timestamps": [i], "data": [i * 1.5]}
+                                          for i, statkey in enumerate(STAT_KEYS)])
+        self.assertEqual(json.loads(text), json.loads(stdlib(expected)))
+        self.assertEqual(template.static_size, len(template.render_serialized("")))
+
+    def test_fields_only(self):
+        template = Template({}, ("a%", "b"))
+        self.assertEqual(template.render({"x": "%s"}, u"é"), stdlib({"a%": {"x": "%s"}})[:-1] + ',"b":' +
+                         stdlib(u"é") + "}")
+        self.assertEqual(json.loads(template.render(1, 2)), {"a%": 1, "b": 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import json
+import random
+import unittest
+
+from liota.core.metric_handler import Metric
+from liota.dcc.graphite_dcc import Graphite
+from liota.dcc.mqtt_dcc import MqttDcc
+from liota.transformers.sketch import QuantileSketch, SketchAggregator
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.transformers.sketch
+# It checks that quantiles are within the relative accuracy of the exact
+# ones, also for negative values, that merged and deserialized sketches give
+# the same quantiles, that memory stays bounded, that the aggregator sends
+# the quantiles of every complete window, and that the sketch itself can only
+# be sent to data center components which carry structured values.
+
+def exact(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+class QuantileSketchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.random = random.Random(42)
+
+    def assertClose(self, estimate, value, accuracy):
+        self.assertTrue(abs(estimate - value) <= accuracy * abs(value) + 1e-12, "%r is not %r" % (estimate, value))
+
+    def test_relative_accuracy(self):
+        values = [self.random.lognormvariate(0, 2) for _ in range(20000)]
+        values += [-self.random.expovariate(1) for _ in range(5000)] + [0.0] * 100
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for v in values:
+            sketch.add(v)
+        for q in (0.0, 0.01, 0.1, 0.19, 0.25, 0.5, 0.9, 0.95, 0.99, 0.999, 1.0):
+            self.assertClose(sketch.quantile(q), exact(values, q), 0.01)
+
+    def test_merge_and_serialize(self):
+        parts = [[self.random.expovariate(0.1) for _ in range(3000)] for _ in range(3)]
+        merged = QuantileSketch()
+        for part in parts:
+            sketch = QuantileSketch()
+            for v in part:
+                sketch.add(v)
+            merged.merge(QuantileSketch.from_dict(json.loads(json.dumps(sketch.to_dict()))))
+        values = sum(parts, [])
+        self.assertEqual(merged.count, len(values))
+        for q in (0.5, 0.95, 0.99):
+            self.assertClose(merged.quantile(q), exact(values, q), 0.01)
+
+    def test_bounded_buckets(self):
+        sketch = QuantileSketch(relative_accuracy=0.01, max_buckets=100)
+        values = [10 ** self.random.uniform(-6, 6) for _ in range(10000)]
+        for v in values:
+            sketch.add(v)
+        self.assertTrue(sketch.buckets() <= 100)
+        self.assertClose(sketch.quantile(0.99), exact(values, 0.99), 0.01)
+
+    def test_aggregator(self):
+        aggregator = SketchAggregator(window_sec=1, quantiles=(0.5,), sketch_name="{details}.sketch")
+        outputs = dict(aggregator.process("latency", [(t, t % 1000) for t in range(0, 2000, 10)]))
+        (start, p50), = outputs["latency.p50"]
+        self.assertEqual(start, 0)
+        self.assertClose(p50, 490, 0.01)
+        self.assertEqual(outputs["latency.sketch"][0][1]["count"], 100)
+        self.assertEqual(aggregator.sketch.count, 100)
+
+    def test_sketch_only_to_structured_dccs(self):
+        graphite = Graphite(None)
+        metric = Metric(None, "latency", None, 1, 10, None, graphite)
+        self.assertRaises(ValueError, metric.add_transform, SketchAggregator(sketch_name="{details}.sketch"))
+        self.assertRaises(ValueError, graphite.add_transform, SketchAggregator(sketch_name="{details}.sketch"))
+        metric.add_transform(SketchAggregator())
+        mqtt = Metric(None, "latency", None, 1, 10, None, MqttDcc(None))
+        mqtt.add_transform(SketchAggregator(sketch_name="{details}.sketch"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import socket
+import threading
+import time
+import unittest
+
+from liota.dcc.graphite_dcc import Graphite
+from liota.transports import socket_connection
+from liota.transports.socket_connection import Socket, SocketPool
+
+#---------------------------------------------------------------------------
+# This is a testing script of SocketPool of module
+# liota.transports.socket_connection
+# It sends through a pool of connections to a local listener and checks that
+# messages of one key share a connection, that messages without a key are
+# spread evenly even when sent from several threads, and that failed writes
+# are reported as such, also in the statistics of Graphite. It also checks
+# that a single Socket connects with a timeout and backs off reconnecting.
+
+class Listener:
+    """ Accepts connections and keeps what each one received.
+
+    """
+    def __init__(self):
+        self.server = socket.socket()
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(16)
+        self.port = self.server.getsockname()[1]
+        self.received = []
+        thread = threading.Thread(target=self._accept)
+        thread.daemon = True
+        thread.start()
+
+    def _accept(self):
+        while True:
+            try:
+                con, _ = self.server.accept()
+            except socket.error:
+                return
+            data = []
+            self.received.append(data)
+            thread = threading.Thread(target=self._read, args=(con, data))
+            thread.daemon = True
+            thread.start()
+
+    def _read(self, con, data):
+        while True:
+            chunk = con.recv(65536)
+            if not chunk:
+                return
+            data.append(chunk)
+
+    def lines(self):
+        return ["".join(data).splitlines() for data in self.received]
+
+    def close(self):
+        self.server.close()
+
+
+class Series:
+
+    def __init__(self, details, values):
+        self.details = details
+        self.values = values
+
+
+def unused_port():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+class SocketPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.listener = Listener()
+        self.pool = SocketPool("127.0.0.1", self.listener.port, pool_size=3)
+
+    def tearDown(self):
+        self.pool.close()
+        self.listener.close()
+
+    def wait_for_lines(self, count):
+        deadline = time.time() + 2
+        while sum(len(lines) for lines in self.listener.lines()) < count and time.time() < deadline:
+            time.sleep(0.01)
+        return self.listener.lines()
+
+    def test_keyed_messages_share_a_connection(self):
+        futures = [self.pool.send("%s %d 0\n" % (key, i), key) for i in range(10) for key in ("a", "b", "c")]
+        self.assertTrue(all(future.result(2) for future in futures))
+        connections = {}
+        for index, lines in enumerate(self.wait_for_lines(30)):
+            for line in lines:
+                key, value, _ = line.split()
+                connections.setdefault(key, set()).add(index)
+            for key in set(line.split()[0] for line in lines):
+                # In the order sent
+                self.assertEqual([line.split()[1] for line in lines if line.split()[0] == key],
+                                 [str(i) for i in range(10)])
+        self.assertEqual(sorted(connections), ["a", "b", "c"])
+        for key, indexes in connections.items():
+            self.assertEqual(len(indexes), 1)
+
+    def test_round_robin_from_several_threads(self):
+        futures = []
+
+        def send():
+            for i in range(100):
+                futures.append(self.pool.send("m %d 0\n" % i))
+        threads = [threading.Thread(target=send) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(all(future.result(2) for future in futures))
+        self.wait_for_lines(400)
+        self.assertEqual(sorted(stats["payloads"] for stats in self.pool.get_stats()), [133, 133, 134])
+
+    def test_failed_sends(self):
+        pool = SocketPool("127.0.0.1", unused_port(), pool_size=2)
+        self.assertEqual(pool.send("m 1 0\n").result(2), False)
+        graphite = Graphite(pool)
+        graphite.publish(Series("m", [(1000, 1), (2000, 2)]))
+        deadline = time.time() + 2
+        stats = graphite.get_stats().values()[0]
+        while stats["errors"] < 2 and time.time() < deadline:
+            time.sleep(0.01)
+            stats = graphite.get_stats().values()[0]
+        self.assertEqual((stats["messages"], stats["errors"]), (0, 2))
+        pool.close()
+
+
+class SocketTest(unittest.TestCase):
+
+    def test_backoff(self):
+        port = unused_port()
+        con = Socket("127.0.0.1", port, timeout=1.0, initial_backoff=0.5, max_backoff=1.0)
+        self.assertEqual(con.sock, None)
+        connects = []
+        connect_soc = con.connect_soc
+
+        def count_connect():
+            connects.append(True)
+            connect_soc()
+        con.connect_soc = count_connect
+        # Given up on without connecting while backing off
+        self.assertFalse(con.send("m 1 0\n"))
+        self.assertEqual(connects, [])
+        con.retry_at = 0
+        self.assertFalse(con.send("m 1 0\n"))
+        self.assertEqual((len(connects), con.backoff), (1, 1.0))
+        con.retry_at = 0
+        con.send("m 1 0\n")
+        self.assertEqual(con.backoff, 1.0)
+        # Connected once the relay is back
+        server = socket.socket()
+        server.bind(("127.0.0.1", port))
+        server.listen(1)
+        con.retry_at = 0
+        self.assertTrue(con.send("m 1 0\n"))
+        self.assertEqual((con.backoff, con.sock.gettimeout()), (0.5, 1.0))
+        con.close()
+        server.close()
+
+    def test_connect_timeout(self):
+        timeouts = []
+        real_socket = socket_connection.socket.socket
+
+        class TimingOut:
+
+            def settimeout(self, timeout):
+                timeouts.append(timeout)
+
+            def connect(self, address):
+                raise socket.timeout("timed out")
+
+            def close(self):
+                pass
+        socket_connection.socket.socket = TimingOut
+        try:
+            con = Socket("192.0.2.1", 2003, timeout=0.2)
+        finally:
+            socket_connection.socket.socket = real_socket
+        self.assertEqual((timeouts, con.sock), ([0.2], None))
+        self.assertFalse(con.send("m 1 0\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
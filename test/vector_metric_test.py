@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import unittest
+from array import array
+
+from liota.core.metric_handler import VectorMetric
+from liota.dcc.graphite_dcc import Graphite
+from liota.transformers.aggregation import WindowAggregator
+from liota.transformers.filters import DeadbandFilter
+from liota.utilities import vector_buffer
+
+#---------------------------------------------------------------------------
+# This is a testing script of VectorMetric and liota.utilities.vector_buffer
+# It checks, with numpy if it is installed and with the array module, that
+# vector samples are kept in the preallocated buffer, that the oldest are
+# dropped when it is full, how Graphite sends them, and that they cannot be
+# bound or transformed.
+
+class VectorMetricTest(unittest.TestCase):
+
+    def check_backend(self, use_numpy):
+        metric = VectorMetric(None, "accel", None, 1, 2, None, None, 3, max_buffered=3, use_numpy=use_numpy)
+        metric.add_sample(1000, [1, 2, 3])
+        metric.add_sample(2000, array("d", [4, 5, 6]))
+        self.assertEqual(metric.columns(), ([1000, 2000], [[1.0, 4.0], [2.0, 5.0], [3.0, 6.0]]))
+        metric.add_sample(3000, (7, 8, 9))
+        metric.add_sample(4000, (10, 11, 12))
+        self.assertEqual(metric.dropped, 1)
+        self.assertEqual(metric.rows(), ([2000, 3000, 4000], [[4.0, 5.0, 6.0], [7.0, 8.0, 9.0], [10.0, 11.0, 12.0]]))
+        self.assertEqual(metric.values[0][1][2], 6.0)
+        self.assertRaises(ValueError, metric.add_sample, 5000, [1, 2])
+        metric.clear_values()
+        metric.add_sample(6000, [0, 0, 1])
+        self.assertEqual(metric.rows(), ([6000], [[0.0, 0.0, 1.0]]))
+        self.assertEqual(Graphite(None)._format(metric), ["accel.0 0.0 6\n", "accel.1 0.0 6\n", "accel.2 1.0 6\n"])
+
+    def test_array_backend(self):
+        self.check_backend(False)
+
+    @unittest.skipIf(vector_buffer.numpy is None, "numpy is not installed")
+    def test_numpy_backend(self):
+        self.check_backend(True)
+
+    def test_integer_typecodes(self):
+        for use_numpy in (False, True) if vector_buffer.numpy is not None else (False,):
+            for typecode in "bBhHiIlL":
+                buffer = vector_buffer.VectorBuffer(2, 1, typecode, use_numpy)
+                buffer.write(0, [1, 2])
+                self.assertEqual(buffer.data.itemsize, array(typecode).itemsize)
+                self.assertEqual(buffer.tolists(buffer.rows), [[1, 2]])
+        self.assertRaises(ValueError, vector_buffer.VectorBuffer, 2, 1, "q")
+
+    def test_bind(self):
+        metric = VectorMetric(None, "accel", None, 1, 2, None, None, 3)
+        self.assertRaises(TypeError, metric.bind, None, None)
+
+    def test_transforms_refused(self):
+        metric = VectorMetric(None, "accel", None, 1, 2, None, Graphite(None), 3)
+        self.assertRaises(TypeError, metric.add_transform, DeadbandFilter(absolute=0.5))
+        self.assertRaises(TypeError, metric.add_transform, WindowAggregator(10))
+        self.assertEqual(metric.transforms, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import threading
+import unittest
+
+from liota.boards.gateway_dk300 import Dk300
+from liota.dcc.vrops import Vrops
+from liota.utilities.concurrency import Future
+
+#---------------------------------------------------------------------------
+# This is a testing script of the property updates of module liota.dcc.vrops
+# It checks that values are left out only once vROps has acknowledged them,
+# that values lost on the way are queued again, and that the properties of a
+# resource are sent again once it turns out to have another uuid.
+
+class Connection:
+
+    def __init__(self):
+        self.sent = []
+        self.counter = 0
+
+    def next_id(self):
+        self.counter += 2
+        return self.counter
+
+    def send(self, msg, priority=None, on_delivered=None):
+        self.sent.append((msg, on_delivered))
+
+    def take(self):
+        sent, self.sent = self.sent, []
+        return [(msg["uuid"], dict((entry["propertyKey"], entry["propertyValue"])
+                                   for entry in msg["body"]["property_data"]), on_delivered)
+                for msg, on_delivered in sent]
+
+
+class Registry:
+
+    def put(self, resource, parent_uuid=None):
+        pass
+
+
+class VropsPropertiesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.vrops = Vrops.__new__(Vrops)
+        self.vrops.con = Connection()
+        self.vrops.registry = Registry()
+        self.vrops.max_frame_size = 65536
+        self.vrops.property_delay = 0.1
+        self.vrops.property_condition = threading.Condition()
+        self.vrops.pending_properties = {}
+        self.vrops.property_due = None
+        self.vrops.sent_properties = {}
+        self.vrops.unacked_properties = {}
+        self.vrops.property_sequence = 0
+        self.gw = Dk300("gw")
+        self.gw.res_uuid = "uuid-1"
+        self.registered = Vrops.VropsResource(self.gw, True)
+
+    def send(self, properties):
+        self.vrops.set_properties(self.registered, properties, flush=True)
+        return self.vrops.con.take()
+
+    def test_cached_once_acknowledged(self):
+        [(uuid, properties, on_delivered)] = self.send({"a": "1", "b": "2"})
+        self.assertEqual((uuid, properties), ("uuid-1", {"a": "1", "b": "2"}))
+        # Not sent twice while on the way
+        self.assertEqual(self.send({"a": "1"}), [])
+        on_delivered(True)
+        self.assertEqual(self.vrops.sent_properties["uuid-1"], {"a": "1", "b": "2"})
+        self.assertEqual(self.send({"a": "1", "b": "2"}), [])
+        [(_, properties, _)] = self.send({"a": "1", "b": "3"})
+        self.assertEqual(properties, {"b": "3"})
+
+    def test_lost_properties_queued_again(self):
+        [(_, _, on_delivered)] = self.send({"a": "1", "b": "2"})
+        self.vrops.set_properties(self.registered, {"b": "3"})
+        on_delivered(False)
+        self.assertEqual(self.vrops.sent_properties.get("uuid-1", {}), {})
+        # The newer value queued meanwhile wins
+        self.assertEqual(self.vrops.pending_properties[self.gw], {"a": "1", "b": "3"})
+        self.assertNotEqual(self.vrops.property_due, None)
+        self.vrops.flush_properties()
+        [(_, properties, on_delivered)] = self.vrops.con.take()
+        self.assertEqual(properties, {"a": "1", "b": "3"})
+        on_delivered(True)
+        self.assertEqual(self.send({"a": "1", "b": "3"}), [])
+
+    def test_newer_value_lost_too(self):
+        [(_, _, older)] = self.send({"mode": "A"})
+        [(_, _, newer)] = self.send({"mode": "B"})
+        # Lost in the order sent, as when the connection drops
+        older(False)
+        newer(False)
+        self.assertEqual(self.vrops.pending_properties[self.gw], {"mode": "B"})
+        self.vrops.flush_properties()
+        [(_, properties, on_delivered)] = self.vrops.con.take()
+        self.assertEqual(properties, {"mode": "B"})
+        on_delivered(True)
+        self.assertEqual(self.vrops.sent_properties["uuid-1"], {"mode": "B"})
+
+    def test_older_value_acknowledged_newer_lost(self):
+        [(_, _, older)] = self.send({"mode": "A"})
+        [(_, _, newer)] = self.send({"mode": "B"})
+        older(True)
+        self.assertEqual(self.send({"mode": "B"}), [])
+        newer(False)
+        self.assertEqual(self.vrops.pending_properties[self.gw], {"mode": "B"})
+
+    def test_sent_again_for_new_uuid(self):
+        [(_, _, acked)] = self.send({"a": "1"})
+        acked(True)
+        [(_, _, unacked)] = self.send({"b": "2"})
+        future = Future()
+        future.set_result("uuid-2")
+        self.vrops._verify(self.gw, future)
+        self.assertFalse("uuid-1" in self.vrops.sent_properties)
+        # Late news about the old uuid change nothing
+        unacked(False)
+        unacked(True)
+        self.vrops.flush_properties()
+        [(uuid, properties, on_delivered)] = self.vrops.con.take()
+        self.assertEqual((uuid, properties), ("uuid-2", {"a": "1", "b": "2"}))
+        on_delivered(True)
+        self.assertEqual(self.vrops.sent_properties, {"uuid-2": {"a": "1", "b": "2"}})
+
+
+if __name__ == '__main__':
+    unittest.main()
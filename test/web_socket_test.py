@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------#
+#  Copyright © 2015-2016 VMware, Inc. All Rights Reserved.                    #
+#                                                                             #
+#  Licensed under the BSD 2-Clause License (the “License”); you may not use   #
+#  this file except in compliance with the License.                           #
+#                                                                             #
+#  The BSD 2-Clause License                                                   #
+#                                                                             #
+#  Redistribution and use in source and binary forms, with or without         #
+#  modification, are permitted provided that the following conditions are met:#
+#                                                                             #
+#  - Redistributions of source code must retain the above copyright notice,   #
+#      this list of conditions and the following disclaimer.                  #
+#                                                                             #
+#  - Redistributions in binary form must reproduce the above copyright        #
+#      notice, this list of conditions and the following disclaimer in the    #
+#      documentation and/or other materials provided with the distribution.   #
+#                                                                             #
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"#
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE  #
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE #
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE  #
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR        #
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF       #
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS   #
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN    #
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)    #
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF     #
+#  THE POSSIBILITY OF SUCH DAMAGE.                                            #
+# ----------------------------------------------------------------------------#
+import time
+import unittest
+from Queue import Queue
+
+from websocket import ABNF
+
+from liota.transports import web_socket
+from liota.transports.web_socket import WebSocket, PRIORITY_SESSION, PRIORITY_CONTROL, PRIORITY_DATA
+
+#---------------------------------------------------------------------------
+# This is a testing script of module liota.transports.web_socket
+# It runs the outbox of the WebSocket transport against fake connections and
+# checks the order of its lanes, holding and releasing around a handshake,
+# acknowledgements by pongs, the replay of unacknowledged data messages and
+# the backoff on reconnecting, that pending requests fail once the connection
+# is replaced, and that senders learn whether their messages were delivered.
+
+class FakeConnection:
+
+    def __init__(self):
+        self.sent = []
+        self.pings = []
+        self.frames = Queue()
+        self.closed = False
+        self.broken = False
+
+    def send(self, message):
+        if self.broken:
+            raise IOError("Connection reset")
+        self.sent.append(message)
+
+    def ping(self, data):
+        self.pings.append(data)
+
+    def pong(self, data):
+        pass
+
+    def recv_frame(self):
+        return self.frames.get()
+
+    def close(self):
+        self.closed = True
+
+
+class FakeWebSocket(WebSocket):
+
+    def __init__(self, **kwargs):
+        self.connections = []
+        self.failures = 0
+        WebSocket.__init__(self, "ws://127.0.0.1:8080", **kwargs)
+
+    def WebSocketConnection(self, host, verify_cert=True, CERTDIR=None):
+        if self.failures:
+            self.failures -= 1
+            raise IOError("Connection refused")
+        self.ws = FakeConnection()
+        self.connections.append(self.ws)
+
+
+class WebSocketTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ws = FakeWebSocket(max_pending_data=3, initial_backoff=0.001, max_backoff=0.004)
+
+    def tearDown(self):
+        self.ws.close()
+
+    def test_lanes_and_hold(self):
+        self.ws.hold()
+        self.ws.send("data1", PRIORITY_DATA)
+        self.ws.send("data2", PRIORITY_DATA)
+        self.ws.send("control", PRIORITY_CONTROL)
+        self.ws.send("session", PRIORITY_SESSION)
+        # Only session messages are written while held
+        self.assertFalse(self.ws.flush(timeout=0.1))
+        self.assertEqual(self.ws.connections[0].sent, ["session"])
+        self.ws.release()
+        self.assertTrue(self.ws.flush(timeout=1))
+        self.assertEqual(self.ws.connections[0].sent, ["session", "control", "data1", "data2"])
+
+    def test_pong_acknowledges_data(self):
+        self.ws.hold()
+        for i in range(3):
+            self.ws.send("data%d" % i, PRIORITY_DATA)
+        self.ws.release()
+        self.ws.flush(timeout=1)
+        con = self.ws.connections[0]
+        # One ping once the outbox is drained
+        self.assertEqual(con.pings, ["3"])
+        self.assertEqual(self.ws.get_stats()["unacked"], 3)
+        con.frames.put(ABNF(1, 0, 0, 0, ABNF.OPCODE_PONG, 0, "2"))
+        self.assertEqual(self.ws._recv_message(con), None)
+        self.assertEqual([m for _, m in self.ws.unacked], ["data2"])
+        con.frames.put(ABNF(1, 0, 0, 0, ABNF.OPCODE_PONG, 0, "3"))
+        self.ws._recv_message(con)
+        self.assertEqual(self.ws.get_stats()["unacked"], 0)
+        self.assertEqual(self.ws.acked, 3)
+
+    def test_reconnect_replays_unacked(self):
+        held = []
+
+        def on_reconnect():
+            held.append(self.ws.held)
+            # The handshake of the new connection
+            self.ws.send("hello", PRIORITY_SESSION)
+        self.ws.reconnect_handler = on_reconnect
+        for i in range(3):
+            self.ws.send("data%d" % i, PRIORITY_DATA)
+        self.ws.flush(timeout=1)
+        self.ws._acknowledge("1")
+        request = self.ws.request({"transactionID": 8, "type": "create_or_find_resource_request"})
+        self.ws.flush(timeout=1)
+        old = self.ws.connections[0]
+        self.ws._reconnect(old)
+        self.assertTrue(old.closed)
+        self.assertEqual(held, [True])
+        self.assertRaises(IOError, request.result, 1)
+        self.ws.send("data3", PRIORITY_DATA)
+        self.assertFalse(self.ws.flush(timeout=0.1))
+        new = self.ws.connections[1]
+        self.assertEqual(new.sent, ["hello"])
+        self.ws.release()
+        self.ws.flush(timeout=1)
+        self.assertEqual(new.sent, ["hello", "data1", "data2", "data3"])
+        stats = self.ws.get_stats()
+        self.assertEqual((stats["replayed"], stats["reconnects"]), (2, 1))
+        # Replacing a connection which was replaced already does nothing
+        self.ws._reconnect(old)
+        self.assertEqual(len(self.ws.connections), 2)
+
+    def test_delivery_callbacks(self):
+        results = []
+        self.ws.send("control", PRIORITY_CONTROL, on_delivered=lambda delivered: results.append(("control", delivered)))
+        self.ws.flush(timeout=1)
+        con = self.ws.connections[0]
+        # Pinged right away, though not a data message
+        self.assertEqual(con.pings, ["1"])
+        self.assertEqual(results, [])
+        con.frames.put(ABNF(1, 0, 0, 0, ABNF.OPCODE_PONG, 0, "1"))
+        self.ws._recv_message(con)
+        self.assertEqual(results, [("control", True)])
+        self.ws.send("lost", PRIORITY_CONTROL, on_delivered=lambda delivered: results.append(("lost", delivered)))
+        self.ws.flush(timeout=1)
+        self.ws._reconnect(con)
+        self.assertEqual(results, [("control", True), ("lost", False)])
+        # Dropped from a full outbox
+        self.ws.hold()
+        self.ws.send("data0", PRIORITY_DATA, on_delivered=lambda delivered: results.append(("data0", delivered)))
+        for i in range(1, 4):
+            self.ws.send("data%d" % i, PRIORITY_DATA)
+        self.assertEqual(results[-1], ("data0", False))
+
+    def test_lost_connection_while_sending(self):
+        self.ws.connections[0].broken = True
+        self.ws.send("control", PRIORITY_CONTROL)
+        deadline = time.time() + 1
+        while len(self.ws.connections) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.ws.flush(timeout=1)
+        # The control message is written again on the new connection
+        self.assertEqual(self.ws.connections[1].sent, ["control"])
+
+    def test_backoff(self):
+        delays = []
+        sleep = web_socket.time.sleep
+        uniform = web_socket.random.uniform
+        web_socket.time.sleep = delays.append
+        web_socket.random.uniform = lambda a, b: 1.0
+        try:
+            self.ws.failures = 4
+            self.ws._reconnect(self.ws.ws)
+        finally:
+            web_socket.time.sleep = sleep
+            web_socket.random.uniform = uniform
+        self.assertEqual(delays, [0.001, 0.002, 0.004, 0.004])
+        self.assertEqual(len(self.ws.connections), 2)
+
+    def test_dropped_counters(self):
+        self.ws.hold()
+        for i in range(4):
+            self.ws.send("data%d" % i, PRIORITY_DATA)
+        stats = self.ws.get_stats()
+        self.assertEqual((stats["dropped"], stats["unacked_dropped"]), (1, 0))
+        self.ws.release()
+        self.ws.flush(timeout=1)
+        self.ws.send("data4", PRIORITY_DATA)
+        self.ws.flush(timeout=1)
+        stats = self.ws.get_stats()
+        self.assertEqual((stats["dropped"], stats["unacked_dropped"]), (1, 1))
+        self.assertEqual([m for _, m in self.ws.unacked], ["data2", "data3", "data4"])
+
+
+if __name__ == '__main__':
+    unittest.main()